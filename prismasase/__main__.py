@@ -1,10 +1,12 @@
 # pylint: disable=invalid-name
-"""Generates a YAML Config File"""
+"""Generates a YAML Config File, runs Offline Preflight Checks and Transport Benchmarks"""
 
+import argparse
 from getpass import getpass
 from os.path import exists, expanduser
 from os import mkdir
 import sys
+import time
 import yaml
 
 
@@ -41,5 +43,90 @@ def gen_yaml():
     sys.exit()
 
 
+def preflight():
+    """Validates a remote network inventory (csv or jsonl) without making changes;
+     exits 1 if any row fails
+    """
+    # pylint: disable=import-outside-toplevel
+    from prismasase.service_setup.remotenetworks.preflight import (
+        remote_network_load_inventory, remote_network_preflight, remote_network_tenant_snapshot)
+    parser = argparse.ArgumentParser(prog='prisma_preflight',
+                                     description='Remote network inventory preflight')
+    parser.add_argument('inventory', help='csv or jsonl inventory file')
+    parser.add_argument('--snapshot', default='',
+                        help='tenant snapshot file; reused while newer than --max-age')
+    parser.add_argument('--max-age', type=int, default=3600,
+                        help='seconds a saved snapshot is reused. Default 3600')
+    parser.add_argument('--refresh', action='store_true', help='take a new snapshot')
+    args = parser.parse_args()
+    snapshot = remote_network_tenant_snapshot(cache_file=args.snapshot,
+                                              max_age=args.max_age,
+                                              refresh=args.refresh)
+    report = remote_network_preflight(
+        remote_sites=remote_network_load_inventory(args.inventory), snapshot=snapshot)
+    for warning in report['warnings']:
+        print(f"WARNING: row {warning['row']} {warning['name']} {warning['field']}: " +
+              warning['message'])
+    for error in report['errors']:
+        print(f"ERROR: row {error['row']} {error['name']} {error['field']}: " +
+              error['message'])
+    print(f"INFO: {report['rows']} rows checked {len(report['errors'])} errors " +
+          f"{len(report['warnings'])} warnings")
+    sys.exit(1 if report['errors'] else 0)
+
+
+def benchmark():
+    """Compares transports under a bulk read workload: many concurrent list requests
+     for remote networks, IKE gateways, IPSec tunnels, tags and addresses. Only GETs are
+     sent so it is safe against a production tenant.
+    """
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor
+    from prismasase import config
+    from prismasase.configs import Auth
+    from prismasase.middleware import middleware_chain
+    from prismasase.restapi import prisma_request
+    from prismasase.transport import RequestsTransport, http2_transport
+    parser = argparse.ArgumentParser(prog='prisma_benchmark',
+                                     description='HTTP/1.1 vs HTTP/2 transport benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='requests per transport')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent requests')
+    parser.add_argument('--max-streams', type=int, default=100,
+                        help='HTTP/2 streams in flight. Default 100')
+    parser.add_argument('--max-connections', type=int, default=4,
+                        help='HTTP/2 connections. Default 4')
+    args = parser.parse_args()
+    workload = [('remote-networks', 'Remote Networks'), ('ike-gateways', 'Remote Networks'),
+                ('ipsec-tunnels', 'Remote Networks'), ('tags', 'Shared'),
+                ('addresses', 'Shared')]
+    for name, transport in (('http/1.1', RequestsTransport()),
+                            ('http/2', http2_transport(max_streams=args.max_streams,
+                                                       max_connections=args.max_connections))):
+        # no single_flight or cache: the workload repeats a few GETs and would measure
+        # coalescing instead of the transport
+        auth = Auth(tsg_id=config.TSG, client_id=config.CLIENT_ID,
+                    client_secret=config.CLIENT_SECRET, verify=config.CERT,
+                    transport=transport, middleware=middleware_chain("retry,auth"))
+
+        def send(number: int, auth: Auth = auth) -> float:
+            url_type, folder = workload[number % len(workload)]
+            started = time.perf_counter()
+            prisma_request(auth, method='GET', url_type=url_type,
+                           params={'folder': folder, 'limit': 200}, verify=auth.verify)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            latencies = sorted(pool.map(send, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        versions = getattr(transport, 'http_versions', {})
+        print(f"INFO: {name} ({type(transport).__name__}) {args.requests} requests in "
+              f"{elapsed:.2f}s {args.requests / elapsed:.1f} req/s "
+              f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms "
+              f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms"
+              + (f" versions={versions}" if versions else ""))
+        transport.close()
+
+
 if __name__ == '__main__':
     gen_yaml()
@@ -0,0 +1,179 @@
+# pylint: disable=no-member
+"""Record and Replay API traffic for offline runs and benchmarks"""
+
+import atexit
+import gzip
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import orjson
+
+from prismasase.exceptions import SASEReplayError
+from prismasase.transport import Transport, TransportResponse, default_transport
+
+SCRUBBED = "***SCRUBBED***"
+# values of these fields never reach a cassette
+SCRUB_FIELDS = frozenset(('access_token', 'authorization', 'client_secret', 'key',
+                          'passphrase', 'password', 'pre_shared_key', 'secret'))
+KEPT_HEADERS = ('content-type', 'retry-after')
+
+
+class RecordingTransport(Transport):
+    """Sends requests through another transport and appends every exchange to a
+     gzip compressed JSON lines cassette. Authorization headers are dropped and token,
+     pre-shared key and secret values are replaced in both directions.
+
+    Line:
+        {"method": "GET", "url": ".../tags", "params": {"folder": "Shared"},
+         "body": {...}, "status": 200, "headers": {...}, "response": {...}, "elapsed": 0.21}
+    """
+    name = "recording"
+
+    def __init__(self, path: str, transport: Optional[Transport] = None):
+        """_summary_
+
+        Args:
+            path (str): cassette file, appended to if it exists
+            transport (Transport, optional): sends the requests. Defaults to default_transport()
+        """
+        self.path = path
+        self.transport = transport or default_transport()
+        self.recorded = 0
+        self._file = gzip.open(path, 'ab')
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        response = self.transport.request(method, url, **kwargs)
+        try:
+            decoded = response.json()
+        except orjson.JSONDecodeError:
+            decoded = response.content.decode('utf-8', 'replace')
+        line = orjson.dumps({
+            'method': method.upper(),
+            'url': url,
+            'params': scrub(_params(kwargs.get('params'))),
+            'body': scrub(_body(kwargs.get('data'))),
+            'status': response.status_code,
+            'headers': {key.lower(): value for key, value in response.headers.items()
+                        if key.lower() in KEPT_HEADERS},
+            'response': scrub(decoded),
+            'elapsed': round(response.elapsed, 6)}) + b'\n'
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+                self.recorded += 1
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.transport.close()
+
+    def __enter__(self) -> "RecordingTransport":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class ReplayTransport(Transport):
+    """Serves a cassette back without the network. Requests are matched on method, url
+     and query parameters (and the request body with match_body=True); repeated
+     requests get the recorded responses in order and the last one once exhausted.
+    """
+    name = "replay"
+
+    def __init__(self, path: str, latency: str = "zero", match_body: bool = False):
+        """_summary_
+
+        Args:
+            path (str): cassette file
+            latency (str, optional): 'zero' answers at once, 'recorded' sleeps the time
+             the original response took. Defaults to "zero"
+            match_body (bool, optional): include the request body in matching
+
+        Raises:
+            SASEReplayError: unknown latency
+        """
+        if latency not in ('zero', 'recorded'):
+            raise SASEReplayError(f"message=\"latency must be zero or recorded\"|{latency=}")
+        self.path = path
+        self.latency = latency
+        self.match_body = match_body
+        self.served = 0
+        self._exchanges: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        self._positions: Dict[Tuple[str, ...], int] = {}
+        self._lock = threading.Lock()
+        with gzip.open(path, 'rb') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                exchange = orjson.loads(line)
+                self._exchanges.setdefault(
+                    self._key(exchange['method'], exchange['url'], exchange['params'],
+                              exchange['body']), []).append(exchange)
+
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        key = self._key(method.upper(), url, scrub(_params(kwargs.get('params'))),
+                        scrub(_body(kwargs.get('data'))))
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                raise SASEReplayError(f"message=\"request not in cassette\"|{method=}|{url=}|"
+                                      f"params={kwargs.get('params')}")
+            position = self._positions.get(key, 0)
+            exchange = exchanges[min(position, len(exchanges) - 1)]
+            self._positions[key] = position + 1
+            self.served += 1
+        if self.latency == 'recorded':
+            time.sleep(exchange['elapsed'])
+        response = exchange['response']
+        content = (response.encode('utf-8') if isinstance(response, str)
+                   else orjson.dumps(response))
+        return TransportResponse(status_code=exchange['status'], content=content,
+                                 headers=exchange['headers'],
+                                 elapsed=exchange['elapsed'] if self.latency == 'recorded' else 0.0)
+
+    def _key(self, method: str, url: str, params: Any, body: Any) -> Tuple[str, ...]:
+        key = (method, url, urlencode(sorted((str(name), str(value))
+                                             for name, value in (params or {}).items())))
+        if self.match_body:
+            key += (orjson.dumps(body, option=orjson.OPT_SORT_KEYS).decode('utf-8'),)
+        return key
+
+
+def scrub(value: Any) -> Any:
+    """Copy of value with every SCRUB_FIELDS value replaced
+
+    Args:
+        value (Any): decoded JSON
+
+    Returns:
+        Any: _description_
+    """
+    if isinstance(value, dict):
+        return {key: SCRUBBED if str(key).lower() in SCRUB_FIELDS else scrub(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+def _params(params: Optional[dict]) -> Dict[str, Any]:
+    return {str(key): value for key, value in (params or {}).items()}
+
+
+def _body(data: Any) -> Any:
+    if not data:
+        return None
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', 'replace')
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # form encoded token request
+        return dict(parse_qsl(str(data)))
@@ -0,0 +1,241 @@
+# pylint: disable=no-member
+"""Tracks Candidate Configuration writes per Tenant to skip no-op Commits"""
+
+import atexit
+from contextlib import contextmanager
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+import orjson
+
+from prismasase import config
+from prismasase.statics import FOLDER
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+_DEFAULT_TRACKER: Optional["ChangeTracker"] = None
+_DEFAULT_LOCK = threading.Lock()
+# candidate:push and job polling do not change the candidate configuration
+UNTRACKED_URL_TYPES = ('jobs',)
+# folders a push is made for; a change anywhere else (Shared, no folder) is in every one
+PUSH_FOLDERS = tuple(folder for folder in FOLDER if folder != 'Shared')
+
+
+class ChangeTracker:
+    """Records every write that changed the candidate configuration of a tenant.
+     A change is appended as one line to <state_dir>/<tsg_id>.log with its folder, so
+     processes on the same host see each other's writes; a successful push drops the
+     lines of its folders written before it started. Changes outside a push folder
+     stay pending until every push folder was pushed after them. PUTs are compared with the digest of the object the
+     API returned last time so re-applying unchanged state is not counted as a change.
+
+    Layout:
+        <state_dir>/<tsg_id>.log       pending changes since the last push
+        <state_dir>/<tsg_id>.lock      held while the log is appended to or trimmed
+        <state_dir>/<tsg_id>.objects   digest of every object last written
+    """
+
+    def __init__(self, state_dir: str = ""):
+        """_summary_
+
+        Args:
+            state_dir (str, optional): Defaults to config.CACHE_DIR/changes
+        """
+        self.state_dir: str = state_dir or os.path.join(config.CACHE_DIR, "changes")
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._objects: Dict[str, Dict[str, str]] = {}
+        self._dirty_objects: set = set()
+        atexit.register(self.save)
+
+    def record(self, tsg_id: str, method: str, url_type: str, path: str = "",
+               response: Optional[Dict[str, Any]] = None, folder: str = "") -> bool:
+        """Records a successful write
+
+        Args:
+            tsg_id (str): tenant
+            method (str): POST|PUT|DELETE
+            url_type (str): _description_
+            path (str, optional): object path after the url such as '/<id>'
+            response (Dict[str, Any], optional): API response
+            folder (str, optional): folder written to; empty counts for every folder
+
+        Returns:
+            bool: True if it counted as a change
+        """
+        method = method.upper()
+        if method == 'GET' or url_type in UNTRACKED_URL_TYPES or (
+                url_type == 'config-versions' and ':push' in path):
+            return False
+        response = response or {}
+        object_id = str(response.get('id') or path.strip('/'))
+        key = f"{url_type}/{object_id}"
+        with self._lock:
+            objects = self._load_objects(tsg_id)
+            if method == 'DELETE' or url_type == 'config-versions':
+                objects.pop(key, None)
+                digest = ''
+            else:
+                digest = _digest(response)
+                if method == 'PUT' and objects.get(key) == digest:
+                    return False
+                objects[key] = digest
+            self._dirty_objects.add(str(tsg_id))
+        line = orjson.dumps({'ts': time.time(), 'method': method, 'key': key,
+                             'folder': folder or response.get('folder') or ''}) + b'\n'
+        with self._log_lock(tsg_id):
+            file_desc = os.open(self._log_path(tsg_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                                0o600)
+            try:
+                os.write(file_desc, line)
+            finally:
+                os.close(file_desc)
+        return True
+
+    def pending(self, tsg_id: str, folders: Optional[Iterable[str]] = None) -> Optional[bool]:
+        """Whether the candidate has changes that have not been pushed
+
+        Args:
+            tsg_id (str): tenant
+            folders (Iterable[str], optional): only changes a push of these folders
+             includes. Defaults to any change
+
+        Returns:
+            Optional[bool]: None when nothing is known yet (no push has been tracked)
+        """
+        try:
+            with open(self._log_path(tsg_id), 'rb') as log_file:
+                lines = log_file.read().splitlines()
+        except FileNotFoundError:
+            return None if not os.path.exists(self._objects_path(tsg_id)) else False
+        if folders is None:
+            return any(lines)
+        folders = set(folders)
+        if folders - set(PUSH_FOLDERS):
+            # a folder the tracker does not know may contain any of the others
+            return any(lines)
+        return any(_unpushed(entry) & folders for entry in _entries(lines))
+
+    def mark(self, tsg_id: str) -> float:  # pylint: disable=unused-argument
+        """Time the push starts; changes recorded after it stay pending
+
+        Args:
+            tsg_id (str): tenant
+
+        Returns:
+            float: _description_
+        """
+        return time.time()
+
+    def pushed(self, tsg_id: str, mark: float, folders: Optional[Iterable[str]] = None) -> None:
+        """Drops changes of the pushed folders logged before the push started
+
+        Args:
+            tsg_id (str): tenant
+            mark (float): from mark() before the push
+            folders (Iterable[str], optional): folders pushed. Defaults to every folder
+        """
+        folders = set(PUSH_FOLDERS if folders is None else folders)
+        log_path = self._log_path(tsg_id)
+        # the same lock as record() so no change is appended between the read and replace
+        with self._log_lock(tsg_id):
+            try:
+                with open(log_path, 'rb') as log_file:
+                    lines = log_file.read().splitlines()
+            except FileNotFoundError:
+                lines = []
+            remaining = []
+            for entry in _entries(lines):
+                if entry.get('ts', 0) < mark:
+                    unpushed = _unpushed(entry) - folders
+                    if not unpushed:
+                        continue
+                    if entry.get('folder') not in PUSH_FOLDERS:
+                        entry['pushed'] = sorted(set(PUSH_FOLDERS) - unpushed)
+                remaining.append(orjson.dumps(entry) + b'\n')
+            tmp = f"{log_path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as tmp_file:
+                tmp_file.write(b''.join(remaining))
+            os.replace(tmp, log_path)
+        with self._lock:
+            self._load_objects(tsg_id)
+            self._dirty_objects.add(str(tsg_id))
+        self.save()
+
+    def save(self) -> None:
+        """Writes object digests; pending changes are already on disk"""
+        with self._lock:
+            for tsg_id in list(self._dirty_objects):
+                path = self._objects_path(tsg_id)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as tmp_file:
+                    tmp_file.write(orjson.dumps(self._objects.get(tsg_id, {})))
+                os.replace(tmp, path)
+            self._dirty_objects.clear()
+
+    def _load_objects(self, tsg_id: str) -> Dict[str, str]:
+        tsg_id = str(tsg_id)
+        if tsg_id not in self._objects:
+            try:
+                with open(self._objects_path(tsg_id), 'rb') as objects_file:
+                    self._objects[tsg_id] = orjson.loads(objects_file.read())
+            except (FileNotFoundError, orjson.JSONDecodeError):
+                self._objects[tsg_id] = {}
+        return self._objects[tsg_id]
+
+    @contextmanager
+    def _log_lock(self, tsg_id: str) -> Iterator[None]:
+        # a separate lock file because pushed() replaces the log file itself
+        file_desc = os.open(os.path.join(self.state_dir, f"{tsg_id}.lock"),
+                            os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(file_desc, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(file_desc)
+
+    def _log_path(self, tsg_id: str) -> str:
+        return os.path.join(self.state_dir, f"{tsg_id}.log")
+
+    def _objects_path(self, tsg_id: str) -> str:
+        return os.path.join(self.state_dir, f"{tsg_id}.objects")
+
+
+def _entries(lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+
+
+def _unpushed(entry: Dict[str, Any]) -> Set[str]:
+    # push folders that still have to be pushed to include this change
+    if entry.get('folder') in PUSH_FOLDERS:
+        return {entry['folder']}
+    return set(PUSH_FOLDERS) - set(entry.get('pushed', []))
+
+
+def _digest(obj: Dict[str, Any]) -> str:
+    return hashlib.blake2b(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS, default=str),
+                           digest_size=16).hexdigest()
+
+
+def change_tracker() -> ChangeTracker:
+    """Shared tracker in config.CACHE_DIR used by prisma_request and config_commit
+
+    Returns:
+        ChangeTracker: _description_
+    """
+    global _DEFAULT_TRACKER  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        if _DEFAULT_TRACKER is None:
+            _DEFAULT_TRACKER = ChangeTracker()
+        return _DEFAULT_TRACKER
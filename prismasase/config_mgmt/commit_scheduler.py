@@ -0,0 +1,312 @@
+# pylint: disable=no-member
+"""Coalesces concurrent Commit requests into a single Push"""
+
+import asyncio
+from concurrent.futures import Future
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import uuid
+
+import orjson
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+from prismasase.exceptions import SASECommitError
+
+from .configuration import config_commit
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+_SCHEDULERS: Dict[str, "CommitScheduler"] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+# spooled locks and results older than this were left by processes that died
+SPOOL_STALE: float = 3 * 3600
+
+
+class CommitScheduler:
+    """Collects commit requests from any number of threads or asyncio tasks and, once
+     no new request has arrived for `debounce` seconds (or `max_wait` has passed since
+     the first one), runs one config_commit for the union of the requested folders.
+     Every waiter receives the same result. Requests made while a push is running
+     are held for the next push since their changes may not be in the current one.
+
+     With a spool_dir, processes on the same host coordinate through request files and
+     an exclusive lock: the process holding the lock pushes for every request spooled
+     so far and writes each one its result, so the other processes do not push at all.
+     Requests of processes that exited before the push get no result, and results
+     nobody read within SPOOL_STALE seconds are removed.
+    """
+
+    def __init__(self, debounce: float = 5.0, max_wait: float = 60.0,
+                 timeout: int = 2700, spool_dir: str = "", **kwargs):
+        """_summary_
+
+        Args:
+            debounce (float, optional): quiet period before pushing. Defaults to 5.0
+            max_wait (float, optional): longest a request is held. Defaults to 60.0
+            timeout (int, optional): config_commit timeout. Defaults to 2700
+            spool_dir (str, optional): directory shared by processes on this host;
+             in process coalescing only when empty
+            auth (Auth, Optional): tenant authorization
+        """
+        self.auth: Auth = return_auth(**kwargs)
+        self.debounce = float(debounce)
+        self.max_wait = float(max_wait)
+        self.timeout = timeout
+        self.spool_dir = os.path.join(os.path.expanduser(spool_dir),
+                                      str(self.auth.tsg_id)) if spool_dir else ""
+        if self.spool_dir:
+            os.makedirs(os.path.join(self.spool_dir, "requests"), exist_ok=True)
+            os.makedirs(os.path.join(self.spool_dir, "results"), exist_ok=True)
+        self.pushes = 0
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[str, List[str], str, Future]] = []
+        self._first = 0.0
+        self._last = 0.0
+        self._flush_now = False
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, folders: List[str], description: str = "") -> Future:
+        """Queues a commit request
+
+        Args:
+            folders (List[str]): folders to push
+            description (str, optional): merged into the push description
+
+        Returns:
+            Future: resolves to the config_commit response or raises SASECommitError
+        """
+        future: Future = Future()
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first = now
+            self._last = now
+            self._pending.append((uuid.uuid4().hex, list(folders), description, future))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run,
+                                                name='prismasase-commit',
+                                                daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+        return future
+
+    def commit(self, folders: List[str], description: str = "",
+               timeout: Optional[float] = None) -> dict:
+        """Blocking submit
+
+        Args:
+            folders (List[str]): folders to push
+            description (str, optional): _description_
+            timeout (float, optional): seconds to wait for the shared result
+
+        Returns:
+            dict: config_commit response
+        """
+        return self.submit(folders=folders, description=description).result(timeout=timeout)
+
+    async def commit_async(self, folders: List[str], description: str = "") -> dict:
+        """Awaitable submit for asyncio callers
+
+        Args:
+            folders (List[str]): folders to push
+            description (str, optional): _description_
+
+        Returns:
+            dict: config_commit response
+        """
+        return await asyncio.wrap_future(self.submit(folders=folders, description=description))
+
+    def flush(self) -> None:
+        """Push pending requests now instead of waiting out the debounce"""
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    if not self._cond.wait(timeout=self.max_wait):
+                        # idle worker exits; submit starts a new one
+                        self._worker = None
+                        return
+                while not self._flush_now:
+                    deadline = min(self._last + self.debounce, self._first + self.max_wait)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                batch, self._pending, self._flush_now = self._pending, [], False
+            if self.spool_dir:
+                try:
+                    self._push_spooled(batch)
+                except OSError as err:
+                    for _, _, _, future in batch:
+                        if not future.done():
+                            _resolve(future, {'error': f"{type(err).__name__}: {err}"})
+            else:
+                result = self._push([(folders, description)
+                                     for _, folders, description, _ in batch])
+                for _, _, _, future in batch:
+                    _resolve(future, result)
+
+    def _push(self, requests: List[Tuple[List[str], str]]) -> Dict[str, Any]:
+        folders = sorted({folder for request_folders, _ in requests for folder in request_folders})
+        descriptions = list(dict.fromkeys(description for _, description in requests
+                                          if description))
+        description = '; '.join(descriptions) or "No description Provided"
+        print(f"INFO: coalesced {len(requests)} commit requests into one push for " +
+              ', '.join(folders))
+        self.pushes += 1
+        try:
+            response = config_commit(folders=folders, description=description,
+                                     timeout=self.timeout, auth=self.auth)
+            response['coalesced_requests'] = len(requests)
+            return response
+        except Exception as err:  # pylint: disable=broad-except
+            return {'status': 'error', 'error': f"{type(err).__name__}: {err}",
+                    'coalesced_requests': len(requests)}
+
+    def _push_spooled(self, batch: List[Tuple[str, List[str], str, Future]]) -> None:
+        for request_id, folders, description, _ in batch:
+            _write_atomic(os.path.join(self.spool_dir, "requests", request_id),
+                          {'folders': folders, 'description': description, 'pid': os.getpid()})
+        with _SpoolLock(os.path.join(self.spool_dir, "commit.lock")):
+            if not all(os.path.exists(self._result_path(request_id))
+                       for request_id, _, _, _ in batch):
+                # push for every request spooled so far, including other processes'
+                spooled: Dict[str, Dict[str, Any]] = {}
+                requests_dir = os.path.join(self.spool_dir, "requests")
+                for request_id in os.listdir(requests_dir):
+                    if request_id.endswith('.tmp'):
+                        continue
+                    try:
+                        with open(os.path.join(requests_dir, request_id), 'rb') as request:
+                            spooled[request_id] = orjson.loads(request.read())
+                    except (OSError, orjson.JSONDecodeError):
+                        continue
+                result = self._push([(request['folders'], request['description'])
+                                     for request in spooled.values()])
+                for request_id, request in spooled.items():
+                    # the changes of a process that exited are still pushed; nobody
+                    # is left to read its result
+                    if _process_alive(request.get('pid')):
+                        _write_atomic(self._result_path(request_id), result)
+                    os.remove(os.path.join(requests_dir, request_id))
+            self._remove_stale_results()
+        for request_id, _, _, future in batch:
+            with open(self._result_path(request_id), 'rb') as result_file:
+                result = orjson.loads(result_file.read())
+            os.remove(self._result_path(request_id))
+            _resolve(future, result)
+
+    def _result_path(self, request_id: str) -> str:
+        return os.path.join(self.spool_dir, "results", request_id)
+
+    def _remove_stale_results(self) -> None:
+        results_dir = os.path.join(self.spool_dir, "results")
+        expired = time.time() - SPOOL_STALE
+        for name in os.listdir(results_dir):
+            try:
+                if os.path.getmtime(os.path.join(results_dir, name)) < expired:
+                    os.remove(os.path.join(results_dir, name))
+            except OSError:
+                continue
+
+
+class _SpoolLock:
+    """Exclusive host wide lock; flock where available otherwise an O_EXCL lock file"""
+
+    def __init__(self, path: str, stale: float = SPOOL_STALE):
+        self.path = path
+        self.stale = stale
+        self._fd = -1
+
+    def __enter__(self) -> '_SpoolLock':
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return self
+        while True:
+            try:
+                self._fd = os.open(f"{self.path}.excl", os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(f"{self.path}.excl") > self.stale:
+                        os.remove(f"{self.path}.excl")
+                except OSError:
+                    pass
+                time.sleep(1)
+
+    def __exit__(self, *args) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            os.remove(f"{self.path}.excl")
+
+
+def _write_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as tmp_file:
+        tmp_file.write(orjson.dumps(data))
+    os.replace(tmp, path)
+
+
+def _process_alive(pid: Any) -> bool:
+    if not pid or os.name != 'posix':
+        # signal 0 only probes a process on posix; elsewhere it would end it
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):
+        return True
+    return True
+
+
+def _resolve(future: Future, result: Dict[str, Any]) -> None:
+    if result.get('error'):
+        future.set_exception(SASECommitError("message=\"coalesced push failed\"|" +
+                                             result['error']))
+    else:
+        future.set_result(result)
+
+
+def config_commit_scheduler(**kwargs) -> CommitScheduler:
+    """Shared scheduler per tenant; kwargs are used when it is first created
+
+    Returns:
+        CommitScheduler: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    kwargs['auth'] = auth
+    with _SCHEDULERS_LOCK:
+        if str(auth.tsg_id) not in _SCHEDULERS:
+            _SCHEDULERS[str(auth.tsg_id)] = CommitScheduler(**kwargs)
+        return _SCHEDULERS[str(auth.tsg_id)]
+
+
+def config_commit_coalesced(folders: List[str], description: str = "", **kwargs) -> dict:
+    """Drop in for config_commit that shares a push with concurrent callers
+
+    Args:
+        folders (List[str]): folders to push
+        description (str, optional): _description_
+
+    Raises:
+        SASECommitError: the shared push failed
+
+    Returns:
+        dict: config_commit response of the shared push
+    """
+    return config_commit_scheduler(**kwargs).commit(folders=folders, description=description)
@@ -0,0 +1,258 @@
+# pylint: disable=no-member
+"""Configuration Diff between snapshots or pushed config versions"""
+
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.restapi import prisma_request_iter
+from prismasase.statics import FOLDER
+
+from .configuration import config_manage_get_config
+
+# Fields that are assigned by the API and change without a user edit
+DIFF_IGNORE_FIELDS: tuple = ('id',)
+
+
+def config_diff_key(obj_type: str, obj: dict) -> Tuple[str, str, str]:
+    """Identity of an object across snapshots (type, folder, name)
+
+    Args:
+        obj_type (str): object type; normally the url_type such as 'addresses'
+        obj (dict): the object
+
+    Returns:
+        Tuple[str, str, str]: (type, folder, name)
+    """
+    return (str(obj_type), str(obj.get('folder', '')), str(obj.get('name', obj.get('id', ''))))
+
+
+def config_diff_digest(obj: dict, ignore_fields: Iterable[str] = DIFF_IGNORE_FIELDS) -> bytes:
+    """Stable digest of an object independent of key order
+
+    Args:
+        obj (dict): object to hash
+        ignore_fields (Iterable[str], optional): top level fields left out of the digest
+
+    Returns:
+        bytes: 16 byte blake2b digest
+    """
+    return hashlib.blake2b(_encode(obj, ignore_fields), digest_size=16).digest()
+
+
+def config_diff_objects(snapshot: Any, obj_type: str = "") -> Iterator[Tuple[str, dict]]:
+    """Normalizes a snapshot into (type, object) pairs. Accepts a list response
+     ({'data': [...]}), a mapping of {type: [objects]} or an iterable of (type, object)
+
+    Args:
+        snapshot (Any): snapshot to walk
+        obj_type (str, optional): type used when the snapshot does not carry one
+
+    Yields:
+        Iterator[Tuple[str, dict]]: (type, object)
+    """
+    if isinstance(snapshot, dict):
+        if isinstance(snapshot.get('data'), list):
+            for obj in snapshot['data']:
+                yield (obj_type or str(obj.get('type', '')), obj)
+            return
+        for snap_type, objects in snapshot.items():
+            if isinstance(objects, list):
+                for obj in objects:
+                    if isinstance(obj, dict):
+                        yield (snap_type, obj)
+        return
+    for entry in snapshot:
+        if isinstance(entry, tuple):
+            yield entry
+        else:
+            yield (obj_type or str(entry.get('type', '')), entry)
+
+
+def config_diff_fields(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Field level changes between two objects using dotted paths;
+     lists are compared as a whole value
+
+    Args:
+        old (Any): previous value
+        new (Any): current value
+        path (str, optional): prefix for nested paths
+
+    Returns:
+        List[Dict[str, Any]]: [{'field': 'a.b', 'old': ..., 'new': ...}]
+    """
+    changes: list = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(set(old) | set(new), key=str):
+            field = f"{path}.{key}" if path else str(key)
+            if key not in old:
+                changes.append({'field': field, 'old': None, 'new': new[key]})
+            elif key not in new:
+                changes.append({'field': field, 'old': old[key], 'new': None})
+            elif old[key] != new[key]:
+                changes.extend(config_diff_fields(old[key], new[key], field))
+    elif old != new:
+        changes.append({'field': path, 'old': old, 'new': new})
+    return changes
+
+
+def config_diff_stream(old: Iterable[Tuple[str, dict]],
+                       new: Iterable[Tuple[str, dict]],
+                       **kwargs) -> Iterator[Dict[str, Any]]:
+    """Streams the differences between two snapshots in linear time.
+     The old snapshot is reduced to a digest per (type, folder, name) plus a compact
+     encoding used for field detail and removed objects; the new snapshot is never
+     held in memory.
+     With sorted=True both sides are merge joined and neither side is held.
+
+    Args:
+        old (Iterable[Tuple[str, dict]]): (type, object) pairs of the older snapshot
+        new (Iterable[Tuple[str, dict]]): (type, object) pairs of the newer snapshot
+        sorted (bool, optional): both inputs are sorted by config_diff_key. Default False
+        ignore_fields (Iterable[str], optional): top level fields to ignore. Default ('id',)
+
+    Yields:
+        Iterator[Dict[str, Any]]: {'action': 'added'|'removed'|'modified',
+         'type', 'folder', 'name', 'object' or 'changes'}
+    """
+    ignore_fields = tuple(kwargs.get('ignore_fields', DIFF_IGNORE_FIELDS))
+    if kwargs.get('sorted'):
+        yield from _diff_sorted(old, new, ignore_fields)
+        return
+    seen: Dict[Tuple[str, str, str], Tuple[bytes, bytes]] = {}
+    for obj_type, obj in old:
+        # the whole object is kept so removed objects are reported as in sorted mode
+        seen[config_diff_key(obj_type, obj)] = (config_diff_digest(obj, ignore_fields),
+                                                orjson.dumps(obj))
+    for obj_type, obj in new:
+        key = config_diff_key(obj_type, obj)
+        previous = seen.pop(key, None)
+        if previous is None:
+            yield _event('added', key, object=obj)
+            continue
+        if config_diff_digest(obj, ignore_fields) != previous[0]:
+            yield _event('modified', key, changes=config_diff_fields(
+                _strip(orjson.loads(previous[1]), ignore_fields), _strip(obj, ignore_fields)))
+    for key, previous in seen.items():
+        yield _event('removed', key, object=orjson.loads(previous[1]))
+
+
+def config_diff(old: Any, new: Any, **kwargs) -> Dict[str, list]:
+    """Compares two snapshots and returns added, removed and modified objects
+
+    Args:
+        old (Any): older snapshot; see config_diff_objects for accepted formats
+        new (Any): newer snapshot
+        obj_type (str, optional): type applied to objects without one
+        sorted (bool, optional): see config_diff_stream
+        ignore_fields (Iterable[str], optional): see config_diff_stream
+
+    Returns:
+        Dict[str, list]: {'added': [], 'removed': [], 'modified': []}
+    """
+    obj_type = kwargs.pop('obj_type', '')
+    response: Dict[str, list] = {'added': [], 'removed': [], 'modified': []}
+    for event in config_diff_stream(config_diff_objects(old, obj_type),
+                                    config_diff_objects(new, obj_type),
+                                    **kwargs):
+        response[event.pop('action')].append(event)
+    return response
+
+
+def config_diff_versions(old_version: str, new_version: str, **kwargs) -> Dict[str, list]:
+    """Diff two pushed configuration versions. Versions are fetched one at a time
+     so only the digests of the older version are kept while the newer one is compared
+
+    Args:
+        old_version (str): older version number
+        new_version (str): newer version number
+        auth (Auth, Optional): tenant authorization
+
+    Returns:
+        Dict[str, list]: {'added': [], 'removed': [], 'modified': []}
+    """
+    auth: Auth = return_auth(**kwargs)
+    kwargs.pop('auth', None)
+    obj_type = kwargs.pop('obj_type', 'config')
+
+    def _version(version_num: str) -> Iterator[Tuple[str, dict]]:
+        yield from config_diff_objects(config_manage_get_config(version_num=version_num,
+                                                                auth=auth), obj_type)
+
+    response: Dict[str, list] = {'added': [], 'removed': [], 'modified': []}
+    for event in config_diff_stream(_version(old_version), _version(new_version), **kwargs):
+        response[event.pop('action')].append(event)
+    return response
+
+
+def config_diff_tenant_objects(url_types: list, folders: list,
+                               **kwargs) -> Iterator[Tuple[str, dict]]:
+    """Streams a live tenant snapshot one page at a time
+
+    Args:
+        url_types (list): list endpoints to include such as ['addresses', 'tags']
+        folders (list): folder names such as ['Shared', 'Remote Networks']
+        stream (bool, Optional): parse list pages incrementally. Defaults to config.STREAM_LISTS
+        auth (Auth, Optional): tenant authorization
+
+    Raises:
+        SASEBadParam: unknown folder
+
+    Yields:
+        Iterator[Tuple[str, dict]]: (url_type, object)
+    """
+    auth: Auth = return_auth(**kwargs)
+    for folder in folders:
+        if folder not in FOLDER:
+            raise SASEBadParam(f"message=\"invalid folder\"|{folder=}")
+    for url_type in url_types:
+        for folder in folders:
+            for obj in prisma_request_iter(auth,
+                                           url_type=url_type,
+                                           params=dict(FOLDER[folder]),
+                                           stream=kwargs.get('stream'),
+                                           verify=auth.verify):
+                yield (url_type, obj)
+
+
+def _diff_sorted(old: Iterable[Tuple[str, dict]],
+                 new: Iterable[Tuple[str, dict]],
+                 ignore_fields: tuple) -> Iterator[Dict[str, Any]]:
+    """Merge join of two inputs already sorted by config_diff_key"""
+    old_iter = iter(old)
+    new_iter = iter(new)
+    old_entry: Optional[Tuple[str, dict]] = next(old_iter, None)
+    new_entry: Optional[Tuple[str, dict]] = next(new_iter, None)
+    while old_entry is not None or new_entry is not None:
+        old_key = config_diff_key(*old_entry) if old_entry is not None else None
+        new_key = config_diff_key(*new_entry) if new_entry is not None else None
+        if new_key is None or (old_key is not None and old_key < new_key):
+            yield _event('removed', old_key, object=old_entry[1])  # type: ignore
+            old_entry = next(old_iter, None)
+        elif old_key is None or new_key < old_key:
+            yield _event('added', new_key, object=new_entry[1])  # type: ignore
+            new_entry = next(new_iter, None)
+        else:
+            if (config_diff_digest(old_entry[1], ignore_fields) !=  # type: ignore
+                    config_diff_digest(new_entry[1], ignore_fields)):  # type: ignore
+                yield _event('modified', new_key, changes=config_diff_fields(
+                    _strip(old_entry[1], ignore_fields),  # type: ignore
+                    _strip(new_entry[1], ignore_fields)))  # type: ignore
+            old_entry = next(old_iter, None)
+            new_entry = next(new_iter, None)
+
+
+def _strip(obj: dict, ignore_fields: Iterable[str]) -> dict:
+    return {key: value for key, value in obj.items() if key not in ignore_fields}
+
+
+def _encode(obj: dict, ignore_fields: Iterable[str]) -> bytes:
+    return orjson.dumps(_strip(obj, ignore_fields), option=orjson.OPT_SORT_KEYS)
+
+
+def _event(action: str, key: Tuple[str, str, str], **kwargs) -> Dict[str, Any]:
+    return {'action': action, 'type': key[0], 'folder': key[1], 'name': key[2], **kwargs}
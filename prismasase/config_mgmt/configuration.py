@@ -7,13 +7,17 @@ import time
 
 import orjson
 
-from prismasase import return_auth
+from prismasase import config, return_auth
+from prismasase.change_tracker import change_tracker
 
 from prismasase.configs import Auth
 from prismasase.exceptions import SASEBadParam, SASECommitError
+from prismasase.middleware import priority_lane
 from prismasase.restapi import prisma_request
 from prismasase.utilities import check_items_in_list
 
+from .version_cache import ConfigVersionCache, config_version_cache
+
 
 def config_manage_list_versions(limit: int = 50, offset: int = 0, **kwargs):
     """List the Candidate Configurations
@@ -79,7 +83,7 @@ def config_manage_push(folders: list, description: str = "No Description Provide
                               method='POST',
                               url_type='config-versions',
                               post_object='/candidate:push',
-                              data=json.dumps(data),
+                              data=data,
                               verify=auth.verify)
     print(f"INFO: response={orjson.dumps(response).decode('utf-8')}")
     return response
@@ -128,16 +132,29 @@ def config_manage_get_config(version_num: str, **kwargs) -> dict:
 
     Args:
         version_num (str): _description_
+        cache (ConfigVersionCache|bool, Optional): serve and store pushed versions from a
+         local cache; True uses the shared cache in config.CACHE_DIR
 
     Returns:
         dict: _description_
     """
     auth: Auth = return_auth(**kwargs)
+    cache = kwargs.get('cache')
+    if cache is True:
+        cache = config_version_cache()
+    if cache and ConfigVersionCache.cacheable(version_num):
+        cached = cache.get(tsg_id=auth.tsg_id, version_num=version_num)
+        if cached is not None:
+            return cached
+    else:
+        cache = None
     response = prisma_request(token=auth,
                               method='GET',
                               url_type='config-versions',
-                              post_object=f'/{version_num}',
+                              get_object=f'/{version_num}',
                               verify=auth.verify)
+    if cache and '_errors' not in response:
+        cache.put(tsg_id=auth.tsg_id, version_num=version_num, response=response)
     return response
 
 
@@ -157,7 +174,7 @@ def config_manage_load(version_num: str, **kwargs) -> dict:
     response = prisma_request(token=auth,
                               method='POST',
                               url_type='config-versions',
-                              data=json.dumps(data),
+                              data=data,
                               post_object=':load',
                               verify=auth.verify)
     return response
@@ -260,6 +277,11 @@ def config_commit(folders: list,  # pylint: disable=too-many-locals
         folders (list): _description_
         description (str, optional): _description_. Defaults to "No description Provided".
         timeout (int, optional): _description_. Defaults to 2700.
+        skip_unchanged (bool, optional): return the running version without pushing when
+         no write changed the candidate for these folders since their last tracked push;
+         needs TRACK_CHANGES. Defaults to False
+        priority (str, optional): priority class of the push request so it is not queued
+         behind bulk traffic. Defaults to 'interactive'
 
     Raises:
         SASECommitError: _description_
@@ -278,8 +300,26 @@ def config_commit(folders: list,  # pylint: disable=too-many-locals
     }
     config_job_subs = []
     version = ''
+    tracker = None
+    if config.TRACK_CHANGES:
+        try:
+            tracker = change_tracker()
+        except OSError as err:
+            print(f"WARNING: unable to track changes {type(err).__name__}: {err}")
+    elif kwargs.get('skip_unchanged'):
+        print("WARNING: skip_unchanged needs TRACK_CHANGES=true; pushing")
+    if kwargs.get('skip_unchanged') and tracker and tracker.pending(auth.tsg_id, folders) is False:
+        show_version = config_manage_show_run(auth=auth)
+        response.update({'status': 'success',
+                         'message': 'No pending changes; push skipped',
+                         'version_info': show_version['data']})
+        print(f"INFO: No pending changes for tenant {auth.tsg_id}; skipping push")
+        return response
+    # changes written after this point stay pending for the next push
+    change_mark = tracker.mark(auth.tsg_id) if tracker else 0.0
     # initial push of configurations
-    config_job = config_manage_push(folders=folders, description=description, auth=auth)
+    with priority_lane(kwargs.get('priority') or 'interactive'):
+        config_job = config_manage_push(folders=folders, description=description, auth=auth)
     if 'success' in config_job and config_job.get('success'):
         job_id = config_job['job_id']
         message = config_job['message']
@@ -322,6 +362,11 @@ def config_commit(folders: list,  # pylint: disable=too-many-locals
                 response['job_id'] = response_jobs
                 # print(f"DEBUG: Current Response {orjson.dumps(response).decode('utf-8')}")
                 count -= 1
+    if response['status'] == 'success' and tracker:
+        try:
+            tracker.pushed(auth.tsg_id, change_mark, folders)
+        except OSError as err:
+            print(f"WARNING: unable to record push {type(err).__name__}: {err}")
     print(f"INFO: Gathering Current Commit version for tenant {auth.tsg_id}")
     # Do not send KWARGS becuase it has another auth in it possibly since auth
     # is already extracted at the top
@@ -0,0 +1,235 @@
+"""Job Status Event Stream backed by one shared Poller"""
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+
+from .configuration import config_manage_list_job_id, config_manage_list_jobs
+
+JOB_STATES = {'PEND': 'queued', 'ACT': 'running'}
+_WATCHERS: Dict[str, "JobWatcher"] = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def job_state(job: Dict[str, Any]) -> str:
+    """Maps a job to queued|running|FIN/OK|FIN/FAIL
+
+    Args:
+        job (Dict[str, Any]): job object
+
+    Returns:
+        str: _description_
+    """
+    status = str(job.get('status_str', ''))
+    if status == 'FIN':
+        return f"FIN/{job.get('result_str') or 'OK'}"
+    return JOB_STATES.get(status, status.lower() or 'queued')
+
+
+class _Subscription:  # pylint: disable=too-few-public-methods
+    def __init__(self, job_ids: Iterable[str], callback: Callable, subjobs: bool,
+                 subjob_wait: float):
+        self.jobs: Set[str] = {str(job_id) for job_id in job_ids}
+        self.callback = callback
+        self.subjobs = subjobs
+        self.subjob_wait = subjob_wait
+        self.states: Dict[str, str] = {}
+        self.final: Dict[str, str] = {}
+        self.finished_at = 0.0
+        self.done = threading.Event()
+
+
+class JobWatcher:
+    """Polls every watched job from one thread and publishes state transitions.
+     Each cycle lists recent jobs once and only looks up unfinished jobs by id when
+     they are not in that page. A finished job is remembered once seen, so watching
+     many jobs costs about one request per interval.
+     Jobs whose parent_id is watched are reported as 'subjob' events and watched too.
+
+    Events:
+        {'job_id': '188', 'state': 'queued'|'running'|'FIN/OK'|'FIN/FAIL'|'subjob',
+         'previous': 'running', 'parent_id': '187', 'job': {...}}
+    """
+
+    def __init__(self, interval: float = 10, page_size: int = 50, **kwargs):
+        """_summary_
+
+        Args:
+            interval (float, optional): seconds between polls. Defaults to 10
+            page_size (int, optional): recent jobs listed per poll. Defaults to 50
+            auth (Auth, Optional): tenant authorization
+        """
+        self.auth: Auth = return_auth(**kwargs)
+        self.interval = float(interval)
+        self.page_size = int(page_size)
+        self.polls = 0
+        # finished jobs never change again; kept so they are not looked up every cycle
+        self._finished: Dict[str, Dict[str, Any]] = {}
+        self._subscriptions: List[_Subscription] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, job_ids: Iterable[str], callback: Callable[[dict], Any],
+                  subjobs: bool = True, subjob_wait: float = 30) -> _Subscription:
+        """Calls callback(event) from the poller thread for every transition of the jobs
+
+        Args:
+            job_ids (Iterable[str]): jobs to watch
+            callback (Callable[[dict], Any]): receives events, then None once all jobs finished
+            subjobs (bool, optional): follow sub jobs. Defaults to True
+            subjob_wait (float, optional): seconds to keep looking for sub jobs once every
+             known job finished. Defaults to 30
+
+        Returns:
+            _Subscription: pass to unsubscribe; .done is set once all jobs finished
+        """
+        subscription = _Subscription(job_ids, callback, subjobs, subjob_wait)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name='prismasase-jobs',
+                                                daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription: _Subscription) -> None:
+        """Stops delivering events to a subscription
+
+        Args:
+            subscription (_Subscription): from subscribe
+        """
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription.done.set()
+
+    async def events(self, job_ids: Iterable[str], subjobs: bool = True,
+                     subjob_wait: float = 30) -> AsyncIterator[dict]:
+        """Async iterator of events ending once every job (and sub job) finished
+
+        Args:
+            job_ids (Iterable[str]): jobs to watch
+            subjobs (bool, optional): follow sub jobs. Defaults to True
+            subjob_wait (float, optional): see subscribe. Defaults to 30
+
+        Yields:
+            dict: event
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        subscription = self.subscribe(
+            job_ids, lambda event: loop.call_soon_threadsafe(queue.put_nowait, event),
+            subjobs=subjobs, subjob_wait=subjob_wait)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.unsubscribe(subscription)
+
+    def wait(self, job_ids: Iterable[str], timeout: float = 2700,
+             **kwargs) -> Dict[str, str]:
+        """Blocks until every job finished
+
+        Args:
+            job_ids (Iterable[str]): jobs to watch
+            timeout (float, optional): Defaults to 2700
+
+        Returns:
+            Dict[str, str]: job id to final state for jobs and discovered sub jobs
+        """
+        subscription = self.subscribe(job_ids, lambda event: None, **kwargs)
+        subscription.done.wait(timeout=timeout)
+        self.unsubscribe(subscription)
+        return dict(subscription.final)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+                if not subscriptions:
+                    self._thread = None
+                    return
+            try:
+                self._poll(subscriptions)
+            except Exception as err:  # pylint: disable=broad-except
+                print(f"ERROR: job poll failed {type(err).__name__}: {err}")
+            self._wake.clear()
+            self._wake.wait(timeout=self.interval)
+
+    def _poll(self, subscriptions: List[_Subscription]) -> None:
+        self.polls += 1
+        known = set().union(*(subscription.jobs for subscription in subscriptions))
+        # jobs every subscription already saw finish need no lookup
+        watched = set().union(*(subscription.jobs - subscription.final.keys()
+                                for subscription in subscriptions))
+        self._finished = {job_id: job for job_id, job in self._finished.items()
+                          if job_id in known}
+        jobs: Dict[str, Dict[str, Any]] = dict(self._finished)
+        for job in config_manage_list_jobs(limit=self.page_size, auth=self.auth).get('data', []):
+            jobs[str(job['id'])] = job
+        for job_id in watched - set(jobs):
+            for job in config_manage_list_job_id(job_id=job_id, auth=self.auth).get('data', []):
+                jobs[str(job['id'])] = job
+        for job_id, job in jobs.items():
+            if job_id in known and job_state(job).startswith('FIN'):
+                self._finished[job_id] = job
+        now = time.monotonic()
+        for subscription in subscriptions:
+            if subscription.subjobs:
+                for job_id, job in sorted(jobs.items(), key=lambda item: _job_order(item[0])):
+                    parent_id = str(job.get('parent_id') or '')
+                    if job_id not in subscription.jobs and parent_id in subscription.jobs:
+                        subscription.jobs.add(job_id)
+                        subscription.finished_at = 0.0
+                        subscription.callback({'job_id': job_id, 'state': 'subjob',
+                                               'previous': '', 'parent_id': parent_id,
+                                               'job': job})
+            for job_id in sorted(subscription.jobs, key=_job_order):
+                if job_id not in jobs:
+                    continue
+                state = job_state(jobs[job_id])
+                previous = subscription.states.get(job_id, '')
+                if state == previous:
+                    continue
+                subscription.states[job_id] = state
+                subscription.callback({'job_id': job_id, 'state': state, 'previous': previous,
+                                       'parent_id': str(jobs[job_id].get('parent_id') or ''),
+                                       'job': jobs[job_id]})
+                if state.startswith('FIN'):
+                    subscription.final[job_id] = state
+            if len(subscription.final) == len(subscription.jobs):
+                if not subscription.finished_at:
+                    subscription.finished_at = now
+                if not subscription.subjobs or (
+                        now - subscription.finished_at >= subscription.subjob_wait):
+                    subscription.callback(None)
+                    self.unsubscribe(subscription)
+
+
+def _job_order(job_id: str) -> tuple:
+    # numeric ids in numeric order; anything else after them without raising
+    return (0, int(job_id), '') if job_id.isdigit() else (1, 0, job_id)
+
+
+def job_watcher(**kwargs) -> JobWatcher:
+    """Shared watcher per tenant so every caller uses the same poller
+
+    Returns:
+        JobWatcher: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    kwargs['auth'] = auth
+    with _WATCHERS_LOCK:
+        if str(auth.tsg_id) not in _WATCHERS:
+            _WATCHERS[str(auth.tsg_id)] = JobWatcher(**kwargs)
+        return _WATCHERS[str(auth.tsg_id)]
@@ -0,0 +1,291 @@
+# pylint: disable=no-member
+"""Content Addressed Local Cache of pushed Config Versions"""
+
+import atexit
+from contextlib import contextmanager
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import orjson
+
+from prismasase import config
+from prismasase.exceptions import SASEBadParam
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+BLOB_KEY = "$blobs"
+_DEFAULT_CACHE: Optional["ConfigVersionCache"] = None
+
+
+class ConfigVersionCache:
+    """On disk store of pushed config versions keyed by tenant and version number.
+     Objects found in list values of a version are stored once as blobs named by their
+     sha256 so identical objects across versions share storage. Least recently used
+     versions are evicted once the store grows past max_bytes. Processes sharing the
+     store update index.json under an exclusive lock, re-reading it first when another
+     process changed it, so no process overwrites entries written by another. Access
+     times of hits are kept in memory and written with the next put(), eviction or at
+     exit, so reads never write the index.
+
+    Layout:
+        <cache_dir>/index.json      versions, blob sizes and blob reference counts
+        <cache_dir>/index.lock
+        <cache_dir>/versions/<tsg_id>/<version_num>.json
+        <cache_dir>/blobs/<sha256[:2]>/<sha256>
+    """
+
+    def __init__(self, cache_dir: str = "", max_bytes: int = 512 * 1024 * 1024):
+        """_summary_
+
+        Args:
+            cache_dir (str, optional): location of the store. Defaults to config.CACHE_DIR
+            max_bytes (int, optional): size cap before eviction. Defaults to 512MB
+        """
+        self.cache_dir: str = cache_dir or os.path.join(config.CACHE_DIR, "config-versions")
+        self.max_bytes: int = int(max_bytes)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.cache_dir, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, "versions"), exist_ok=True)
+        self._index_stat: tuple = ()
+        self._index: Dict[str, Any] = self._load_index()
+        self._accessed: Dict[str, float] = {}
+        atexit.register(self.flush)
+
+    @staticmethod
+    def cacheable(version_num: str) -> bool:
+        """Only numbered versions are immutable; 'running' and 'candidate' are not
+
+        Args:
+            version_num (str): version number
+
+        Returns:
+            bool: True if the version can be cached
+        """
+        return str(version_num).isdigit()
+
+    def get(self, tsg_id: str, version_num: str) -> Optional[dict]:
+        """Returns a cached version or None on a miss
+
+        Args:
+            tsg_id (str): tenant service group id
+            version_num (str): version number
+
+        Returns:
+            Optional[dict]: the version as returned by config_manage_get_config
+        """
+        key = self._key(tsg_id, version_num)
+        with self._locked():
+            if key not in self._index['versions']:
+                return None
+            try:
+                manifest = self._read(self._manifest_path(tsg_id, version_num))
+                response = {
+                    field: ([self._read(self._blob_path(digest)) for digest in value[BLOB_KEY]]
+                            if isinstance(value, dict) and BLOB_KEY in value else value)
+                    for field, value in manifest.items()}
+            except (OSError, ValueError):
+                # partially removed entry; treat as a miss and drop it
+                self._drop(key)
+                self._save_index()
+                return None
+            self._accessed[key] = time.time()
+        return response
+
+    def put(self, tsg_id: str, version_num: str, response: dict) -> None:
+        """Stores a version splitting list values into content addressed blobs
+
+        Args:
+            tsg_id (str): tenant service group id
+            version_num (str): version number
+            response (dict): response from config_manage_get_config
+
+        Raises:
+            SASEBadParam: version is not an immutable numbered version
+        """
+        if not self.cacheable(version_num):
+            raise SASEBadParam(f"message=\"only numbered versions can be cached\"|{version_num=}")
+        key = self._key(tsg_id, version_num)
+        manifest: Dict[str, Any] = {}
+        blobs: List[str] = []
+        with self._locked():
+            for field, value in response.items():
+                if isinstance(value, list) and all(isinstance(obj, dict) for obj in value):
+                    digests = [self._write_blob(obj) for obj in value]
+                    blobs.extend(digests)
+                    manifest[field] = {BLOB_KEY: digests}
+                else:
+                    manifest[field] = value
+            manifest_path = self._manifest_path(tsg_id, version_num)
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            encoded = orjson.dumps(manifest)
+            self._atomic_write(manifest_path, encoded)
+            entry = {'last_access': time.time(), 'size': len(encoded), 'blobs': sorted(set(blobs))}
+            for digest in entry['blobs']:
+                self._index['refs'][digest] = self._index['refs'].get(digest, 0) + 1
+            # references of a replaced entry go after the new ones so shared blobs stay
+            self._drop(key, keep_manifest=True)
+            self._index['versions'][key] = entry
+            self._evict()
+            self._save_index()
+
+    def flush(self) -> None:
+        """Writes access times of hits since the last index write"""
+        if not self._accessed:
+            return
+        try:
+            with self._locked():
+                self._save_index()
+        except OSError as err:
+            print(f"WARNING: unable to save cache access times {type(err).__name__}: {err}")
+
+    def size(self) -> int:
+        """Bytes used by manifests and unique blobs
+
+        Returns:
+            int: bytes
+        """
+        manifests = sum(entry['size'] for entry in self._index['versions'].values())
+        return manifests + sum(self._index['blobs'].values())
+
+    def clear(self) -> None:
+        """Removes everything in the store"""
+        with self._locked():
+            for name in ("blobs", "versions"):
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+                os.makedirs(os.path.join(self.cache_dir, name), exist_ok=True)
+            self._index = {'versions': {}, 'blobs': {}, 'refs': {}}
+            self._save_index()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Holds the index exclusively across threads and processes and brings the
+         in memory copy up to date with index.json first
+        """
+        with self._lock:
+            file_desc = os.open(os.path.join(self.cache_dir, "index.lock"),
+                                os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(file_desc, fcntl.LOCK_EX)
+                if self._stat_index() != self._index_stat:
+                    self._index = self._load_index()
+                yield
+            finally:
+                os.close(file_desc)
+
+    def _evict(self) -> None:
+        """Evict least recently used versions until under the size cap"""
+        self._apply_access()
+        by_access = sorted(self._index['versions'], key=lambda k: self._index['versions'][k][
+            'last_access'])
+        while self.size() > self.max_bytes and len(by_access) > 1:
+            self._drop(by_access.pop(0))
+
+    def _drop(self, key: str, keep_manifest: bool = False) -> None:
+        """Remove a version and any blob it was the last reference to"""
+        entry = self._index['versions'].pop(key, None)
+        if entry is None:
+            return
+        if not keep_manifest:
+            tsg_id, version_num = key.split('/', 1)
+            try:
+                os.remove(self._manifest_path(tsg_id, version_num))
+            except OSError:
+                pass
+        for digest in entry['blobs']:
+            refs = self._index['refs'].get(digest, 0) - 1
+            if refs > 0:
+                self._index['refs'][digest] = refs
+                continue
+            self._index['refs'].pop(digest, None)
+            self._index['blobs'].pop(digest, None)
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+    def _write_blob(self, obj: dict) -> str:
+        encoded = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        digest = hashlib.sha256(encoded).hexdigest()
+        if digest not in self._index['blobs']:
+            path = self._blob_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._atomic_write(path, encoded)
+            self._index['blobs'][digest] = len(encoded)
+        return digest
+
+    def _load_index(self) -> Dict[str, Any]:
+        self._index_stat = self._stat_index()
+        try:
+            index = self._read(os.path.join(self.cache_dir, "index.json"))
+            if isinstance(index, dict) and 'versions' in index and 'blobs' in index:
+                if 'refs' not in index:
+                    # written before reference counts were kept
+                    index['refs'] = {}
+                    for entry in index['versions'].values():
+                        for digest in entry['blobs']:
+                            index['refs'][digest] = index['refs'].get(digest, 0) + 1
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'versions': {}, 'blobs': {}, 'refs': {}}
+
+    def _apply_access(self) -> None:
+        for key, accessed in self._accessed.items():
+            entry = self._index['versions'].get(key)
+            if entry is not None and accessed > entry['last_access']:
+                entry['last_access'] = accessed
+        self._accessed.clear()
+
+    def _save_index(self) -> None:
+        self._apply_access()
+        self._atomic_write(os.path.join(self.cache_dir, "index.json"), orjson.dumps(self._index))
+        self._index_stat = self._stat_index()
+
+    def _stat_index(self) -> tuple:
+        try:
+            stat = os.stat(os.path.join(self.cache_dir, "index.json"))
+        except OSError:
+            return ()
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _manifest_path(self, tsg_id: str, version_num: str) -> str:
+        return os.path.join(self.cache_dir, "versions", str(tsg_id), f"{version_num}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    @staticmethod
+    def _key(tsg_id: str, version_num: str) -> str:
+        return f"{tsg_id}/{version_num}"
+
+    @staticmethod
+    def _read(path: str) -> Any:
+        with open(path, 'rb') as cache_file:
+            return orjson.loads(cache_file.read())
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as cache_file:
+            cache_file.write(data)
+        os.replace(tmp_path, path)
+
+
+def config_version_cache() -> ConfigVersionCache:
+    """Shared cache in config.CACHE_DIR used when cache=True is passed
+
+    Returns:
+        ConfigVersionCache: default cache
+    """
+    global _DEFAULT_CACHE  # pylint: disable=global-statement
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ConfigVersionCache()
+    return _DEFAULT_CACHE
@@ -2,13 +2,14 @@
 """configurations"""
 
 import os
+import threading
 import time
 
-import requests
 import orjson
 
 from prismasase.exceptions import SASEAuthError
 from prismasase.statics import URL_BASE
+from prismasase.transport import Transport, default_transport
 
 class Auth:
     """Authorization to SASE API and refresh Decorator
@@ -31,13 +32,20 @@ class Auth:
             verify (str|bool, optional): sets request to verify with a custom cert
              bypass verification or verify with standard library. Defaults to True
             timeout (int, optional): sets API call timeout. Defaults to 60
+            transport (Transport, optional): sends this tenant's requests.
+             Defaults to the process wide default_transport()
+            middleware (MiddlewareChain, optional): stages this tenant's requests pass
+             through. Defaults to the process wide default_middleware()
         """
         self.tsg_id = tsg_id
         self.client_id = client_id
         self.client_secret = client_secret
         self.verify = kwargs.get('verify', True)
         self.timeout: int = kwargs.get('timeout', 60)
+        self.transport: Transport = kwargs.get('transport') or default_transport()
+        self.middleware = kwargs.get('middleware')
         self.access_token_expiration = time.time()
+        self.lock = threading.Lock()
         self.token = self.get_token()
 
     def get_token(self) -> str:
@@ -53,8 +61,8 @@ class Auth:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = f"grant_type=client_credentials&scope=tsg_id:{self.tsg_id}"
         auth = (self.client_id, self.client_secret)
-        response = requests.post(url=url, headers=headers, data=data,
-                                 auth=auth, timeout=self.timeout, verify=self.verify)
+        response = self.transport.request(method='POST', url=url, headers=headers, data=data,
+                                          auth=auth, timeout=self.timeout, verify=self.verify)
         token = ""
         if response.status_code == 200:
             response = response.json()
@@ -69,33 +77,19 @@ class Auth:
         self.token = token
         return token
 
-    class Decorators():
-        """Decorators
+    def refresh_expired(self) -> str:
+        """Regenerates the bearer token once it expired; threads sharing the Auth
+         regenerate it once
 
         Returns:
-            _type_: _description_
+            str: current bearer token
         """
-        @staticmethod
-        def refresh_token(decorated):
-            """refreshes token"""
-            def wrapper(token: Auth, *args, **kwargs):
-                if time.time() > token.access_token_expiration:
-                    # regenerate token and reset timmer
-                    token.get_token()
-                # send back just token from auth class
-                return decorated(token.token, *args, **kwargs)
-            return wrapper
-
-
-def refresh_token(decorated):
-    """refreshes token"""
-    def wrapper(token: Auth, *args, **kwargs):
-        if time.time() > token.access_token_expiration:
-            # regenerate token and reset timmer
-            token.get_token()
-        # send back just token from auth class
-        return decorated(token.token, *args, **kwargs)
-    return wrapper
+        if time.time() > self.access_token_expiration:
+            with self.lock:
+                if time.time() > self.access_token_expiration:
+                    self.get_token()
+        return self.token
+
 
 class Config:
     """
@@ -138,6 +132,15 @@ class Config:
     }
     LIMIT: int = int(os.environ.get("LIMIT", "100"))
     OFFSET: int = int(os.environ.get("OFFSET", "0"))
+    CACHE_DIR: str = os.environ.get("CACHE_DIR", os.path.expanduser("~/.cache/prismasase"))
+    TRACK_CHANGES: bool = os.environ.get("TRACK_CHANGES", "false").lower() == "true"
+    # requests per second per tenant for the rate_limit and priority stages
+    RATE_LIMIT: float = float(os.environ.get("RATE_LIMIT", "10"))
+    # middleware stages around every request, outermost first
+    MIDDLEWARE: str = os.environ.get("MIDDLEWARE", "logging,single_flight,retry,auth,priority")
+    # parse list pages incrementally instead of loading each page whole; streamed pages
+    # only pass the retry, rate_limit, priority and auth stages of the middleware chain
+    STREAM_LISTS: bool = os.environ.get("STREAM_LISTS", "false").lower() == "true"
 
     def to_dict(self) -> dict:
         """returns configs as a dict
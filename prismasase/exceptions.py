@@ -38,3 +38,12 @@ class SASEAutoTagExists(SASEAutoTagError):
 
 class SASEAutoTagTooLong(SASEAutoTagError):
     """Problem arrises when filter is too long"""
+
+class SASEConflictError(SASEBadParam):
+    """Overlapping subnets or duplicate addresses across sites"""
+
+class SASEPreflightError(SASEBadParam):
+    """Inventory failed preflight validation"""
+
+class SASEReplayError(SASEError):
+    """Request cannot be served from a cassette"""
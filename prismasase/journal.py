@@ -0,0 +1,135 @@
+# pylint: disable=no-member
+"""Write-ahead Journal for Resumable Bulk Operations"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+
+# never hashed into the row digest
+JOURNAL_IGNORE_FIELDS = ('auth', 'journal', 'optimistic')
+
+
+class Journal:
+    """Append-only JSONL journal of completed steps. Each line records one finished
+     step of one item (for a remote network: ike_gateway, ipsec_tunnel, remote_network)
+     with the id and name the API returned, so a rerun can resume at the exact step
+     where the previous run stopped. Only ids and names are written, never payloads,
+     so secrets such as pre-shared keys stay out of the file.
+    """
+
+    def __init__(self, path: str, sync: bool = True):
+        """Opens or creates the journal and replays existing entries
+
+        Args:
+            path (str): journal file
+            sync (bool, optional): fsync after every entry. Defaults to True
+        """
+        self.path = os.path.expanduser(path)
+        self.sync = sync
+        self._lock = threading.Lock()
+        self._steps: Dict[str, Dict[str, Any]] = {}
+        self._digests: Dict[str, str] = {}
+        if os.path.exists(self.path):
+            self._replay()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, 'ab')  # pylint: disable=consider-using-with
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def digest(item: Dict[str, Any]) -> str:
+        """Digest of an item's arguments; journaled steps only apply while it matches
+
+        Args:
+            item (Dict[str, Any]): row arguments
+
+        Returns:
+            str: _description_
+        """
+        item = {key: value for key, value in item.items() if key not in JOURNAL_IGNORE_FIELDS}
+        return hashlib.blake2b(orjson.dumps(item, option=orjson.OPT_SORT_KEYS,
+                                            default=str),
+                               digest_size=16).hexdigest()
+
+    def completed(self, key: str, digest: str = '') -> Dict[str, Dict[str, Any]]:
+        """Steps already completed for an item
+
+        Args:
+            key (str): item name
+            digest (str, optional): Journal.digest of the item; if the item changed
+             since it was journaled nothing counts as completed
+
+        Returns:
+            Dict[str, Dict[str, Any]]: step to {'id', 'name'}
+        """
+        with self._lock:
+            if digest and self._digests.get(key, digest) != digest:
+                return {}
+            return dict(self._steps.get(key, {}))
+
+    def record(self, key: str, step: str, result: Dict[str, Any], digest: str = '') -> None:
+        """Appends a completed step; written through before returning
+
+        Args:
+            key (str): item name
+            step (str): step name
+            result (Dict[str, Any]): API response of the step; only id and name are kept
+            digest (str, optional): Journal.digest of the item
+        """
+        entry = {'ts': time.time(), 'key': key, 'step': step, 'digest': digest,
+                 'id': result.get('id', ''), 'name': result.get('name', '')}
+        line = orjson.dumps(entry) + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            self._apply(entry)
+
+    def close(self) -> None:
+        """Closes the journal file"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        key = entry['key']
+        if entry.get('digest') and self._digests.get(key) not in (None, entry['digest']):
+            # item changed between runs; earlier steps no longer apply
+            self._steps.pop(key, None)
+        if entry.get('digest'):
+            self._digests[key] = entry['digest']
+        self._steps.setdefault(key, {})[entry['step']] = {'id': entry['id'],
+                                                         'name': entry['name']}
+
+    def _replay(self) -> None:
+        with open(self.path, 'rb') as journal_file:
+            for line in journal_file:
+                try:
+                    self._apply(orjson.loads(line))
+                except (orjson.JSONDecodeError, KeyError):
+                    # a torn final line from a crash mid write
+                    print(f"WARNING: skipping unreadable journal entry in {self.path}")
+
+
+def journal_open(journal: Optional[Any]) -> Optional[Journal]:
+    """Accepts a Journal or a path to one
+
+    Args:
+        journal (Journal|str|None): _description_
+
+    Returns:
+        Optional[Journal]: _description_
+    """
+    if journal is None or isinstance(journal, Journal):
+        return journal
+    return Journal(str(journal))
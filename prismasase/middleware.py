@@ -0,0 +1,799 @@
+"""Middleware Chain wrapped around every prisma_request"""
+
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import email.utils
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from prismasase import config
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.transport import StreamedResponse, Transport, TransportResponse
+
+_DEFAULT_CHAIN: Optional["MiddlewareChain"] = None
+_DEFAULT_LOCK = threading.Lock()
+
+CallNext = Callable[["Request"], TransportResponse]
+
+# share of the rate limit each priority class gets while every class has requests queued
+PRIORITY_WEIGHTS: Dict[str, float] = {'interactive': 16.0, 'normal': 4.0, 'bulk': 1.0}
+# priority of requests that do not pass one; set with `with priority_lane('bulk'):`
+request_priority: ContextVar[str] = ContextVar('request_priority', default='normal')
+# stages that only look at the status and headers, so streamed responses pass them too
+STREAM_STAGES = ('auth', 'priority', 'rate_limit', 'retry')
+
+
+@contextmanager
+def priority_lane(priority: str) -> Iterator[None]:
+    """Send every request made inside the block with this priority. Context variables
+     are not copied into ThreadPoolExecutor workers, so enter it inside the worker.
+
+    Args:
+        priority (str): 'interactive'|'normal'|'bulk'
+
+    Yields:
+        Iterator[None]: _description_
+    """
+    token = request_priority.set(priority)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class Request:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """One API call as it passes through the middleware chain"""
+
+    def __init__(self, method: str, url: str, url_type: str, **kwargs):
+        """_summary_
+
+        Args:
+            method (str): HTTP method
+            url (str): full url
+            url_type (str): key of config.REST_API
+            headers (dict, Optional): _description_
+            params (dict, Optional): query parameters
+            data (str, Optional): body
+            verify (str|bool, Optional): TLS verification. Defaults to True
+            timeout (int, Optional): Defaults to 90
+            auth (Auth, Optional): tenant the request is sent for
+            priority (str, Optional): priority class. Defaults to request_priority
+            transport (Transport, Optional): set by MiddlewareChain.send when not given
+        """
+        self.method = method.upper()
+        self.url = url
+        self.url_type = url_type
+        self.headers: Dict[str, str] = kwargs.get('headers') or {}
+        self.params: Dict[str, Any] = kwargs.get('params') or {}
+        self.data = kwargs.get('data')
+        self.verify = kwargs.get('verify', True)
+        self.timeout = kwargs.get('timeout', 90)
+        self.auth: Optional[Auth] = kwargs.get('auth')
+        self.tsg_id = str(self.auth.tsg_id) if self.auth else ''
+        self.transport: Optional[Transport] = kwargs.get('transport')
+        self.priority: str = kwargs.get('priority') or request_priority.get()
+        # scratch space shared by stages; 'waited' is time spent sleeping on purpose
+        self.context: Dict[str, Any] = {'waited': 0.0}
+
+
+class Middleware:
+    """A stage of the chain. Override before/after/error for simple stages or
+     __call__ to control the call itself (retries). before() may return a response to
+     short-circuit the rest of the chain, error() may return one to recover.
+    """
+    name = "middleware"
+
+    def __call__(self, request: Request, call_next: CallNext) -> TransportResponse:
+        response = self.before(request)
+        if response is not None:
+            return response
+        try:
+            response = call_next(request)
+        except Exception as err:  # pylint: disable=broad-except
+            response = self.error(request, err)
+            if response is None:
+                raise
+        return self.after(request, response)
+
+    def before(self, request: Request) -> Optional[TransportResponse]:  # pylint: disable=unused-argument
+        """Runs before the request is passed on
+
+        Args:
+            request (Request): _description_
+
+        Returns:
+            Optional[TransportResponse]: a response to short-circuit the chain
+        """
+        return None
+
+    def after(self, request: Request, response: TransportResponse) -> TransportResponse:  # pylint: disable=unused-argument
+        """Runs on the response on its way back
+
+        Args:
+            request (Request): _description_
+            response (TransportResponse): _description_
+
+        Returns:
+            TransportResponse: _description_
+        """
+        return response
+
+    def error(self, request: Request, err: Exception) -> Optional[TransportResponse]:  # pylint: disable=unused-argument
+        """Runs when a later stage or the transport raised
+
+        Args:
+            request (Request): _description_
+            err (Exception): _description_
+
+        Returns:
+            Optional[TransportResponse]: a response to recover, None to re-raise
+        """
+        return None
+
+
+class AuthRefreshMiddleware(Middleware):
+    """Refreshes the bearer token before it expires and once more on a 401"""
+    name = "auth"
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        if request.auth is not None and time.time() > request.auth.access_token_expiration:
+            self._refresh(request, request.auth.access_token_expiration)
+        return None
+
+    def __call__(self, request: Request, call_next: CallNext) -> TransportResponse:
+        self.before(request)
+        expiration = request.auth.access_token_expiration if request.auth else 0.0
+        response = call_next(request)
+        if response.status_code == 401 and request.auth is not None:
+            print(f"INFO: 401 from {request.url_type}; refreshing token")
+            _discard(response)
+            self._refresh(request, expiration)
+            response = call_next(request)
+        return response
+
+    @staticmethod
+    def _refresh(request: Request, seen_expiration: float) -> None:
+        auth: Auth = request.auth  # type: ignore
+        # regenerate once when shared across threads
+        with auth.lock:
+            if auth.access_token_expiration == seen_expiration:
+                auth.get_token()
+        request.headers['authorization'] = f"Bearer {auth.token}"
+
+
+class RetryMiddleware(Middleware):
+    """Retries idempotent requests on throttling, 5xx and connection errors with
+     exponential backoff; a Retry-After header is honoured
+    """
+    name = "retry"
+
+    def __init__(self, retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+                 statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 methods: Iterable[str] = ('GET', 'PUT', 'DELETE')):
+        """_summary_
+
+        Args:
+            retries (int, optional): Defaults to 3
+            backoff (float, optional): first delay in seconds, doubled per attempt
+            max_backoff (float, optional): Defaults to 30.0
+            statuses (Iterable[int], optional): statuses that are retried
+            methods (Iterable[str], optional): methods that are safe to resend
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = set(statuses)
+        self.methods = {method.upper() for method in methods}
+
+    def __call__(self, request: Request, call_next: CallNext) -> TransportResponse:
+        attempt = 0
+        while True:
+            try:
+                response = call_next(request)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                if request.method not in self.methods or attempt >= self.retries:
+                    raise
+                print(f"WARNING: {type(err).__name__} on {request.method} {request.url_type}; "
+                      f"retry {attempt + 1}/{self.retries}")
+                self._sleep(request, self._delay(attempt, None))
+                attempt += 1
+                continue
+            if (response.status_code not in self.statuses or attempt >= self.retries or
+                    request.method not in self.methods):
+                return response
+            print(f"WARNING: {response.status_code} on {request.method} {request.url_type}; "
+                  f"retry {attempt + 1}/{self.retries}")
+            _discard(response)
+            self._sleep(request, self._delay(attempt, response.headers.get('Retry-After') or
+                                             response.headers.get('retry-after')))
+            attempt += 1
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                return min(self.max_backoff, max(0.0, when.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    @staticmethod
+    def _sleep(request: Request, delay: float) -> None:
+        request.context['waited'] += delay
+        time.sleep(delay)
+
+
+class RateLimitMiddleware(Middleware):
+    """Token bucket per tenant; blocks until a request may be sent"""
+    name = "rate_limit"
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 20):
+        """_summary_
+
+        Args:
+            rate (float, optional): requests per second per tenant. Defaults to config.RATE_LIMIT
+            burst (int, optional): bucket size. Defaults to 20
+        """
+        self.rate = float(rate or config.RATE_LIMIT)
+        self.burst = int(burst)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(request.tsg_id, (float(self.burst), now))
+                tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[request.tsg_id] = (tokens - 1, now)
+                    return None
+                self._buckets[request.tsg_id] = (tokens, now)
+                delay = (1 - tokens) / self.rate
+            request.context['waited'] += delay
+            time.sleep(delay)
+
+
+class _Lanes:  # pylint: disable=too-few-public-methods
+    """One tenant's token bucket with a FIFO queue per priority class"""
+
+    def __init__(self, rate: float, burst: int, weights: Dict[str, float]):
+        self.rate = rate
+        self.burst = burst
+        self.weights = weights
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.clock = 0.0
+        self.tags: Dict[str, float] = {lane: 0.0 for lane in weights}
+        self.queues: Dict[str, Deque[object]] = {lane: deque() for lane in weights}
+        self.condition = threading.Condition()
+
+    def acquire(self, lane: str) -> float:
+        """Blocks until the request is at the head of the lane picked next and a token
+         is free; returns the seconds waited
+
+        Args:
+            lane (str): _description_
+
+        Returns:
+            float: _description_
+        """
+        started = time.monotonic()
+        ticket = object()
+        with self.condition:
+            queue = self.queues[lane]
+            if not queue:
+                # an idle lane does not bank credit for the time it had nothing to send
+                self.tags[lane] = max(self.tags[lane], self.clock)
+            queue.append(ticket)
+            while True:
+                now = time.monotonic()
+                self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                head = self._next()
+                if head == lane and queue[0] is ticket and self.tokens >= 1:
+                    self.tokens -= 1
+                    queue.popleft()
+                    # start time fair queuing: the lane's next request is due 1/weight later
+                    self.clock = self.tags[lane]
+                    self.tags[lane] += 1 / self.weights[lane]
+                    self.condition.notify_all()
+                    return now - started
+                if head == lane and queue[0] is ticket:
+                    self.condition.wait((1 - self.tokens) / self.rate)
+                else:
+                    self.condition.wait()
+
+    def _next(self) -> str:
+        return min((lane for lane, queue in self.queues.items() if queue),
+                   key=lambda lane: (self.tags[lane], -self.weights[lane]))
+
+
+class PriorityMiddleware(Middleware):
+    """Shares a tenant's rate limit between priority classes. Requests wait in a queue
+     per class and, while several classes are waiting, tokens are handed out in
+     proportion to the class weights (weighted fair queuing), so a single interactive
+     call is sent next rather than after every queued bulk request. Use it instead of
+     rate_limit, not as well.
+    """
+    name = "priority"
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 20,
+                 weights: Optional[Dict[str, float]] = None):
+        """_summary_
+
+        Args:
+            rate (float, optional): requests per second per tenant. Defaults to config.RATE_LIMIT
+            burst (int, optional): bucket size. Defaults to 20
+            weights (Dict[str, float], optional): weight per priority class.
+             Defaults to PRIORITY_WEIGHTS
+        """
+        self.rate = float(rate or config.RATE_LIMIT)
+        self.burst = int(burst)
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise SASEBadParam(f"message=\"priority weights must be positive\"|{weights=}")
+        self._lanes: Dict[str, _Lanes] = {}
+        self._stats: Dict[str, List[float]] = {lane: [0, 0.0] for lane in self.weights}
+        self._lock = threading.Lock()
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        if request.priority not in self.weights:
+            raise SASEBadParam(f"message=\"unknown priority\"|priority={request.priority}|"
+                               f"choices={','.join(self.weights)}")
+        with self._lock:
+            lanes = self._lanes.get(request.tsg_id)
+            if lanes is None:
+                lanes = self._lanes[request.tsg_id] = _Lanes(self.rate, self.burst, self.weights)
+        waited = lanes.acquire(request.priority)
+        request.context['waited'] += waited
+        with self._lock:
+            self._stats[request.priority][0] += 1
+            self._stats[request.priority][1] += waited
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Requests sent and time spent queued per priority class
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {'bulk': {'requests': 0, 'waited': 0.0, 'avg_wait_ms': 0.0}}
+        """
+        with self._lock:
+            return {lane: {'requests': int(count), 'waited': round(waited, 6),
+                           'avg_wait_ms': round(waited / count * 1000, 3) if count else 0.0}
+                    for lane, (count, waited) in self._stats.items()}
+
+
+class CacheMiddleware(Middleware):
+    """Serves repeated GETs from memory for `ttl` seconds. Any successful write to
+     a url type drops the cached GETs of that url type.
+    """
+    name = "cache"
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        """_summary_
+
+        Args:
+            ttl (float, optional): seconds a response is served. Defaults to 30.0
+            max_entries (int, optional): least recently used entries beyond this are
+             dropped. Defaults to 1024
+        """
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, Tuple[float, TransportResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        if request.method != 'GET':
+            return None
+        key = self._key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() > entry[0]:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            cached = entry[1]
+        # a new response so callers mutating the decoded body do not change the cache
+        return TransportResponse(status_code=cached.status_code, content=cached.content,
+                                 headers=cached.headers, wire_bytes=0)
+
+    def after(self, request: Request, response: TransportResponse) -> TransportResponse:
+        with self._lock:
+            if request.method != 'GET':
+                if response.status_code < 400:
+                    for key in [key for key in self._entries if key[1] == request.url_type]:
+                        del self._entries[key]
+            elif response.status_code == 200:
+                self._entries[self._key(request)] = (time.monotonic() + self.ttl, response)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return response
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _key(request: Request) -> tuple:
+        return (request.tsg_id, request.url_type, request.url,
+                tuple(sorted((str(key), str(value)) for key, value in request.params.items())))
+
+
+class _Flight:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[TransportResponse] = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlightMiddleware(Middleware):
+    """Coalesces identical GETs that are in flight at the same time: the first caller
+     sends the request and every caller that arrives before it returns gets a copy of
+     the same response (or exception). Keyed by the Auth and transport objects, url
+     type, url and params, so two Auths for one tenant with different credentials or
+     transports never share a response. A write to a url type stops later GETs from
+     joining reads that started before it.
+    """
+    name = "single_flight"
+
+    def __init__(self):
+        self.requests = 0
+        self.shared = 0
+        self._flights: Dict[tuple, _Flight] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, request: Request, call_next: CallNext) -> TransportResponse:
+        if request.method != 'GET':
+            with self._lock:
+                generation = (request.tsg_id, request.url_type)
+                self._generations[generation] = self._generations.get(generation, 0) + 1
+            return call_next(request)
+        with self._lock:
+            key = (request.tsg_id, id(request.auth), id(request.transport), request.url_type,
+                   self._generations.get((request.tsg_id, request.url_type), 0), request.url,
+                   tuple(sorted((str(key), str(value)) for key, value in request.params.items())))
+            self.requests += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            response: TransportResponse = flight.response  # type: ignore
+            # a copy so callers mutating the decoded body do not affect each other
+            return TransportResponse(status_code=response.status_code, content=response.content,
+                                     headers=response.headers, elapsed=response.elapsed,
+                                     wire_bytes=0)
+        try:
+            flight.response = call_next(request)
+            return flight.response
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """How many GETs were served by another caller's request
+
+        Returns:
+            Dict[str, Any]: requests, shared, hit_rate
+        """
+        with self._lock:
+            return {'requests': self.requests, 'shared': self.shared,
+                    'hit_rate': round(self.shared / self.requests, 4) if self.requests else 0.0}
+
+
+class MetricsMiddleware(Middleware):
+    """Counts requests, latency and bytes per url type, method and status. wire_bytes
+     is the response body as received (compressed) and body_bytes after decoding,
+     so the saving from compression is body_bytes - wire_bytes.
+    """
+    name = "metrics"
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, str, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        request.context['metrics_started'] = time.perf_counter()
+        return None
+
+    def after(self, request: Request, response: TransportResponse) -> TransportResponse:
+        self._add(request, response.status_code, response.wire_bytes, len(response.content))
+        return response
+
+    def error(self, request: Request, err: Exception) -> Optional[TransportResponse]:
+        self._add(request, 0, 0, 0)
+        return None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Metrics so far; status 0 counts requests that raised
+
+        Returns:
+            List[Dict[str, Any]]: [{'url_type','method','status','count','seconds','avg_ms',
+             'sent_bytes','wire_bytes','body_bytes'}]
+        """
+        with self._lock:
+            return [{'url_type': url_type, 'method': method, 'status': status,
+                     'count': int(count), 'seconds': round(seconds, 6),
+                     'avg_ms': round(seconds / count * 1000, 3), 'sent_bytes': int(sent),
+                     'wire_bytes': int(wire), 'body_bytes': int(body)}
+                    for (url_type, method, status), (count, seconds, sent, wire, body)
+                    in sorted(self._metrics.items())]
+
+    def _add(self, request: Request, status: int, wire: int, body: int) -> None:
+        elapsed = time.perf_counter() - request.context.get('metrics_started', time.perf_counter())
+        with self._lock:
+            metric = self._metrics.setdefault((request.url_type, request.method, status),
+                                              [0, 0.0, 0, 0, 0])
+            metric[0] += 1
+            metric[1] += elapsed
+            metric[2] += len(request.data or b'')
+            metric[3] += wire
+            metric[4] += body
+
+
+class LoggingMiddleware(Middleware):
+    """Reports failed requests; with verbose=True every request"""
+    name = "logging"
+
+    def __init__(self, verbose: bool = False):
+        """_summary_
+
+        Args:
+            verbose (bool, optional): log each request. Defaults to False
+        """
+        self.verbose = verbose
+
+    def before(self, request: Request) -> Optional[TransportResponse]:
+        request.context['logging_started'] = time.perf_counter()
+        return None
+
+    def after(self, request: Request, response: TransportResponse) -> TransportResponse:
+        elapsed = time.perf_counter() - request.context['logging_started']
+        if response.status_code >= 400:
+            print(f"WARNING: {request.method} {request.url} params={request.params} "
+                  f"status={response.status_code} response={response.content[:500]!r}")
+        elif self.verbose:
+            print(f"INFO: {request.method} {request.url} status={response.status_code} "
+                  f"elapsed={elapsed:.3f}s")
+        return response
+
+    def error(self, request: Request, err: Exception) -> Optional[TransportResponse]:
+        print(f"ERROR: {request.method} {request.url} {type(err).__name__}: {err}")
+        return None
+
+
+MIDDLEWARE_STAGES: Dict[str, Callable[[], Middleware]] = {
+    'auth': AuthRefreshMiddleware,
+    'cache': CacheMiddleware,
+    'logging': LoggingMiddleware,
+    'metrics': MetricsMiddleware,
+    'priority': PriorityMiddleware,
+    'rate_limit': RateLimitMiddleware,
+    'retry': RetryMiddleware,
+    'single_flight': SingleFlightMiddleware,
+}
+
+
+class MiddlewareChain:
+    """Ordered stages between prisma_request and the transport; the first stage is the
+     outermost. The time spent in the stages themselves (not in the transport or in
+     deliberate waits such as backoff) is measured per request.
+    """
+
+    def __init__(self, stages: Iterable[Middleware] = ()):
+        """_summary_
+
+        Args:
+            stages (Iterable[Middleware], optional): outermost first
+        """
+        self.stages: List[Middleware] = list(stages)
+        self._requests = 0
+        self._overhead = 0.0
+        self._overhead_max = 0.0
+        self._transport = 0.0
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> Optional[Middleware]:
+        """First stage with the name
+
+        Args:
+            name (str): _description_
+
+        Returns:
+            Optional[Middleware]: _description_
+        """
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        return None
+
+    def insert(self, stage: Middleware, before: str = "", after: str = "") -> None:
+        """Add a stage relative to a named one, or innermost when neither is given
+
+        Args:
+            stage (Middleware): _description_
+            before (str, optional): name of the stage to go in front of
+            after (str, optional): name of the stage to follow
+        """
+        names = [existing.name for existing in self.stages]
+        if before in names:
+            self.stages.insert(names.index(before), stage)
+        elif after in names:
+            self.stages.insert(names.index(after) + 1, stage)
+        else:
+            self.stages.append(stage)
+
+    def remove(self, name: str) -> None:
+        """Remove every stage with the name
+
+        Args:
+            name (str): _description_
+        """
+        self.stages = [stage for stage in self.stages if stage.name != name]
+
+    def send(self, request: Request, transport: Transport) -> TransportResponse:
+        """Run the request through every stage and the transport
+
+        Args:
+            request (Request): _description_
+            transport (Transport): _description_
+
+        Returns:
+            TransportResponse: _description_
+        """
+        started = time.perf_counter()
+        in_transport = [0.0]
+        if request.transport is None:
+            request.transport = transport
+
+        def terminal(request: Request) -> TransportResponse:
+            sent = time.perf_counter()
+            try:
+                return transport.request(method=request.method, url=request.url,
+                                         headers=request.headers, params=request.params,
+                                         data=request.data, verify=request.verify,
+                                         timeout=request.timeout)
+            finally:
+                in_transport[0] += time.perf_counter() - sent
+
+        call: CallNext = terminal
+        for stage in reversed(self.stages):
+            call = _bind(stage, call)
+        try:
+            return call(request)
+        finally:
+            overhead = max(0.0, time.perf_counter() - started - in_transport[0] -
+                           request.context['waited'])
+            with self._lock:
+                self._requests += 1
+                self._overhead += overhead
+                self._overhead_max = max(self._overhead_max, overhead)
+                self._transport += in_transport[0]
+
+    def stream(self, request: Request, transport: Transport) -> StreamedResponse:
+        """Open a streamed response through the STREAM_STAGES of the chain; the other
+         stages need the whole body and are skipped
+
+        Args:
+            request (Request): _description_
+            transport (Transport): _description_
+
+        Returns:
+            StreamedResponse: _description_
+        """
+        if request.transport is None:
+            request.transport = transport
+
+        def terminal(request: Request) -> StreamedResponse:
+            return transport.stream(method=request.method, url=request.url,
+                                    headers=request.headers, params=request.params,
+                                    verify=request.verify, timeout=request.timeout)
+
+        # the stages only read status_code and headers, which both responses have
+        call: CallNext = terminal  # type: ignore
+        for stage in reversed([stage for stage in self.stages if stage.name in STREAM_STAGES]):
+            call = _bind(stage, call)
+        return call(request)  # type: ignore
+
+    def stats(self) -> Dict[str, Any]:
+        """Per request cost of the chain
+
+        Returns:
+            Dict[str, Any]: requests, overhead_avg_us, overhead_max_us, transport_avg_ms
+        """
+        with self._lock:
+            count = self._requests or 1
+            return {'stages': [stage.name for stage in self.stages],
+                    'requests': self._requests,
+                    'overhead_avg_us': round(self._overhead / count * 1e6, 2),
+                    'overhead_max_us': round(self._overhead_max * 1e6, 2),
+                    'transport_avg_ms': round(self._transport / count * 1e3, 3)}
+
+
+def _bind(stage: Middleware, call_next: CallNext) -> CallNext:
+    return lambda request: stage(request, call_next)
+
+
+def _discard(response: Any) -> None:
+    # a streamed response holds its connection until closed
+    if isinstance(response, StreamedResponse):
+        response.close()
+
+
+def middleware_chain(stages: Union[str, Iterable[Union[str, Middleware]]] = "") -> MiddlewareChain:
+    """Build a chain from stage names and/or instances, outermost first
+
+    Args:
+        stages (str|Iterable, optional): e.g.
+         "logging,metrics,cache,single_flight,retry,auth,rate_limit".
+         Defaults to config.MIDDLEWARE
+
+    Raises:
+        SASEBadParam: unknown stage name
+
+    Returns:
+        MiddlewareChain: _description_
+    """
+    if isinstance(stages, str):
+        stages = [name.strip() for name in (stages or config.MIDDLEWARE).split(',')
+                  if name.strip()]
+    built: List[Middleware] = []
+    for stage in stages:
+        if isinstance(stage, Middleware):
+            built.append(stage)
+        elif stage in MIDDLEWARE_STAGES:
+            built.append(MIDDLEWARE_STAGES[stage]())
+        else:
+            raise SASEBadParam(f"message=\"unknown middleware stage\"|{stage=}|"
+                               f"choices={','.join(sorted(MIDDLEWARE_STAGES))}")
+    return MiddlewareChain(built)
+
+
+def default_middleware() -> MiddlewareChain:
+    """Chain used when an Auth does not name one; built from config.MIDDLEWARE
+
+    Returns:
+        MiddlewareChain: _description_
+    """
+    global _DEFAULT_CHAIN  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CHAIN is None:
+            _DEFAULT_CHAIN = middleware_chain(config.MIDDLEWARE)
+        return _DEFAULT_CHAIN
+
+
+def set_default_middleware(chain: MiddlewareChain) -> None:
+    """Replace the process wide default chain
+
+    Args:
+        chain (MiddlewareChain): _description_
+    """
+    global _DEFAULT_CHAIN  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        _DEFAULT_CHAIN = chain
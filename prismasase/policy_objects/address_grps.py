@@ -1,10 +1,16 @@
 """Address Group"""
 
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
 from prismasase import return_auth
 from prismasase.configs import Auth
-from prismasase.restapi import prisma_request
+from prismasase.exceptions import (SASEBadParam, SASEMissingParam, SASEObjectExists)
+from prismasase.restapi import prisma_request, prisma_request_iter
 from prismasase.statics import FOLDER
-from prismasase.utilities import default_params
+from prismasase.utilities import check_name_length, default_params
+
+from .tag_filter import TagFilter, compile_tag_filter
+from .tags import tags_exist
 
 
 def address_grp_list(folder: str, **kwargs) -> dict:
@@ -31,17 +37,330 @@ def address_grp_list(folder: str, **kwargs) -> dict:
     return response
 
 
-def addresses_grp_create():
-    pass
+def addresses_grp_create(name: str, folder: str, **kwargs) -> dict:
+    """Create Address Group verifies the group does not already exist
+
+    Args:
+        name (str): _description_
+        folder (str): _description_
+        static (list, Optional|Required): address names for a static group
+        dynamic_filter (str, Optional|Required): tag filter for a dynamic group
+         example: "'web' and ('prod' or 'dr')"
+        tag (list, Optional): tags to add to the group itself
+        description (str, Optional): description
+
+    Raises:
+        SASEObjectExists: Error raised when object already exists; use edit
+
+    Returns:
+        dict: sample response
+        {
+            'id': '...',
+            'name': 'web-servers',
+            'folder': 'Shared',
+            'dynamic': {'filter': "'web' and 'prod'"}
+        }
+    """
+    auth: Auth = return_auth(**kwargs)
+    params = FOLDER[folder]
+    for address_grp in prisma_request_iter(auth,
+                                           url_type='address-groups',
+                                           params=dict(params),
+                                           verify=auth.verify):
+        if address_grp['name'] == name:
+            raise SASEObjectExists(f"message=\"address group already exists\"|{name=}")
+    data = addresses_grp_create_payload(name=name, folder=folder, **kwargs)
+    response = prisma_request(token=auth,
+                              method="POST",
+                              url_type="address-groups",
+                              params=params,
+                              data=data,
+                              verify=auth.verify)
+    return response
+
+
+def addresses_grp_create_payload(name: str, folder: str, **kwargs) -> dict:
+    """Creates Address Group Payload; dynamic filters are compiled to catch syntax errors
+
+    Args:
+        name (str): _description_
+        folder (str): _description_
+
+    Raises:
+        SASEMissingParam: _description_
+        SASEBadParam: _description_
+
+    Returns:
+        dict: _description_
+    """
+    if not check_name_length(name=name, length=63):
+        raise SASEBadParam(f"message=\"greater than allowed 63\"|{name=}")
+    data: dict = {"name": name}
+    if kwargs.get('dynamic_filter'):
+        if not check_name_length(name=kwargs['dynamic_filter'], length=2047):
+            raise SASEBadParam("message=\"filter greater than allowed 2047\"")
+        compile_tag_filter(kwargs['dynamic_filter'])
+        data.update({"dynamic": {"filter": kwargs['dynamic_filter']}})
+    elif kwargs.get('static'):
+        static = kwargs['static'] if isinstance(kwargs['static'], list) else [kwargs['static']]
+        data.update({"static": static})
+    else:
+        raise SASEMissingParam("message=\"Missing static or dynamic_filter to create group\"")
+    if kwargs.get("description"):
+        data.update({"description": kwargs["description"]})
+    if kwargs.get("tag"):
+        if not tags_exist(tag_list=list(kwargs['tag']), folder=folder, auth=kwargs.get('auth')):
+            raise SASEBadParam(f"message=\"tag doesnot exist cannot add\"|tag={kwargs['tag']}")
+        data.update({"tag": list(kwargs["tag"])})
+    return data
+
+
+def addresses_grp_delete(address_grp_id: str, folder: str, **kwargs) -> dict:
+    """Delete Existing Address Group
+
+    Args:
+        address_grp_id (str): _description_
+        folder (str): _description_
+
+    Returns:
+        dict: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    params = FOLDER[folder]
+    # raises error if address group id doesn't exist
+    addresses_grp_get_address_by_id(address_grp_id=address_grp_id, folder=folder, auth=auth)
+    response = prisma_request(token=auth,
+                              method="DELETE",
+                              params=params,
+                              url_type="address-groups",
+                              delete_object=f"/{address_grp_id}",
+                              verify=auth.verify)
+    return response
+
+
+def addresses_grp_get_address_by_id(address_grp_id: str, folder: str, **kwargs) -> dict:
+    """Get Address Group by ID requires folder
+
+    Args:
+        address_grp_id (str): _description_
+        folder (str): _description_
+
+    Returns:
+        dict: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    params = FOLDER[folder]
+    response = prisma_request(token=auth,
+                              method='GET',
+                              params=params,
+                              get_object=f'/{address_grp_id}',
+                              url_type='address-groups',
+                              verify=auth.verify)
+    return response
+
+
+def addresses_grp_edit(address_grp_id: str, folder: str, **kwargs) -> dict:
+    """Edit an existing Address Group keeping the current name if none is supplied
+
+    Args:
+        address_grp_id (str): _description_
+        folder (str): _description_
+
+    Returns:
+        dict: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    address_grp_exists = addresses_grp_get_address_by_id(address_grp_id=address_grp_id,
+                                                         folder=folder,
+                                                         auth=auth)
+    params = FOLDER[folder]
+    name = kwargs.pop('name') if kwargs.get('name') else address_grp_exists['name']
+    data = addresses_grp_create_payload(name=name, folder=folder, **kwargs)
+    response = prisma_request(token=auth,
+                              method="PUT",
+                              url_type='address-groups',
+                              put_object=f"/{address_grp_id}",
+                              params=params,
+                              data=data,
+                              verify=auth.verify)
+    return response
+
+
+class AddressGroupIndex:
+    """Resolves address group membership locally.
+     Keeps a tag to address inverted index and a tag to group reverse index so a
+     change to one address only re-evaluates the dynamic groups whose filter
+     references one of its old or new tags.
+    """
+
+    def __init__(self):
+        self.address_tags: Dict[str, FrozenSet[str]] = {}
+        self.tag_addresses: Dict[str, Set[str]] = {}
+        self.filters: Dict[str, TagFilter] = {}
+        self.static: Dict[str, List[str]] = {}
+        self.tag_groups: Dict[str, Set[str]] = {}
+        self._members: Dict[str, FrozenSet[str]] = {}
+        self._universe: Optional[FrozenSet[str]] = None
+
+    def add_address(self, address: dict) -> Set[str]:
+        """Adds or replaces an address and refreshes affected groups
+
+        Args:
+            address (dict): address object with name and tag
 
+        Returns:
+            Set[str]: dynamic groups that were re-evaluated
+        """
+        name = address['name']
+        is_new = name not in self.address_tags
+        old_tags = self.address_tags.get(name, frozenset())
+        new_tags = frozenset(address.get('tag') or [])
+        for tag in old_tags - new_tags:
+            self.tag_addresses[tag].discard(name)
+        for tag in new_tags - old_tags:
+            self.tag_addresses.setdefault(tag, set()).add(name)
+        self.address_tags[name] = new_tags
+        self._universe = None
+        return self._refresh(old_tags | new_tags, negated=is_new)
 
-def addresses_grp_delete():
-    pass
+    def remove_address(self, name: str) -> Set[str]:
+        """Removes an address and refreshes affected groups
 
+        Args:
+            name (str): address name
 
-def addresses_grp_get_address_by_id():
-    pass
+        Returns:
+            Set[str]: dynamic groups that were re-evaluated
+        """
+        old_tags = self.address_tags.pop(name, frozenset())
+        for tag in old_tags:
+            self.tag_addresses[tag].discard(name)
+        self._universe = None
+        return self._refresh(old_tags, negated=True)
 
+    def add_group(self, address_grp: dict) -> None:
+        """Adds or replaces a static or dynamic address group
 
-def addresses_grp_edit():
-    pass
+        Args:
+            address_grp (dict): address group object
+        """
+        name = address_grp['name']
+        self.remove_group(name)
+        if address_grp.get('dynamic', {}).get('filter'):
+            tag_filter = compile_tag_filter(address_grp['dynamic']['filter'])
+            self.filters[name] = tag_filter
+            for tag in tag_filter.tags:
+                self.tag_groups.setdefault(tag, set()).add(name)
+            self._members[name] = self._evaluate(tag_filter)
+        else:
+            self.static[name] = list(address_grp.get('static') or [])
+
+    def remove_group(self, name: str) -> None:
+        """Removes a group
+
+        Args:
+            name (str): group name
+        """
+        tag_filter = self.filters.pop(name, None)
+        if tag_filter is not None:
+            for tag in tag_filter.tags:
+                self.tag_groups.get(tag, set()).discard(name)
+        self.static.pop(name, None)
+        self._members.pop(name, None)
+
+    def universe(self) -> FrozenSet[str]:
+        """Every address name; rebuilt lazily after addresses change
+
+        Returns:
+            FrozenSet[str]: _description_
+        """
+        if self._universe is None:
+            self._universe = frozenset(self.address_tags)
+        return self._universe
+
+    def members(self, name: str) -> FrozenSet[str]:
+        """Resolved address names; nested groups in static members are expanded
+
+        Args:
+            name (str): group name
+
+        Returns:
+            FrozenSet[str]: address names
+        """
+        return self._resolve(name, set())
+
+    def resolve_all(self) -> Dict[str, FrozenSet[str]]:
+        """Membership of every group
+
+        Returns:
+            Dict[str, FrozenSet[str]]: group name to address names
+        """
+        return {name: self.members(name) for name in [*self.filters, *self.static]}
+
+    def groups_for(self, tags: Iterable[str]) -> List[str]:
+        """Dynamic groups an address with these tags would join
+
+        Args:
+            tags (Iterable[str]): tags on the address
+
+        Returns:
+            List[str]: group names
+        """
+        tags = frozenset(tags)
+        return [name for name, tag_filter in self.filters.items() if tag_filter.matches(tags)]
+
+    def _refresh(self, tags: Iterable[str], negated: bool) -> Set[str]:
+        groups: Set[str] = set()
+        for tag in tags:
+            groups.update(self.tag_groups.get(tag, ()))
+        if negated:
+            # 'not' terms can change when the set of addresses changes
+            groups.update(name for name, tag_filter in self.filters.items()
+                          if tag_filter.negated)
+        for name in groups:
+            self._members[name] = self._evaluate(self.filters[name])
+        return groups
+
+    def _evaluate(self, tag_filter: TagFilter) -> FrozenSet[str]:
+        universe = self.universe() if tag_filter.negated else frozenset()
+        return tag_filter.evaluate(self.tag_addresses, universe)
+
+    def _resolve(self, name: str, visiting: Set[str]) -> FrozenSet[str]:
+        if name in self._members:
+            return self._members[name]
+        if name not in self.static or name in visiting:
+            return frozenset()
+        visiting.add(name)
+        members: Set[str] = set()
+        for member in self.static[name]:
+            if member in self.filters or member in self.static:
+                members.update(self._resolve(member, visiting))
+            else:
+                members.add(member)
+        visiting.discard(name)
+        return frozenset(members)
+
+
+def address_grp_index_build(folder: str, **kwargs) -> AddressGroupIndex:
+    """Builds an AddressGroupIndex from every address and address group in a folder
+
+    Args:
+        folder (str): _description_
+        auth (Auth, Optional): tenant authorization
+
+    Returns:
+        AddressGroupIndex: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    index = AddressGroupIndex()
+    for address in prisma_request_iter(auth,
+                                       url_type='addresses',
+                                       params=dict(FOLDER[folder]),
+                                       verify=auth.verify):
+        index.add_address(address)
+    for address_grp in prisma_request_iter(auth,
+                                           url_type='address-groups',
+                                           params=dict(FOLDER[folder]),
+                                           verify=auth.verify):
+        index.add_group(address_grp)
+    return index
@@ -0,0 +1,292 @@
+"""IP Address Index for Address Objects and Remote Network Subnets"""
+
+import ipaddress
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.restapi import prisma_request_iter
+from prismasase.statics import FOLDER, REMOTE_FOLDER
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+IndexKey = Tuple[str, str, str]
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """Binary radix trie node"""
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children: List[Optional["_Node"]] = [None, None]
+        self.entries: Dict[IndexKey, IPNetwork] = {}
+
+
+class AddressIndex:
+    """In memory prefix index of address objects and remote network subnets.
+     Prefixes live in a binary trie per IP version so containment, longest prefix
+     and overlap queries only walk the bits of the query. ip_range objects are split
+     into their covering CIDRs and ip_wildcard objects with a non contiguous mask
+     are kept aside and checked with a mask compare. Each entry is reported once per
+     query, with an ip_range shown as the range rather than the CIDR that matched.
+
+    Keys are (type, folder, name) where type is 'address' or 'remote-network'.
+    """
+
+    def __init__(self):
+        self._roots: Dict[int, _Node] = {4: _Node(), 6: _Node()}
+        self._networks: Dict[IndexKey, List[IPNetwork]] = {}
+        self._wildcards: Dict[IndexKey, List[Tuple[int, int, int, str]]] = {}
+        # value reported for entries stored as several CIDRs (ip_range)
+        self._labels: Dict[IndexKey, str] = {}
+
+    def __len__(self) -> int:
+        return len(set(self._networks) | set(self._wildcards))
+
+    def __contains__(self, key: IndexKey) -> bool:
+        return key in self._networks or key in self._wildcards
+
+    def add_address(self, address: dict) -> None:
+        """Adds or replaces an address object; fqdn objects are ignored
+
+        Args:
+            address (dict): address object as returned by addresses_list
+
+        Raises:
+            SASEBadParam: address value does not parse
+        """
+        key: IndexKey = ('address', str(address.get('folder', '')), address['name'])
+        self.remove(key)
+        try:
+            if address.get('ip_netmask'):
+                self._insert(key, [ipaddress.ip_network(address['ip_netmask'], strict=False)])
+            elif address.get('ip_range'):
+                start, end = [ipaddress.ip_address(ip.strip())
+                              for ip in address['ip_range'].split('-', 1)]
+                self._insert(key, list(ipaddress.summarize_address_range(start, end)))
+                self._labels[key] = f"{start}-{end}"
+            elif address.get('ip_wildcard'):
+                self._insert_wildcard(key, address['ip_wildcard'])
+        except (ValueError, TypeError) as err:
+            raise SASEBadParam(  # pylint: disable=raise-missing-from
+                f"message=\"invalid address value\"|name={address['name']}|error={err}")
+
+    def add_remote_network(self, remote_network: dict) -> None:
+        """Adds or replaces a remote network by its static subnets
+
+        Args:
+            remote_network (dict): remote network as returned by remote_network_list
+
+        Raises:
+            SASEBadParam: subnet does not parse
+        """
+        key: IndexKey = ('remote-network', str(remote_network.get('folder', '')),
+                         remote_network['name'])
+        self.remove(key)
+        subnets = remote_network.get('subnets') or []
+        if isinstance(subnets, str):
+            subnets = subnets.split(',')
+        try:
+            self._insert(key, [ipaddress.ip_network(subnet.strip(), strict=False)
+                               for subnet in subnets])
+        except ValueError as err:
+            raise SASEBadParam(  # pylint: disable=raise-missing-from
+                f"message=\"invalid subnet\"|name={remote_network['name']}|error={err}")
+
+    def remove(self, key: IndexKey) -> bool:
+        """Removes an entry by key
+
+        Args:
+            key (IndexKey): (type, folder, name)
+
+        Returns:
+            bool: True if something was removed
+        """
+        removed = key in self
+        self._wildcards.pop(key, None)
+        self._labels.pop(key, None)
+        for network in self._networks.pop(key, []):
+            path = [self._roots[network.version]]
+            for bit in _bits(network):
+                child = path[-1].children[bit]
+                if child is None:
+                    break
+                path.append(child)
+            else:
+                path[-1].entries.pop(key, None)
+                # prune empty branches so the trie does not keep growing with churn
+                for depth in range(len(path) - 1, 0, -1):
+                    node = path[depth]
+                    if node.entries or node.children[0] or node.children[1]:
+                        break
+                    parent = path[depth - 1]
+                    parent.children[parent.children.index(node)] = None
+        return removed
+
+    def covering(self, value: str) -> List[Dict[str, Any]]:
+        """Entries that fully contain the ip address or network
+
+        Args:
+            value (str): '10.20.30.40' or '10.20.0.0/16'
+
+        Returns:
+            List[Dict[str, Any]]: [{'type', 'folder', 'name', 'network'}]
+        """
+        query = _parse(value)
+        found = [match for _, match in self._ancestors(query)]
+        host_bits = int(query.hostmask)
+        net = int(query.network_address)
+        for key, version, addr, mask, text in self._iter_wildcards():
+            if version == query.version and not mask & host_bits and net & mask == addr & mask:
+                found.append(_result(key, text))
+        return _unique(found)
+
+    def longest_prefix(self, value: str) -> List[Dict[str, Any]]:
+        """Entries with the most specific prefix containing the value. ip_wildcard
+         objects with a non contiguous mask have no prefix length and are never
+         returned here; covering() includes them.
+
+        Args:
+            value (str): ip address or network
+
+        Returns:
+            List[Dict[str, Any]]: [{'type', 'folder', 'name', 'network'}]
+        """
+        query = _parse(value)
+        best: List[Dict[str, Any]] = []
+        best_depth = -1
+        for depth, match in self._ancestors(query):
+            if depth > best_depth:
+                best, best_depth = [], depth
+            best.append(match)
+        return _unique(best)
+
+    def overlapping(self, value: str) -> List[Dict[str, Any]]:
+        """Entries sharing at least one address with the value
+
+        Args:
+            value (str): ip address or network
+
+        Returns:
+            List[Dict[str, Any]]: [{'type', 'folder', 'name', 'network'}]
+        """
+        query = _parse(value)
+        found = [match for _, match in self._ancestors(query)]
+        node: Optional[_Node] = self._roots[query.version]
+        for bit in _bits(query):
+            node = node.children[bit] if node else None
+        if node is not None:
+            stack = [child for child in node.children if child is not None]
+            while stack:
+                current = stack.pop()
+                found.extend(self._result(key, net) for key, net in current.entries.items())
+                stack.extend(child for child in current.children if child is not None)
+        fixed = ~int(query.hostmask)
+        net = int(query.network_address)
+        for key, version, addr, mask, text in self._iter_wildcards():
+            if version == query.version and net & mask & fixed == addr & mask & fixed:
+                found.append(_result(key, text))
+        return _unique(found)
+
+    def _ancestors(self, query: IPNetwork) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        node: Optional[_Node] = self._roots[query.version]
+        depth = 0
+        bits = _bits(query)
+        while node is not None:
+            for key, network in node.entries.items():
+                yield depth, self._result(key, network)
+            if depth == len(bits):
+                break
+            node = node.children[bits[depth]]
+            depth += 1
+
+    def _result(self, key: IndexKey, network: IPNetwork) -> Dict[str, Any]:
+        return _result(key, self._labels.get(key) or str(network))
+
+    def _insert(self, key: IndexKey, networks: List[IPNetwork]) -> None:
+        for network in networks:
+            node = self._roots[network.version]
+            for bit in _bits(network):
+                if node.children[bit] is None:
+                    node.children[bit] = _Node()
+                node = node.children[bit]  # type: ignore
+            node.entries[key] = network
+        if networks:
+            self._networks[key] = networks
+
+    def _insert_wildcard(self, key: IndexKey, value: str) -> None:
+        address, wildcard = value.split('/', 1)
+        addr = ipaddress.ip_address(address.strip())
+        wild = int(ipaddress.ip_address(wildcard.strip()))
+        width = addr.max_prefixlen
+        mask = ~wild & ((1 << width) - 1)
+        # contiguous wildcard masks are just prefixes
+        if wild & (wild + 1) == 0:
+            prefixlen = width - wild.bit_length()
+            self._insert(key, [ipaddress.ip_network(f"{addr}/{prefixlen}", strict=False)])
+        else:
+            self._wildcards[key] = [(addr.version, int(addr), mask, value)]
+
+    def _iter_wildcards(self) -> Iterator[Tuple[IndexKey, int, int, int, str]]:
+        for key, entries in self._wildcards.items():
+            for version, addr, mask, text in entries:
+                yield key, version, addr, mask, text
+
+
+def address_index_build(folders: Iterable[str] = ('Shared',),
+                        remote_networks: bool = True,
+                        **kwargs) -> AddressIndex:
+    """Builds an AddressIndex from every address object in the folders and the
+     static subnets of every remote network
+
+    Args:
+        folders (Iterable[str], optional): address folders. Defaults to ('Shared',)
+        remote_networks (bool, optional): include remote networks. Defaults to True
+        stream (bool, Optional): parse list pages incrementally. Defaults to config.STREAM_LISTS
+        auth (Auth, Optional): tenant authorization
+
+    Returns:
+        AddressIndex: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    index = AddressIndex()
+    for folder in folders:
+        for address in prisma_request_iter(auth,
+                                           url_type='addresses',
+                                           params=dict(FOLDER[folder]),
+                                           stream=kwargs.get('stream'),
+                                           verify=auth.verify):
+            index.add_address(address)
+    if remote_networks:
+        for remote_network in prisma_request_iter(auth,
+                                                  url_type='remote-networks',
+                                                  params=dict(REMOTE_FOLDER),
+                                                  stream=kwargs.get('stream'),
+                                                  verify=auth.verify):
+            index.add_remote_network(remote_network)
+    return index
+
+
+def _parse(value: str) -> IPNetwork:
+    try:
+        return ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError:
+        raise SASEBadParam(f"message=\"invalid ip address or network\"|{value=}")  # pylint: disable=raise-missing-from
+
+
+def _bits(network: IPNetwork) -> List[int]:
+    addr = int(network.network_address)
+    width = network.max_prefixlen
+    return [(addr >> (width - 1 - i)) & 1 for i in range(network.prefixlen)]
+
+
+def _result(key: IndexKey, network: str) -> Dict[str, Any]:
+    return {'type': key[0], 'folder': key[1], 'name': key[2], 'network': network}
+
+
+def _unique(found: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # an entry stored as several CIDRs can match the same query more than once
+    results: Dict[IndexKey, Dict[str, Any]] = {}
+    for match in found:
+        results.setdefault((match['type'], match['folder'], match['name']), match)
+    return list(results.values())
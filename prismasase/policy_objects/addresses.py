@@ -1,15 +1,17 @@
 """Address Objects"""
+from concurrent.futures import ThreadPoolExecutor
 import json
+from typing import Any, Dict, List
 
 from prismasase import return_auth
 from prismasase.configs import Auth
-from prismasase.exceptions import (SASEBadParam, SASEMissingParam,
+from prismasase.exceptions import (SASEBadParam, SASEError, SASEMissingParam,
                                    SASEObjectExists)
-from prismasase.restapi import prisma_request
-from prismasase.statics import FOLDER
-from prismasase.utilities import default_params
+from prismasase.restapi import prisma_request, prisma_request_iter, prisma_request_lookup
+from prismasase.statics import FOLDER, ID_FIELDS
+from prismasase.utilities import check_name_length, default_params
 
-from .tags import tags_exist
+from .tags import tags_create_missing, tags_exist, tags_index
 
 
 def addresses_list(folder: str, **kwargs) -> dict:
@@ -43,6 +45,7 @@ def addresses_create(name: str, folder: str, **kwargs) -> dict:
         name (str): _description_
         folder (str): _description_
         tag (list): list of possible tags to add to the address
+        create_missing (bool, Optional): create any tags that do not exist yet
         description (str, Optional): description
         ip_netmask (str, Optional|Required): One must be identified as type
         ip_range (str, Optional|Required): One must be specfied
@@ -63,14 +66,17 @@ def addresses_create(name: str, folder: str, **kwargs) -> dict:
             'tag': ['tag1','tag2','tag3']
         }
     """
+    auth: Auth = return_auth(**kwargs)
     # check if already exists
-    address_check = addresses_list(folder=folder, **kwargs)
-    # print(f"DEBUG: Checking if {name} already exists using {address_check=}")
-    for address in address_check['data']:
-        if address == name:
-            raise SASEObjectExists(f"message=\"address already exists\"|{address=}")
+    address = prisma_request_lookup(auth,
+                                    url_type='addresses',
+                                    name=name,
+                                    params=dict(FOLDER[folder]),
+                                    fields=ID_FIELDS,
+                                    verify=auth.verify)
+    if address:
+        raise SASEObjectExists(f"message=\"address already exists\"|{address=}")
     # Create Address
-    auth: Auth = return_auth(**kwargs)
     params = default_params(**kwargs)
     params = {**FOLDER[folder], **params}
     data = addresses_create_payload(name=name, folder=folder, **kwargs)
@@ -78,7 +84,7 @@ def addresses_create(name: str, folder: str, **kwargs) -> dict:
                               method="POST",
                               url_type="addresses",
                               params=params,
-                              data=json.dumps(data),
+                              data=data,
                               verify=auth.verify)
     return response
 
@@ -89,6 +95,7 @@ def addresses_create_payload(name: str, folder: str, **kwargs) -> dict:
     Args:
         name (str): _description_
         folder (str): _description_
+        verify_tags (bool, Optional): confirm tags exist in the tenant. Defaults to True
 
     Raises:
         SASEMissingParam: _description_
@@ -114,7 +121,8 @@ def addresses_create_payload(name: str, folder: str, **kwargs) -> dict:
     if kwargs.get("tag"):
         if isinstance(kwargs["tag"], list):
             kwargs['tag'] = list(kwargs['tag'])
-        if not tags_exist(tag_list=kwargs['tag'], folder=folder, **kwargs):
+        if kwargs.get('verify_tags', True) and not tags_exist(
+                tag_list=kwargs['tag'], folder=folder, **kwargs):
             raise SASEBadParam(f"message=\"tag doesnot exist cannot add\"|tag={kwargs['tag']}")
         data.update({"tag": kwargs["tag"]})
     # print(f"DEBUG: data created {data=}")
@@ -199,6 +207,121 @@ def addresses_edit(address_id: str, folder: str, **kwargs) -> dict:
                               url_type='addresses',
                               put_object=f"/{address_id}",
                               params=params,
-                              data=json.dumps(data),
+                              data=data,
                               verify=auth.verify)
     return response
+
+
+def addresses_bulk_create(addresses: List[Dict[str, Any]],
+                          folder: str,
+                          update_existing: bool = False,
+                          max_workers: int = 8,
+                          **kwargs) -> dict:
+    """Create many Addresses; existing addresses and tags are fetched once,
+     every payload is validated before any write and writes run concurrently
+
+    Args:
+        addresses (List[Dict[str, Any]]): list of addresses each using the same
+         arguments as addresses_create; {'name': 'svr', 'ip_netmask': '10.0.0.0/24', 'tag': []}
+        folder (str): _description_
+        update_existing (bool, optional): PUT addresses that already exist otherwise
+         they are reported as 'exists'. Defaults to False.
+        max_workers (int, optional): concurrent requests. Defaults to 8.
+        create_missing (bool, Optional): create tags referenced but not found in one batch
+         once every address is validated; tags of invalid addresses are not created
+        priority (str, Optional): priority class of the writes. Defaults to 'bulk'
+
+    Returns:
+        dict: sample response
+        {
+            'status': 'success'|'partial'|'error',
+            'created': 1, 'updated': 0, 'exists': 0, 'error': 0,
+            'results': [{'name': 'svr', 'status': 'created', 'id': '...', 'message': ''}]
+        }
+    """
+    auth: Auth = return_auth(**kwargs)
+    params = FOLDER[folder]
+    priority = kwargs.get('priority') or 'bulk'
+    existing: Dict[str, dict] = {
+        address['name']: address for address in prisma_request_iter(auth,
+                                                                    url_type='addresses',
+                                                                    params=dict(params),
+                                                                    verify=auth.verify)}
+    tag_index = tags_index(folder=folder, auth=auth)
+    results: List[Dict[str, Any]] = []
+    pending: List[tuple] = []
+    seen: set = set()
+    tags_needed: List[str] = []
+    # validate everything up front so a bad row never leaves a half written import
+    for address in addresses:
+        address = dict(address)
+        name = str(address.pop('name', ''))
+        result = {'name': name, 'status': '', 'id': '', 'message': ''}
+        results.append(result)
+        try:
+            if not name:
+                raise SASEMissingParam("message=\"missing address name\"")
+            if not check_name_length(name=name, length=63):
+                raise SASEBadParam(f"message=\"greater than allowed 63\"|{name=}")
+            if name in seen:
+                raise SASEObjectExists(f"message=\"duplicate address in batch\"|{name=}")
+            seen.add(name)
+            missing = tag_index.missing(address.get('tag') or [])
+            if missing and not kwargs.get('create_missing'):
+                raise SASEBadParam(f"message=\"tag doesnot exist cannot add\"|tag={missing}")
+            address.pop('folder', None)
+            data = addresses_create_payload(name=name, folder=folder, verify_tags=False,
+                                            **address)
+        except SASEError as err:
+            result.update({'status': 'error', 'message': str(err)})
+            continue
+        if name in existing:
+            result['id'] = existing[name].get('id', '')
+            if not update_existing:
+                result.update({'status': 'exists', 'message': 'address already exists'})
+                continue
+        tags_needed.extend(missing)
+        pending.append((result, data))
+    if tags_needed:
+        tags_create_missing(tag_list=tags_needed, folder=folder, auth=auth, priority=priority)
+
+    def _write(entry: tuple) -> None:
+        result, data = entry
+        try:
+            if result['id']:
+                response = prisma_request(token=auth,
+                                          method="PUT",
+                                          url_type='addresses',
+                                          put_object=f"/{result['id']}",
+                                          params=params,
+                                          data=data,
+                                          verify=auth.verify,
+                                          priority=priority)
+                status = 'updated'
+            else:
+                response = prisma_request(token=auth,
+                                          method="POST",
+                                          url_type="addresses",
+                                          params=params,
+                                          data=data,
+                                          verify=auth.verify,
+                                          priority=priority)
+                status = 'created'
+            if '_errors' in response or not response.get('id'):
+                result.update({'status': 'error', 'message': json.dumps(response)})
+            else:
+                result.update({'status': status, 'id': response['id']})
+        except Exception as err:  # pylint: disable=broad-except
+            result.update({'status': 'error', 'message': f"{type(err).__name__}: {err}"})
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        list(executor.map(_write, pending))
+    response: Dict[str, Any] = {'status': 'success'}
+    for status in ['created', 'updated', 'exists', 'error']:
+        response[status] = sum(1 for result in results if result['status'] == status)
+    if response['error']:
+        response['status'] = 'error' if response['error'] == len(results) else 'partial'
+    response['results'] = results
+    print(f"INFO: Bulk address import created={response['created']}|" +
+          f"updated={response['updated']}|exists={response['exists']}|error={response['error']}")
+    return response
@@ -1,16 +1,19 @@
 """Auto Tag Actions"""
 
+from concurrent.futures import ThreadPoolExecutor
 import json
+from typing import Any, Dict, List
 
 from prismasase import return_auth
 from prismasase.configs import Auth
 from prismasase.exceptions import (SASEAutoTagError, SASEAutoTagExists,
-                                   SASEAutoTagTooLong, SASEBadParam, SASEMissingParam)
+                                   SASEAutoTagTooLong, SASEBadParam, SASEError, SASEMissingParam)
 from prismasase.utilities import (default_params, check_name_length)
 from prismasase.statics import (AUTOTAG_ACTIONS, AUTOTAG_LOG_TYPE,
                                 AUTOTAG_TARGET, FOLDER, SHARED_FOLDER)
-from prismasase.restapi import prisma_request
-from .tags import tags_get
+from prismasase.restapi import prisma_request, prisma_request_iter
+from .tag_filter import compile_tag_filter
+from .tags import TagIndex, tags_create_missing, tags_index
 
 
 def auto_tag_list(**kwargs) -> dict:
@@ -36,27 +39,19 @@ def auto_tag_list(**kwargs) -> dict:
     if kwargs.get('name'):
         # params = {**params, **{'name': kwargs.pop('name')}}
         return auto_tag_get_by_name(name=kwargs.pop('name'), params=params, **kwargs)
-    # Otherwise cycle through get entire list
-    data = []
-    count = 0
+    # Otherwise page through the entire list; page size is negotiated unless a limit is passed
+    data = list(prisma_request_iter(auth,
+                                    url_type='auto-tag-actions',
+                                    params=params,
+                                    verify=auth.verify,
+                                    limit=kwargs.get('limit'),
+                                    offset=kwargs.get('offset')))
     response = {
-        'data': [],
-        'offset': 0,
-        'total': 0,
-        'limit': 0
+        'data': data,
+        'offset': int(kwargs.get('offset') or 0),
+        'total': len(data),
+        'limit': len(data)
     }
-    # loops through to get all data
-    while (len(data) < response['total']) or count == 0:
-        response = prisma_request(token=auth,
-                                  method="GET",
-                                  url_type='auto-tag-actions',
-                                  params=params,
-                                  verify=auth.verify)
-        data = data + response['data']
-        # Adjust param
-        params = {**params, **{'offset': params['offset'] + params['limit']}}
-        count += 1
-    response['data'] = data
     return response
 
 
@@ -110,7 +105,7 @@ def auto_tag_create(name: str, tag_filter: str, actions: list, **kwargs) -> dict
     auth: Auth = return_auth(**kwargs)
     params = SHARED_FOLDER
     # Confirm doesn't already exist
-    response = auto_tag_list(name=name)
+    response = auto_tag_list(name=name, auth=auth)
     if len(response['data']) > 0:
         # print(f"DEBUG: {response=}")
         raise SASEAutoTagExists(f"Auto Tag Already exists {name}={response['data'][0]}")
@@ -131,7 +126,7 @@ def auto_tag_create(name: str, tag_filter: str, actions: list, **kwargs) -> dict
                               method='POST',
                               url_type='auto-tag-actions',
                               params=params,
-                              data=json.dumps(data),
+                              data=data,
                               verify=auth.verify)
     return response
 
@@ -180,7 +175,7 @@ def auto_tag_payload(tag_filter: str, name: str, actions: list, log_type: str, *
     if not check_name_length(name=name, length=63):
         raise SASEAutoTagTooLong(f"message=\"greater than allowed 63\"|{name=}")
     # will raise an error if anything is missing
-    auto_tag_confirm_actions(actions=actions)
+    auto_tag_confirm_actions(actions=actions, **kwargs)
     if log_type not in AUTOTAG_LOG_TYPE:
         raise SASEAutoTagError(f"message=\"log_type {log_type} not a valid type\"")
     data = {
@@ -203,11 +198,13 @@ def auto_tag_payload(tag_filter: str, name: str, actions: list, log_type: str, *
     return data
 
 
-def auto_tag_confirm_actions(actions: list):
+def auto_tag_confirm_actions(actions: list, **kwargs):
     """Verifiy if action has all the correct parameters otherwise will raise issue.
 
     Args:
         actions (list): _description_
+        auth (Auth, Optional): tenant authorization used to load the Shared tag index
+        tag_index (TagIndex, Optional): validate against an already loaded tag snapshot
 
     Raises:
         SASEAutoTagError: _description_
@@ -217,6 +214,8 @@ def auto_tag_confirm_actions(actions: list):
         SASEAutoTagTooLong: _description_
         SASEAutoTagTooLong: _description_
     """
+    tag_index: TagIndex = kwargs['tag_index'] if kwargs.get('tag_index') is not None else (
+        tags_index(folder='Shared', auth=kwargs.get('auth')))
     try:
         for action in actions:
             name: str = action['name']
@@ -243,10 +242,7 @@ def auto_tag_confirm_actions(actions: list):
                 if not check_name_length(name=tag, length=127):
                     raise SASEAutoTagTooLong(f"message=\"tag name is too long\"|{tag=}")
                 # check Tag exists
-                tag_exists = tags_get(folder='Shared', tag_name=tag)
-                # if not tag_exists['data']:
-                if not tag_exists:
-                    print(f"DEGUG: Tag not found {tag_exists=}")
+                if tag not in tag_index:
                     raise SASEAutoTagError(f"message=\"tag doesnot exist\"|{tag=}")
     except KeyError as err:
         error = f"{type(err).__name__}: {str(err)}" if err else ""
@@ -255,6 +251,128 @@ def auto_tag_confirm_actions(actions: list):
     # if all chekcks passed than it's a valid action
 
 
+def auto_tag_bulk_create(auto_tags: List[Dict[str, Any]],
+                         update_existing: bool = True,
+                         max_workers: int = 8,
+                         **kwargs) -> dict:
+    """Create or update many Auto Tags. Existing auto tags and Shared tags are
+     listed once and every auto tag is validated locally against that snapshot
+     before anything is written; writes then run concurrently.
+
+    Args:
+        auto_tags (List[Dict[str, Any]]): each uses the auto_tag_create arguments
+         {'name': str, 'tag_filter': str, 'actions': list, 'log_type': str, ...}
+        update_existing (bool, optional): PUT auto tags that already exist otherwise
+         they are reported as 'exists'. Defaults to True.
+        max_workers (int, optional): concurrent requests. Defaults to 8.
+        create_missing (bool, Optional): create tags referenced by actions that do not exist
+         once every auto tag is validated; tags of invalid auto tags are not created
+        priority (str, Optional): priority class of the writes. Defaults to 'bulk'
+
+    Returns:
+        dict: sample response
+        {
+            'status': 'success'|'partial'|'error',
+            'created': 1, 'updated': 0, 'exists': 0, 'error': 0,
+            'results': [{'name': 'auto-tag', 'status': 'created', 'message': ''}]
+        }
+    """
+    auth: Auth = return_auth(**kwargs)
+    params = SHARED_FOLDER
+    priority = kwargs.get('priority') or 'bulk'
+    existing = {auto_tag['name'] for auto_tag in auto_tag_list(auth=auth)['data']}
+    tag_index = tags_index(folder='Shared', auth=auth)
+    if kwargs.get('create_missing'):
+        # tags that will be created count as existing while validating
+        tag_index = TagIndex(folder='Shared', tags=[*tag_index.tags.values(), *(
+            {'name': tag} for auto_tag in auto_tags
+            for tag in _action_tags(auto_tag.get('actions')))])
+    results: List[Dict[str, Any]] = []
+    pending: List[tuple] = []
+    seen: set = set()
+    for auto_tag in auto_tags:
+        auto_tag = dict(auto_tag)
+        name = str(auto_tag.pop('name', ''))
+        result = {'name': name, 'status': '', 'message': ''}
+        results.append(result)
+        try:
+            if name in seen:
+                raise SASEAutoTagExists(f"message=\"duplicate auto tag in batch\"|{name=}")
+            seen.add(name)
+            try:
+                tag_filter = auto_tag.pop('tag_filter')
+                actions = auto_tag.pop('actions')
+                log_type = auto_tag.pop('log_type')
+            except KeyError as err:
+                raise SASEMissingParam(  # pylint: disable=raise-missing-from
+                    f"message=\"missing parameter\"|error={str(err)}")
+            auto_tag.pop('auth', None)
+            data = auto_tag_payload(tag_filter=tag_filter, name=name, actions=actions,
+                                    log_type=log_type, tag_index=tag_index, **auto_tag)
+        except SASEError as err:
+            result.update({'status': 'error', 'message': str(err)})
+            continue
+        if name in existing and not update_existing:
+            result.update({'status': 'exists', 'message': 'auto tag already exists'})
+            continue
+        pending.append((result, data, name in existing))
+    if kwargs.get('create_missing'):
+        tags_create_missing(tag_list=[tag for _, data, _ in pending
+                                      for tag in _action_tags(data['actions'])],
+                            folder='Shared', auth=auth, priority=priority)
+
+    def _write(entry: tuple) -> None:
+        result, data, update = entry
+        try:
+            if update:
+                response = prisma_request(token=auth,
+                                          method='PUT',
+                                          url_type='auto-tag-actions',
+                                          put_object='',
+                                          params=params,
+                                          data=data,
+                                          verify=auth.verify,
+                                          priority=priority)
+            else:
+                response = prisma_request(token=auth,
+                                          method='POST',
+                                          url_type='auto-tag-actions',
+                                          params=params,
+                                          data=data,
+                                          verify=auth.verify,
+                                          priority=priority)
+            if '_errors' in response:
+                result.update({'status': 'error', 'message': json.dumps(response)})
+            else:
+                result['status'] = 'updated' if update else 'created'
+        except Exception as err:  # pylint: disable=broad-except
+            result.update({'status': 'error', 'message': f"{type(err).__name__}: {err}"})
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        list(executor.map(_write, pending))
+    response: Dict[str, Any] = {'status': 'success'}
+    for status in ['created', 'updated', 'exists', 'error']:
+        response[status] = sum(1 for result in results if result['status'] == status)
+    if response['error']:
+        response['status'] = 'error' if response['error'] == len(results) else 'partial'
+    response['results'] = results
+    print(f"INFO: Bulk auto tag import created={response['created']}|" +
+          f"updated={response['updated']}|exists={response['exists']}|error={response['error']}")
+    return response
+
+
+def _action_tags(actions: Any) -> List[str]:
+    # tags named by the actions; malformed actions are left to auto_tag_confirm_actions
+    tag_list: List[str] = []
+    for action in actions if isinstance(actions, list) else []:
+        tagging = action.get('type', {}).get('tagging') if isinstance(action, dict) and (
+            isinstance(action.get('type'), dict)) else None
+        if isinstance(tagging, dict) and tagging.get('tags'):
+            tags = tagging['tags']
+            tag_list.extend(str(tag) for tag in (tags if isinstance(tags, list) else [tags]))
+    return tag_list
+
+
 def auto_tag_edit(name: str,
                   add_action: bool = False,
                   edit_filter: bool = False,
@@ -276,8 +394,23 @@ def auto_tag_delete():
     pass
 
 
-def auto_tag_check_tag_filter():
-    # TODO: build a function that tests the functionality of a tag filter
-    # need to use regex to split out () if not "All Logs" and then compare them with
-    # and and or statements. Then inside each () do a sub routine that confirms the formatting is correct
-    pass
+def auto_tag_check_tag_filter(tag_filter: str) -> bool:
+    """Confirms the and/or/not structure and parentheses of a filter are valid.
+     Each () term is treated as a single condition; its contents are not checked.
+
+    Args:
+        tag_filter (str): filter or "All Logs"
+
+    Raises:
+        SASEAutoTagError: filter does not parse
+
+    Returns:
+        bool: True when valid
+    """
+    if tag_filter.strip() == "All Logs":
+        return True
+    try:
+        compile_tag_filter(tag_filter)
+    except SASEBadParam as err:
+        raise SASEAutoTagError(str(err))  # pylint: disable=raise-missing-from
+    return True
@@ -0,0 +1,215 @@
+"""Tag Filter Expressions used by Dynamic Address Groups and Auto Tags"""
+
+from functools import lru_cache
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from prismasase.exceptions import SASEBadParam
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|'([^']*)'|\"([^\"]*)\"|([^\s()'\"]+))")
+_OPERATORS = ('and', 'or', 'not')
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class TagFilter:
+    """Compiled tag filter expression such as "'web' and ('prod' or 'dr') and not 'old'".
+     Compiled once into closures; evaluate() resolves membership with set operations
+     over a tag to member inverted index and matches() tests a single tag set.
+    """
+
+    def __init__(self, expression: str):
+        """_summary_
+
+        Args:
+            expression (str): tag filter
+
+        Raises:
+            SASEBadParam: expression does not parse
+        """
+        self.expression = expression
+        tree = _Parser(expression).parse()
+        self.tags: FrozenSet[str] = frozenset(_tree_tags(tree))
+        # 'not' terms depend on every member, not only members carrying self.tags
+        self.negated: bool = 'not' in _tree_kinds(tree)
+        self._evaluate: Callable = _compile_sets(tree)
+        self._matches: Callable = _compile_match(tree)
+
+    def __repr__(self) -> str:
+        return f"TagFilter({self.expression!r})"
+
+    def evaluate(self, index: Dict[str, Set[str]], universe: FrozenSet[str]) -> FrozenSet[str]:
+        """Members matching the filter
+
+        Args:
+            index (Dict[str, Set[str]]): tag name to member names
+            universe (FrozenSet[str]): every member; needed to resolve 'not'
+
+        Returns:
+            FrozenSet[str]: matching members
+        """
+        result = self._evaluate(index, universe)
+        return result if isinstance(result, frozenset) else frozenset(result)
+
+    def matches(self, tags: Iterable[str]) -> bool:
+        """True if an object carrying the tags matches
+
+        Args:
+            tags (Iterable[str]): tags on the object
+
+        Returns:
+            bool: _description_
+        """
+        return self._matches(frozenset(tags))
+
+
+@lru_cache(maxsize=4096)
+def compile_tag_filter(expression: str) -> TagFilter:
+    """Compile a tag filter once and reuse it for every evaluation
+
+    Args:
+        expression (str): tag filter
+
+    Returns:
+        TagFilter: _description_
+    """
+    return TagFilter(expression)
+
+
+class _Parser:  # pylint: disable=too-few-public-methods
+    """Recursive descent parser: or_expr := and_expr ('or' and_expr)*,
+     and_expr := unary ('and' unary)*, unary := 'not' unary | '(' or_expr ')' | term.
+     A term is a quoted tag or consecutive quoted and bare words."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens: List[Tuple[str, str]] = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if not match:
+                raise SASEBadParam(f"message=\"invalid tag filter\"|filter=\"{self.expression}\"")
+            position = match.end()
+            if match.group(1):
+                self.tokens.append(('(', '('))
+            elif match.group(2):
+                self.tokens.append((')', ')'))
+            elif match.group(3) is not None or match.group(4) is not None:
+                self.tokens.append(('tag', match.group(3) if match.group(3) is not None
+                                    else match.group(4)))
+            elif match.group(5).lower() in _OPERATORS:
+                self.tokens.append((match.group(5).lower(), match.group(5)))
+            else:
+                self.tokens.append(('word', match.group(5)))
+        self.position = 0
+
+    def parse(self) -> tuple:
+        if not self.tokens:
+            raise SASEBadParam("message=\"empty tag filter\"")
+        tree = self._or()
+        if self.position != len(self.tokens):
+            self._error()
+        return tree
+
+    def _peek(self) -> str:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else ''
+
+    def _or(self) -> tuple:
+        nodes = [self._and()]
+        while self._peek() == 'or':
+            self.position += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ('or', tuple(nodes))
+
+    def _and(self) -> tuple:
+        nodes = [self._unary()]
+        while self._peek() == 'and':
+            self.position += 1
+            nodes.append(self._unary())
+        return nodes[0] if len(nodes) == 1 else ('and', tuple(nodes))
+
+    def _unary(self) -> tuple:
+        kind = self._peek()
+        if kind == 'not':
+            self.position += 1
+            return ('not', self._unary())
+        if kind == '(':
+            self.position += 1
+            node = self._or()
+            if self._peek() != ')':
+                self._error()
+            self.position += 1
+            return node
+        if kind in ('tag', 'word'):
+            # log filters put bare and quoted words together e.g. (addr.src in '10.1.1.1')
+            words = []
+            while self._peek() in ('tag', 'word'):
+                words.append(self.tokens[self.position][1])
+                self.position += 1
+            return ('tag', ' '.join(words))
+        return self._error()
+
+    def _error(self) -> tuple:
+        raise SASEBadParam(
+            f"message=\"invalid tag filter\"|filter=\"{self.expression}\"|token={self.position}")
+
+
+def _tree_tags(tree: tuple) -> Iterable[str]:
+    if tree[0] == 'tag':
+        yield tree[1]
+    elif tree[0] == 'not':
+        yield from _tree_tags(tree[1])
+    else:
+        for node in tree[1]:
+            yield from _tree_tags(node)
+
+
+def _tree_kinds(tree: tuple) -> Set[str]:
+    if tree[0] == 'tag':
+        return {'tag'}
+    if tree[0] == 'not':
+        return {'not'} | _tree_kinds(tree[1])
+    kinds = {tree[0]}
+    for node in tree[1]:
+        kinds |= _tree_kinds(node)
+    return kinds
+
+
+def _compile_sets(tree: tuple) -> Callable:
+    if tree[0] == 'tag':
+        tag = tree[1]
+        # leaf sets are never mutated; every operator below returns a new set
+        return lambda index, universe: index.get(tag, _EMPTY)
+    if tree[0] == 'not':
+        inner = _compile_sets(tree[1])
+        return lambda index, universe: universe - inner(index, universe)
+    nodes = [_compile_sets(node) for node in tree[1]]
+    if tree[0] == 'and':
+        def _and(index, universe):
+            result = nodes[0](index, universe)
+            for node in nodes[1:]:
+                if not result:
+                    break
+                result = result & node(index, universe)
+            return result
+        return _and
+
+    def _or(index, universe):
+        result = nodes[0](index, universe)
+        for node in nodes[1:]:
+            result = result | node(index, universe)
+        return result
+    return _or
+
+
+def _compile_match(tree: tuple) -> Callable:
+    if tree[0] == 'tag':
+        tag = tree[1]
+        return lambda tags: tag in tags
+    if tree[0] == 'not':
+        inner = _compile_match(tree[1])
+        return lambda tags: not inner(tags)
+    nodes = [_compile_match(node) for node in tree[1]]
+    if tree[0] == 'and':
+        return lambda tags: all(node(tags) for node in nodes)
+    return lambda tags: any(node(tags) for node in nodes)
@@ -1,48 +1,135 @@
 """Tags"""
 
-import json
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from prismasase import return_auth
 from prismasase.configs import Auth
 from prismasase.exceptions import (SASEError, SASEObjectExists)
-from prismasase.restapi import prisma_request
-from prismasase.statics import FOLDER, TAG_COLORS
+from prismasase.middleware import priority_lane
+from prismasase.restapi import prisma_request, prisma_request_iter
+from prismasase.statics import FOLDER, TAG_COLORS, TAG_FIELDS
 from prismasase.utilities import default_params
 
+# Seconds a folder's tag index is trusted before it is reloaded
+TAG_INDEX_MAX_AGE: int = 300
+_TAG_INDEXES: Dict[Tuple[str, str], "TagIndex"] = {}
+# one lock per (tsg_id, folder) so loading one folder does not block the others
+_TAG_INDEX_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+_TAG_INDEX_LOCK = threading.Lock()
+
+
+class TagIndex:
+    """Set of tag names in a folder loaded with a single listing so existence
+     checks for any number of tags are set operations instead of API calls
+    """
+
+    def __init__(self, folder: str, tags: Iterable[dict]):
+        """_summary_
+
+        Args:
+            folder (str): folder the tags were listed from
+            tags (Iterable[dict]): tags as returned by tags_list
+        """
+        self.folder = folder
+        self.loaded = time.time()
+        self.tags: Dict[str, dict] = {tag['name']: tag for tag in tags}
+        self._lock = threading.Lock()
+
+    def __contains__(self, tag_name: str) -> bool:
+        return tag_name in self.tags
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def age(self) -> float:
+        """Seconds since the index was loaded
+
+        Returns:
+            float: _description_
+        """
+        return time.time() - self.loaded
+
+    def get(self, tag_name: str) -> dict:
+        """Tag by name or empty dict
+
+        Args:
+            tag_name (str): _description_
+
+        Returns:
+            dict: _description_
+        """
+        return self.tags.get(tag_name, {})
+
+    def exists(self, tag_list: Iterable[str]) -> bool:
+        """True if every tag exists
+
+        Args:
+            tag_list (Iterable[str]): _description_
+
+        Returns:
+            bool: _description_
+        """
+        return set(tag_list) <= self.tags.keys()
+
+    def missing(self, tag_list: Iterable[str]) -> List[str]:
+        """Tags that do not exist keeping the order they were supplied
+
+        Args:
+            tag_list (Iterable[str]): _description_
+
+        Returns:
+            List[str]: _description_
+        """
+        return list(dict.fromkeys(tag for tag in tag_list if tag not in self.tags))
+
+    def add(self, tag: dict) -> None:
+        """Record a tag created or updated after the index was loaded
+
+        Args:
+            tag (dict): tag object with at least a name
+        """
+        with self._lock:
+            self.tags[tag['name']] = tag
+
+    def discard(self, tag_name: str) -> None:
+        """Forget a deleted tag
+
+        Args:
+            tag_name (str): _description_
+        """
+        with self._lock:
+            self.tags.pop(tag_name, None)
+
 
 def tags_list(folder: str, **kwargs) -> dict:
     """List out all tags in the specified folder
 
     Args:
         folder (str): _description_
+        fields (Iterable[str], Optional): keep only these fields of each tag
 
     Returns:
         dict: _description_
     """
     auth: Auth = return_auth(**kwargs)
-    params = default_params(**kwargs)
-    params = {**FOLDER[folder], **params}
-    data = []
-    count = 0
+    # page size is negotiated unless a limit is passed
+    params = dict(FOLDER[folder])
+    data = list(prisma_request_iter(auth,
+                                    url_type='tags',
+                                    params=params,
+                                    verify=auth.verify,
+                                    fields=kwargs.get('fields'),
+                                    limit=kwargs.get('limit'),
+                                    offset=kwargs.get('offset')))
     response = {
-        'data': [],
-        'offset': 0,
-        'total': 0,
-        'limit': 0
+        'data': data,
+        'offset': int(kwargs.get('offset') or 0),
+        'total': len(data),
+        'limit': len(data)
     }
-    # Loops through to get all data in specified folder depending on limit and totals
-    while (len(data) < response['total']) or count == 0:
-        response = prisma_request(token=auth,
-                                  method="GET",
-                                  url_type='tags',
-                                  params=params,
-                                  verify=auth.verify)
-        data = data + response['data']
-        # Adjust to get the next set until you get all values
-        params = {**params, **{'offset': params['offset'] + params['limit']}}
-        count += 1
-        # print(f"DEBUG: {params=}|{response=}|{count=}|{data=}|{len(data)}")
-    response['data'] = data
     return response
 
 
@@ -60,7 +147,7 @@ def tags_create(folder: str, tag_name: str, **kwargs) -> dict:
     params = default_params(**kwargs)
     params = {**FOLDER[folder], **params}
     # Verify that tag doesn't already exist
-    tags_get_tag = tags_get(folder=folder, tag_name=tag_name)
+    tags_get_tag = tags_get(folder=folder, tag_name=tag_name, auth=auth)
     if tags_get_tag:
         raise SASEObjectExists(f"Object already exists tag={tag_name}")
     data = tags_create_data(tag_name=tag_name, **kwargs)
@@ -69,8 +156,10 @@ def tags_create(folder: str, tag_name: str, **kwargs) -> dict:
                               method="POST",
                               url_type='tags',
                               params=params,
-                              data=json.dumps(data),
+                              data=data,
                               verify=auth.verify)
+    if response.get('name'):
+        tags_index(folder=folder, auth=auth).add(response)
     return response
 
 
@@ -80,23 +169,85 @@ def tags_get(folder: str, tag_name: str, **kwargs) -> dict:
     Args:
         folder (str): _description_
         tag_name (str): _description_
+        refresh (bool, Optional): reload the folder's tag index first
 
     Returns:
         dict: _description_
     """
-    # Will now loop through get all tags offseting by 500 each time
-    auth: Auth = return_auth(**kwargs)
-    response = {}
-    tag_get_list = tags_list(folder=folder, limit=500, auth=auth)
-    tag_get_list = tag_get_list['data']
-    for tag in tag_get_list:
-        if tag_name == tag['name']:
-            response = tag
-            print(f"INFO: Found Tag: {response}")
-            break
+    response = tags_index(folder=folder, **kwargs).get(tag_name)
+    if response:
+        print(f"INFO: Found Tag: {response}")
     return response
 
 
+def tags_index(folder: str, refresh: bool = False, **kwargs) -> TagIndex:
+    """Shared index of a folder's tags per tenant; loaded with one full listing
+     and reused until it is older than max_age
+
+    Args:
+        folder (str): _description_
+        refresh (bool, optional): force a reload. Defaults to False.
+        max_age (int, Optional): seconds before reloading. Defaults to TAG_INDEX_MAX_AGE
+
+    Returns:
+        TagIndex: _description_
+    """
+    auth: Auth = return_auth(**kwargs)
+    max_age = int(kwargs.get('max_age', TAG_INDEX_MAX_AGE))
+    key = (str(auth.tsg_id), folder)
+    with _TAG_INDEX_LOCK:
+        lock = _TAG_INDEX_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        index: Optional[TagIndex] = _TAG_INDEXES.get(key)
+        if refresh or index is None or index.age() > max_age:
+            index = TagIndex(folder=folder,
+                             tags=tags_list(folder=folder, fields=TAG_FIELDS,
+                                            auth=auth)['data'])
+            with _TAG_INDEX_LOCK:
+                _TAG_INDEXES[key] = index
+    return index
+
+
+def tags_create_missing(tag_list: list, folder: str, max_workers: int = 8, **kwargs) -> List[dict]:
+    """Create every tag in the list that does not already exist in one batch
+
+    Args:
+        tag_list (list): tag names
+        folder (str): _description_
+        max_workers (int, optional): concurrent requests. Defaults to 8.
+        tag_color (str, Optional): color applied to each created tag
+        tag_comments (str, Optional): comment applied to each created tag
+        priority (str, Optional): priority class of the requests. Defaults to 'bulk'
+
+    Returns:
+        List[dict]: created tags
+    """
+    auth: Auth = return_auth(**kwargs)
+    index = tags_index(folder=folder, auth=auth)
+    missing = index.missing(tag_list)
+    if not missing:
+        return []
+    params = {**FOLDER[folder]}
+    tag_kwargs = {key: kwargs[key] for key in ['tag_color', 'tag_comments'] if key in kwargs}
+    priority = kwargs.get('priority') or 'bulk'
+
+    def _create(tag_name: str) -> dict:
+        response = prisma_request(token=auth,
+                                  method="POST",
+                                  url_type='tags',
+                                  params=params,
+                                  data=tags_create_data(tag_name=tag_name, **tag_kwargs),
+                                  verify=auth.verify,
+                                  priority=priority)
+        if response.get('name'):
+            index.add(response)
+        return response
+
+    print(f"INFO: Creating missing tags {', '.join(missing)}")
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        return list(executor.map(_create, missing))
+
+
 def tags_create_data(tag_name: str, **kwargs) -> dict:
     """Creates tag Data Structure
 
@@ -122,6 +273,7 @@ def tags_exist(tag_list: list, folder: str, **kwargs) -> bool:
     Args:
         tag_list (list): _description_
         folder (str): _description_
+        create_missing (bool, Optional): create any missing tags instead of returning False
 
     Raises:
         SASEError: _description_
@@ -131,11 +283,16 @@ def tags_exist(tag_list: list, folder: str, **kwargs) -> bool:
     """
     if not isinstance(tag_list, list):
         raise SASEError(f"message=\"requires a list of tagnames\"|{tag_list=}")
-    for tag in tag_list:
-        if not tags_get(tag_name=tag, folder=folder, **kwargs):
-            # print(f"DEBUG: {tag=} doesnot exist")
-            return False
-    return True
+    auth: Auth = return_auth(**kwargs)
+    index = tags_index(folder=folder, auth=auth, max_age=kwargs.get('max_age', TAG_INDEX_MAX_AGE))
+    if index.exists(tag_list):
+        return True
+    if kwargs.get('create_missing'):
+        tags_create_missing(tag_list=tag_list, folder=folder, auth=auth,
+                            **{key: kwargs[key] for key in ['tag_color', 'tag_comments']
+                               if key in kwargs})
+        return index.exists(tag_list)
+    return False
 
 
 def tags_get_by_id(tag_id: str, folder: str, **kwargs) -> dict:
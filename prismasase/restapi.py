@@ -1,15 +1,40 @@
 """Rest Calls"""
 
-from typing import Any, Dict
-import requests
+import itertools
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
 import orjson
 
-from prismasase.configs import Auth, refresh_token
+from prismasase.configs import Auth
 from prismasase import config
+from prismasase.change_tracker import change_tracker
 from prismasase.exceptions import SASEBadRequest, SASEMissingParam
+from prismasase.middleware import MiddlewareChain, Request, default_middleware
+from prismasase.streaming import iter_list_response
+from prismasase.transport import ACCEPT_ENCODING, Transport, TransportResponse
+from prismasase.statics import API_ERRORS_NOT_FOUND
+from prismasase.utilities import api_error_is, project_fields
+
+NAME_INDEX_MAX_AGE = 60
+PAGE_SIZE_MIN = 50
+PAGE_SIZE_MAX = 5000
+# a page slower than this is halved so large folders stay clear of request timeouts
+PAGE_LATENCY_TARGET = 10.0
+# learned per url type: page size to use next and largest size the endpoint accepted
+_PAGE_SIZES: Dict[str, int] = {}
+_PAGE_CEILINGS: Dict[str, int] = {}
+# url types seen ignoring or rejecting the name query parameter
+_NAME_FILTER_UNSUPPORTED: Set[str] = set()
+# url types seen rejecting the fields query parameter; projection is then client side only
+_FIELDS_UNSUPPORTED: Set[str] = set()
+# guards the learned state above; pages are fetched from worker threads
+_LEARNED_LOCK = threading.Lock()
+_NAME_INDEXES: Dict[Tuple[str, str, str], Tuple[float, Dict[str, dict]]] = {}
+_NAME_INDEXES_LOCK = threading.Lock()
 
 
-@refresh_token
 def prisma_request(token: Auth, **kwargs) -> Dict[str, Any]: # pylint: disable=too-many-locals
     """_summary_
 
@@ -18,7 +43,8 @@ def prisma_request(token: Auth, **kwargs) -> Dict[str, Any]: # pylint: disable=t
         url_type (str): specify the api call
         method (str): specifies the type of HTTPS method used
         params (dict, optional): specifies parameters passed to request
-        data (str, optional): specifies the data being sent
+        data (dict|list|str, optional): specifies the data being sent; dicts and lists
+         are sent as compact JSON
         verify (str|bool, optional): sets request to verify with a custom
          cert bypass verification or verify with standard library. Defaults to True
         timeout (int, optional): sets API call timeout. Defaults to 60
@@ -29,6 +55,12 @@ def prisma_request(token: Auth, **kwargs) -> Dict[str, Any]: # pylint: disable=t
         name (string, Optional): The name of the entry
         potition (str, Optional|Required): Required if inspecting Security Rules
         get_object (str, Optional): Used if method is "GET", but additional path parameters required
+        transport (Transport, Optional): Defaults to the transport of the Auth
+        middleware (MiddlewareChain, Optional): stages the request passes through
+         such as retry and token refresh. Defaults to the chain of the Auth or
+         default_middleware()
+        priority (str, Optional): 'interactive'|'normal'|'bulk' used by the priority
+         stage. Defaults to the enclosing priority_lane() or 'normal'
     Returns:
         _type_: _description_
     """
@@ -49,35 +81,337 @@ def prisma_request(token: Auth, **kwargs) -> Dict[str, Any]: # pylint: disable=t
     if kwargs.get('offset'):
         params.update({'offset': int(kwargs.get('offset', config.OFFSET))})
     url: str = config.REST_API[url_type]
-    headers = {"authorization": f"Bearer {token}", "content-type": "application/json"}
-    data: str = kwargs.get('data', None)
+    # refreshed here as well as in the auth stage so chains without it keep working
+    token.refresh_expired()
+    headers = {"authorization": f"Bearer {token.token}", "content-type": "application/json",
+               "accept-encoding": ACCEPT_ENCODING}
+    data: Union[str, bytes, None] = kwargs.get('data', None)
+    if isinstance(data, (dict, list)):
+        data = orjson.dumps(data)
     verify = kwargs.get('verify', True)
     timeout: int = kwargs.get('timeout', 90)
+    path: str = ""
     if method.lower() == 'delete':
-        delete_object = kwargs['delete_object']
-        url = f"{url}{delete_object}"
+        path = kwargs['delete_object']
     if method.lower() == 'put':
-        put_object = kwargs['put_object']
-        url = f"{url}{put_object}"
+        path = kwargs['put_object']
     if method.lower() == 'post' and kwargs.get('post_object'):
-        post_object = kwargs['post_object']
-        url = f"{url}{post_object}"
+        path = kwargs['post_object']
     if method.lower() == 'get' and kwargs.get('get_object'):
-        get_object = kwargs['get_object']
-        url = f"{url}{get_object}"
-    response = requests.request(method=method,
-                                url=url,
-                                headers=headers,
-                                data=data,
-                                params=params,
-                                verify=verify,
-                                timeout=timeout)
+        path = kwargs['get_object']
+    url = f"{url}{path}"
+    transport: Transport = kwargs.get('transport') or token.transport
+    middleware: MiddlewareChain = (kwargs.get('middleware') or token.middleware or
+                                   default_middleware())
+    response = middleware.send(Request(method=method,
+                                       url=url,
+                                       url_type=url_type,
+                                       headers=headers,
+                                       data=data,
+                                       params=params,
+                                       verify=verify,
+                                       timeout=timeout,
+                                       auth=token,
+                                       priority=kwargs.get('priority')),
+                               transport)
     if '_errors' in response.json():
         raise SASEBadRequest(orjson.dumps(response.json()).decode('utf-8'))  # pylint: disable=no-member
-    if response.status_code == 404:
-        print(response.json())
-        print('fail')
     if response.status_code == 400:
         return response.json()
     response.raise_for_status()
+    if method != 'GET':
+        _name_index_invalidate(url_type)
+    if method != 'GET' and config.TRACK_CHANGES and token.tsg_id:
+        try:
+            change_tracker().record(tsg_id=token.tsg_id, method=method, url_type=url_type,
+                                    path=path, response=response.json(),
+                                    folder=(params or {}).get('folder', ''))
+        except OSError as err:
+            print(f"WARNING: unable to record change {type(err).__name__}: {err}")
     return response.json()
+
+
+def prisma_request_iter(token: Auth, url_type: str, params: dict, **kwargs) -> Iterator[dict]:
+    """Generator that pages through a list endpoint and yields each object
+     so callers never have to hold the full listing in memory. Unless a limit is
+     given the page size is negotiated per url type: it starts at the largest size
+     learned so far (PAGE_SIZE_MAX at first), drops to what the endpoint accepts when
+     a limit is rejected or capped, and halves or doubles with observed page latency.
+
+    Args:
+        token (Auth): Auth class that is used to refresh bearer token upon expiration.
+        url_type (str): specify the api call
+        params (dict): parameters passed to request such as the folder
+        limit (int, Optional): fixed page size; disables negotiation
+        offset (int, Optional): starting offset. Defaults to config.OFFSET
+        stream (bool, Optional): parse each page incrementally with
+         prisma_request_stream. Defaults to config.STREAM_LISTS
+        fields (Iterable[str], Optional): top level fields to keep such as ('id', 'name');
+         asked of the server as a fields parameter where accepted
+        verify (str|bool, optional): passed through to prisma_request
+
+    Yields:
+        Iterator[dict]: each object found in the 'data' of every page
+    """
+    negotiate: bool = not kwargs.get('limit')
+    limit: int = int(kwargs.pop('limit', 0) or page_size(url_type))
+    offset: int = int(kwargs.pop('offset', config.OFFSET) or config.OFFSET)
+    stream = kwargs.pop('stream', None)
+    stream = config.STREAM_LISTS if stream is None else stream
+    fields: Tuple[str, ...] = tuple(kwargs.pop('fields', None) or ())
+    while True:
+        page_params = {**_fields_params(url_type, params, fields),
+                       **{'limit': limit, 'offset': offset}}
+        count = 0
+        elapsed = 0.0
+        started = time.monotonic()
+        try:
+            if stream:
+                # only time spent reading the page counts, not the caller's work per object
+                page = prisma_request_stream(token, url_type=url_type, params=page_params,
+                                             **kwargs)
+                try:
+                    while True:
+                        try:
+                            obj = next(page)
+                        except StopIteration as stop:
+                            response = stop.value or {}
+                            break
+                        elapsed += time.monotonic() - started
+                        yield project_fields(obj, fields) if fields else obj
+                        count += 1
+                        started = time.monotonic()
+                finally:
+                    # releases the connection when the caller stops early
+                    page.close()
+                elapsed += time.monotonic() - started
+            else:
+                response = prisma_request(token,
+                                          method='GET',
+                                          url_type=url_type,
+                                          params=page_params,
+                                          **kwargs)
+                elapsed = time.monotonic() - started
+                count = len(response.get('data', []))
+                if fields:
+                    yield from (project_fields(obj, fields) for obj in response.get('data', []))
+                else:
+                    yield from response.get('data', [])
+        except SASEBadRequest as err:
+            if not count and _fields_rejected(url_type, page_params, str(err)):
+                continue
+            if (count or not negotiate or limit <= PAGE_SIZE_MIN or
+                    'limit' not in str(err).lower()):
+                raise
+            limit = _page_size_rejected(url_type, limit, str(err))
+            continue
+        served: int = int(response.get('limit') or limit)
+        offset += count
+        if not count or ('total' in response and offset >= int(response['total'])):
+            break
+        if count < min(limit, served):
+            if 'total' not in response:
+                break
+            # rows remain, so the endpoint capped the page without saying so
+            served = count
+        if negotiate:
+            limit = _page_size_observed(url_type, limit, served, elapsed)
+
+
+def prisma_request_stream(token: Auth, url_type: str, params: dict, **kwargs) -> Iterator[dict]:
+    """Reads one page of a list endpoint and yields each object of its 'data' as soon
+     as it is parsed, so peak memory stays about one object however large the page is.
+     The other top level fields ('total', 'limit', 'offset') are the generator's return
+     value. Only the retry, rate_limit, priority and auth stages of the middleware chain
+     apply; logging, metrics, cache and single_flight work on whole responses and are
+     skipped. Errors raise like prisma_request.
+
+    Args:
+        token (Auth): Auth class that is used to refresh bearer token upon expiration.
+        url_type (str): specify the api call
+        params (dict): parameters such as the folder, limit and offset
+        verify (str|bool, optional): Defaults to True
+        timeout (int, optional): Defaults to 90
+        transport (Transport, Optional): Defaults to the transport of the Auth
+        middleware (MiddlewareChain, Optional): Defaults to the chain of the Auth
+        priority (str, Optional): 'interactive'|'normal'|'bulk'
+
+    Raises:
+        SASEMissingParam: unknown url type
+        SASEBadRequest: the API returned errors
+
+    Yields:
+        Iterator[dict]: each object of the page
+    """
+    try:
+        url: str = config.REST_API[url_type]
+    except KeyError as err:
+        raise SASEMissingParam(f'incorrect url type: {str(err)}') # pylint: disable=raise-missing-from
+    token.refresh_expired()
+    transport: Transport = kwargs.get('transport') or token.transport
+    middleware: MiddlewareChain = (kwargs.get('middleware') or token.middleware or
+                                   default_middleware())
+    response = middleware.stream(Request(method='GET',
+                                         url=url,
+                                         url_type=url_type,
+                                         headers={"authorization": f"Bearer {token.token}",
+                                                  "content-type": "application/json",
+                                                  "accept-encoding": ACCEPT_ENCODING},
+                                         params=params,
+                                         verify=kwargs.get('verify', True),
+                                         timeout=kwargs.get('timeout', 90),
+                                         auth=token,
+                                         priority=kwargs.get('priority')),
+                                 transport)
+    try:
+        if response.status_code >= 400:
+            body = TransportResponse(status_code=response.status_code, content=response.read())
+            if '_errors' in body.json():
+                raise SASEBadRequest(body.content.decode('utf-8'))
+            body.raise_for_status()
+        meta = yield from iter_list_response(response.chunks)
+    finally:
+        response.close()
+    if '_errors' in meta:
+        raise SASEBadRequest(orjson.dumps(meta).decode('utf-8'))  # pylint: disable=no-member
+    return meta
+
+
+def page_size(url_type: str) -> int:
+    """Page size prisma_request_iter will use next for a url type
+
+    Args:
+        url_type (str): _description_
+
+    Returns:
+        int: _description_
+    """
+    with _LEARNED_LOCK:
+        if url_type in _PAGE_SIZES:
+            return _PAGE_SIZES[url_type]
+        # endpoints of one API tend to share a maximum; start from the largest one seen
+        return max(_PAGE_CEILINGS.values(), default=PAGE_SIZE_MAX)
+
+
+def _page_size_rejected(url_type: str, limit: int, error: str) -> int:
+    # use the maximum the error gives for the limit ('limit must be <= 1000');
+    # other numbers in the message such as ids or codes are ignored
+    allowed: Optional[int] = None
+    for tail in re.findall(r"limit\b((?:\W+\w+){1,5})", error, re.IGNORECASE):
+        for number in re.findall(r"\b\d+\b", tail):
+            if PAGE_SIZE_MIN <= int(number) < limit:
+                allowed = max(allowed or 0, int(number))
+    ceiling = allowed or max(PAGE_SIZE_MIN, limit // 2)
+    with _LEARNED_LOCK:
+        _PAGE_CEILINGS[url_type] = ceiling
+        _PAGE_SIZES[url_type] = ceiling
+    print(f"INFO: {url_type} rejected limit={limit}; using {ceiling}")
+    return ceiling
+
+
+def _page_size_observed(url_type: str, limit: int, served: int, elapsed: float) -> int:
+    with _LEARNED_LOCK:
+        if served < limit:
+            # the endpoint silently capped the page
+            _PAGE_CEILINGS[url_type] = served
+            limit = served
+        ceiling = _PAGE_CEILINGS.get(url_type, PAGE_SIZE_MAX)
+        if elapsed > PAGE_LATENCY_TARGET:
+            limit = max(PAGE_SIZE_MIN, limit // 2)
+        elif elapsed < PAGE_LATENCY_TARGET / 4 and limit < ceiling:
+            limit = min(ceiling, limit * 2)
+        _PAGE_SIZES[url_type] = limit
+    return limit
+
+
+def prisma_request_lookup(token: Auth, url_type: str, name: str, params: dict,
+                          **kwargs) -> Dict[str, Any]:
+    """Finds one object by exact name. The name is filtered on the server so a single
+     object is transferred; endpoints that ignore the name parameter fall back to a
+     short lived name index built from one full listing. Endpoints matching names by
+     substring are filtered client side.
+
+    Args:
+        token (Auth): Auth class that is used to refresh bearer token upon expiration.
+        url_type (str): specify the api call
+        name (str): object name
+        params (dict): parameters passed to request such as the folder
+        fields (Iterable[str], Optional): top level fields to keep such as ('id',);
+         the name is always kept
+        verify (str|bool, optional): passed through to prisma_request
+
+    Raises:
+        SASEBadRequest: the API returned an error other than object not found
+
+    Returns:
+        Dict[str, Any]: the object or an empty dict if it does not exist
+    """
+    fields: Tuple[str, ...] = tuple(kwargs.pop('fields', None) or ())
+    if fields and 'name' not in fields:
+        fields += ('name',)
+    while url_type not in _NAME_FILTER_UNSUPPORTED:
+        lookup_params = {**_fields_params(url_type, params, fields), **{'name': name}}
+        try:
+            response = prisma_request(token,
+                                      method='GET',
+                                      url_type=url_type,
+                                      params=lookup_params,
+                                      **kwargs)
+        except SASEBadRequest as err:
+            if _fields_rejected(url_type, lookup_params, str(err)):
+                continue
+            if api_error_is(err, API_ERRORS_NOT_FOUND):
+                return {}
+            raise
+        data = response.get('data')
+        if not isinstance(data, list):
+            # a single object rather than a list
+            found: Dict[str, Any] = response if response.get('name') == name else {}
+            return project_fields(found, fields) if fields and found else found
+        if all(name.lower() in str(entry.get('name', '')).lower() for entry in data):
+            # exact or substring matches; the exact one may be on a later page
+            entries: Iterator[dict] = iter(data)
+            if int(response.get('total') or 0) > len(data):
+                entries = itertools.chain(data, prisma_request_iter(
+                    token, url_type=url_type, params={**params, **{'name': name}},
+                    offset=len(data), **kwargs))
+            for entry in entries:
+                if entry.get('name') == name:
+                    return project_fields(entry, fields) if fields else entry
+            return {}
+        print(f"INFO: {url_type} does not filter by name; using a name index")
+        with _LEARNED_LOCK:
+            _NAME_FILTER_UNSUPPORTED.add(url_type)
+    key = (str(token.tsg_id), url_type, str(sorted(params.items())), fields)
+    with _NAME_INDEXES_LOCK:
+        created, index = _NAME_INDEXES.get(key, (0.0, {}))
+    if time.time() - created > NAME_INDEX_MAX_AGE:
+        index = {entry['name']: entry
+                 for entry in prisma_request_iter(token, url_type=url_type,
+                                                  params=dict(params), fields=fields,
+                                                  **kwargs)}
+        with _NAME_INDEXES_LOCK:
+            _NAME_INDEXES[key] = (time.time(), index)
+    return index.get(name, {})
+
+
+def _fields_params(url_type: str, params: dict, fields: Tuple[str, ...]) -> dict:
+    if not fields or url_type in _FIELDS_UNSUPPORTED:
+        return dict(params)
+    return {**params, **{'fields': ','.join(fields)}}
+
+
+def _fields_rejected(url_type: str, params: dict, error: str) -> bool:
+    # a 400 naming the fields parameter; retried without it from then on
+    if 'fields' not in params or 'field' not in error.lower():
+        return False
+    print(f"INFO: {url_type} does not accept fields; projecting client side")
+    with _LEARNED_LOCK:
+        _FIELDS_UNSUPPORTED.add(url_type)
+    return True
+
+
+def _name_index_invalidate(url_type: str) -> None:
+    with _NAME_INDEXES_LOCK:
+        for key in [key for key in _NAME_INDEXES if key[1] == url_type]:
+            del _NAME_INDEXES[key]
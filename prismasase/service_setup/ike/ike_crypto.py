@@ -2,7 +2,8 @@
 
 from prismasase import return_auth
 from prismasase.configs import Auth
-from prismasase.restapi import prisma_request
+from prismasase.restapi import prisma_request_lookup
+from prismasase.statics import ID_FIELDS
 
 def ike_crypto_profiles_get(ike_crypto_profile: str, folder: dict, **kwargs) -> str:
     """Checks if IKE Crypto Profile Exists
@@ -14,17 +15,11 @@ def ike_crypto_profiles_get(ike_crypto_profile: str, folder: dict, **kwargs) ->
         str: _description_
     """
     auth: Auth = return_auth(**kwargs)
-    ike_crypto_profile_id = ""
-    #ike_crypto_profile_exists: bool = False
     params = folder
-    ike_crypto_profiles = prisma_request(
-        token=auth,
-        url_type='ike-crypto-profiles',
-        method="GET",
-        params=params,
-        verify=auth.verify)
-    for entry in ike_crypto_profiles['data']:
-        if entry['name'] == ike_crypto_profile:
-            # ike_crypto_profile_exists = True
-            ike_crypto_profile_id = entry['id']
-    return ike_crypto_profile_id
+    entry = prisma_request_lookup(auth,
+                                  url_type='ike-crypto-profiles',
+                                  name=ike_crypto_profile,
+                                  params=params,
+                                  fields=ID_FIELDS,
+                                  verify=auth.verify)
+    return entry.get('id', '')
@@ -7,9 +7,9 @@ import orjson
 from prismasase import return_auth
 from prismasase.configs import Auth
 from prismasase.exceptions import (SASEBadParam, SASEBadRequest, SASEMissingParam)
-from prismasase.restapi import prisma_request
-from prismasase.statics import DYNAMIC
-from prismasase.utilities import default_params, set_bool
+from prismasase.restapi import prisma_request, prisma_request_iter, prisma_request_lookup
+from prismasase.statics import DYNAMIC, ID_FIELDS
+from prismasase.utilities import object_already_exists, set_bool
 
 
 def ike_gateway(pre_shared_key: str,
@@ -28,8 +28,11 @@ def ike_gateway(pre_shared_key: str,
         ike_crypto_profile (str): _description_
         peer_id_type (str): Requires one of 'ipaddr'|'fqdn'|'keyid'|'ufqdn'
         local_id_type (str): Requires one of 'ipaddr'|'fqdn'|'keyid'|'ufqdn'
+        optimistic (bool, Optional): POST first and only look up the id to update when
+         the API reports the gateway already exists. Defaults to False
     """
     auth: Auth = return_auth(**kwargs)
+    optimistic: bool = kwargs.pop('optimistic', False)
     ike_gateway_exists: bool = False
     ike_gateway_id: str = ""
     response = {}
@@ -39,13 +42,22 @@ def ike_gateway(pre_shared_key: str,
                                       ike_gateway_name=ike_gateway_name,
                                       ike_crypto_profile=ike_crypto_profile,
                                       **kwargs)
-    # Get all current IKE Gateways
-    ike_gateways = ike_gateway_list(folder=folder, auth=auth)
+    if optimistic:
+        try:
+            return ike_gateway_create(data=dict(data), folder=folder, **kwargs)
+        except SASEBadRequest as err:
+            if not object_already_exists(err):
+                raise
     # Check if ike_gateway already exists
-    for ike_gw in ike_gateways['data']:
-        if ike_gw['name'] == ike_gateway_name:
-            ike_gateway_exists = True
-            ike_gateway_id = ike_gw['id']
+    ike_gw = prisma_request_lookup(auth,
+                                   url_type='ike-gateways',
+                                   name=ike_gateway_name,
+                                   params=dict(folder),
+                                   fields=ID_FIELDS,
+                                   verify=auth.verify)
+    if ike_gw:
+        ike_gateway_exists = True
+        ike_gateway_id = ike_gw['id']
     # Run function based off information above
     if not ike_gateway_exists:
         response = ike_gateway_create(data=data, folder=folder, **kwargs)
@@ -112,7 +124,7 @@ def ike_gateway_update(ike_gateway_id: str, folder: dict, **kwargs) -> dict:
     response = prisma_request(token=auth,
                               method='PUT',
                               url_type='ike-gateways',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               verify=auth.verify,
                               put_object=f'/{ike_gateway_id}')
@@ -158,7 +170,7 @@ def ike_gateway_create(folder: dict, **kwargs) -> dict:
     response = prisma_request(token=auth,
                               method='POST',
                               url_type='ike-gateways',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               verify=auth.verify)
     # print(f"DEBUG: response={response}")
@@ -277,30 +289,21 @@ def ike_gateway_list(folder: dict, **kwargs) -> dict:
         dict: _description_
     """
     # Get all current IKE Gateways
-    # TODO: loop through get every single IKE Gateway like done in tags
     auth: Auth = return_auth(**kwargs)
-    params = default_params(**kwargs)
-    params.update(folder)
-    data = []
-    count = 0
+    # page size is negotiated unless a limit is passed
+    params = dict(folder)
+    data = list(prisma_request_iter(auth,
+                                    url_type='ike-gateways',
+                                    params=params,
+                                    verify=auth.verify,
+                                    limit=kwargs.get('limit'),
+                                    offset=kwargs.get('offset')))
     response = {
-        'data': [],
-        'offset': 0,
-        'total': 0,
-        'limit': 0
+        'data': data,
+        'offset': int(kwargs.get('offset') or 0),
+        'total': len(data),
+        'limit': len(data)
     }
-    # loops through to get all data
-    while (len(data) < response['total']) or count == 0:
-        response = prisma_request(token=auth,
-                                  url_type='ike-gateways',
-                                  method='GET',
-                                  params=params,
-                                  verify=auth.verify)
-        data = data + response['data']
-        # Adjust Params
-        params = {**params, **{'offset': params['offset'] + params['limit']}}
-        count += 1
-    response['data'] = data
     return response
 
 
@@ -2,7 +2,8 @@
 
 from prismasase import return_auth
 from prismasase.configs import Auth
-from prismasase.restapi import prisma_request
+from prismasase.restapi import prisma_request_lookup
+from prismasase.statics import ID_FIELDS
 
 def ipsec_crypto_profiles_get(ipsec_crypto_profile: str, folder: dict, **kwargs) -> str:
     """Checks if IPSec Crypto Profile Exists
@@ -14,16 +15,11 @@ def ipsec_crypto_profiles_get(ipsec_crypto_profile: str, folder: dict, **kwargs)
         bool: _description_
     """
     auth: Auth = return_auth(**kwargs)
-    ipsec_crypto_profile_id: str = ""
-    # ipsec_crypto_profile_exists: bool = False
     params = folder
-    ipsec_crypto_profiles = prisma_request(token=auth,
-                                           url_type='ipsec-crypto-profiles',
-                                           method="GET",
-                                           params=params,
-                                           verify=auth.verify)
-    for entry in ipsec_crypto_profiles['data']:
-        if entry['name'] == ipsec_crypto_profile:
-            # ipsec_crypto_profile_exists = True
-            ipsec_crypto_profile_id = entry['id']
-    return ipsec_crypto_profile_id
+    entry = prisma_request_lookup(auth,
+                                  url_type='ipsec-crypto-profiles',
+                                  name=ipsec_crypto_profile,
+                                  params=params,
+                                  fields=ID_FIELDS,
+                                  verify=auth.verify)
+    return entry.get('id', '')
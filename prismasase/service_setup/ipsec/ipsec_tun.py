@@ -8,7 +8,9 @@ import orjson
 from prismasase import return_auth
 from prismasase.configs import Auth
 from prismasase.exceptions import SASEBadRequest, SASEMissingParam
-from prismasase.restapi import prisma_request
+from prismasase.restapi import prisma_request, prisma_request_lookup
+from prismasase.statics import ID_FIELDS
+from prismasase.utilities import object_already_exists
 
 
 def ipsec_tunnel(ipsec_tunnel_name: str,  # pylint: disable=too-many-locals
@@ -27,6 +29,8 @@ def ipsec_tunnel(ipsec_tunnel_name: str,  # pylint: disable=too-many-locals
         ike_gateway_name (str): ike gateway name
         tunnel_monitor (bool): _description_
         monitor_ip (str, Optional): needed if tunnel_monitor is set to True
+        optimistic (bool, Optional): POST first and only look up the id to update when
+         the API reports the tunnel already exists. Defaults to False
 
     Raises:
         SASEMissingParam: _description_
@@ -51,15 +55,21 @@ def ipsec_tunnel(ipsec_tunnel_name: str,  # pylint: disable=too-many-locals
         else:
             raise SASEMissingParam("Missing monitor_ip value since " +
                                    "tunnel_monitor is set to enable")
-    ipsec_tunnels = prisma_request(token=auth,
-                                   method='GET',
+    if kwargs.get('optimistic'):
+        try:
+            return ipsec_tunnel_create(data=data, folder=folder, auth=auth)
+        except SASEBadRequest as err:
+            if not object_already_exists(err):
+                raise
+    tunnel = prisma_request_lookup(auth,
                                    url_type='ipsec-tunnels',
+                                   name=ipsec_tunnel_name,
                                    params=params,
+                                   fields=ID_FIELDS,
                                    verify=auth.verify)
-    for tunnel in ipsec_tunnels['data']:
-        if tunnel['name'] == ipsec_tunnel_name:
-            ipsec_tunnel_exists = True
-            ipsec_tunnel_id = tunnel['id']
+    if tunnel:
+        ipsec_tunnel_exists = True
+        ipsec_tunnel_id = tunnel['id']
     if not ipsec_tunnel_exists:
         response = ipsec_tunnel_create(data=data, folder=folder, auth=auth)
     else:
@@ -86,7 +96,7 @@ def ipsec_tunnel_create(data: Dict[str, Any], folder: dict, **kwargs):
     response = prisma_request(token=auth,
                               method="POST",
                               url_type='ipsec-tunnels',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               verify=auth.verify)
     # print(f"DEBUG: response={response}")
@@ -112,7 +122,7 @@ def ipsec_tunnel_update(data: Dict[str, Any], ipsec_tunnel_id: str, folder: dict
     response = prisma_request(token=auth,
                               method="PUT",
                               url_type='ipsec-tunnels',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               put_object=f'/{ipsec_tunnel_id}',
                               verify=auth.verify)
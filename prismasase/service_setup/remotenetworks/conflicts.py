@@ -0,0 +1,135 @@
+"""Remote Network Subnet and BGP Conflict Detection"""
+
+import heapq
+import ipaddress
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEConflictError
+from prismasase.restapi import prisma_request_iter
+from prismasase.statics import REMOTE_FOLDER
+from prismasase.utilities import set_bool
+
+
+def remote_network_conflicts(remote_sites: List[Dict[str, Any]],
+                             existing: Optional[List[Dict[str, Any]]] = None,
+                             **kwargs) -> List[Dict[str, Any]]:
+    """Finds every static subnet overlap and duplicate BGP address across an import
+     batch and the remote networks already in the tenant. Subnets are sorted once and
+     swept with a heap of open intervals, so the cost is O(n log n + conflicts)
+     rather than a pairwise comparison. Existing networks with the same name as a
+     site in the batch are treated as being replaced by that site.
+
+    Args:
+        remote_sites (List[Dict[str, Any]]): rows using the create_remote_network arguments
+         (remote_network_name, static_enabled, static_routing, bgp_enabled, bgp_peer_ip,
+         bgp_local_ip)
+        existing (List[Dict[str, Any]], optional): remote network objects; listed from
+         the tenant when not supplied
+        folder (dict, Optional): folder to list existing networks from. Default REMOTE_FOLDER
+        auth (Auth, Optional): tenant authorization
+
+    Returns:
+        List[Dict[str, Any]]: [{'type': 'subnet_overlap'|'bgp_ip_duplicate'|'invalid_subnet',
+         'sites': [...], 'values': [...]}]
+    """
+    if existing is None:
+        auth: Auth = return_auth(**kwargs)
+        existing = list(prisma_request_iter(auth,
+                                            url_type='remote-networks',
+                                            params=dict(kwargs.get('folder') or REMOTE_FOLDER),
+                                            verify=auth.verify))
+    entries = list(_site_entries(remote_sites))
+    batch_names = {str(site.get('remote_network_name') or site.get('name', ''))
+                   for site in remote_sites}
+    entries.extend(entry for entry in _existing_entries(existing) if entry[0] not in batch_names)
+    conflicts: List[Dict[str, Any]] = []
+    intervals: List[Tuple[int, int, int, str, str]] = []
+    bgp: Dict[str, List[Tuple[str, str]]] = {}
+    for name, kind, value in entries:
+        if kind == 'subnet':
+            try:
+                network = ipaddress.ip_network(value.strip(), strict=False)
+            except ValueError:
+                conflicts.append({'type': 'invalid_subnet', 'sites': [name], 'values': [value]})
+                continue
+            intervals.append((network.version, int(network.network_address),
+                              int(network.broadcast_address), name, str(network)))
+        else:
+            try:
+                address = ipaddress.ip_address(value.strip())
+            except ValueError:
+                continue
+            bgp.setdefault(str(address), []).append((name, kind))
+    conflicts.extend(_subnet_overlaps(intervals))
+    for address, owners in bgp.items():
+        sites = list(dict.fromkeys(name for name, _ in owners))
+        if len(sites) > 1:
+            conflicts.append({'type': 'bgp_ip_duplicate',
+                              'sites': sites,
+                              'values': [f"{kind}={address}" for _, kind in owners]})
+    return conflicts
+
+
+def remote_network_check_conflicts(remote_sites: List[Dict[str, Any]], **kwargs) -> None:
+    """Raises with every conflict found; nothing is written if this raises
+
+    Args:
+        remote_sites (List[Dict[str, Any]]): see remote_network_conflicts
+
+    Raises:
+        SASEConflictError: one or more conflicts found
+    """
+    conflicts = remote_network_conflicts(remote_sites=remote_sites, **kwargs)
+    if conflicts:
+        details = '; '.join(f"{conflict['type']}:{','.join(conflict['sites'])}:" +
+                            ','.join(conflict['values']) for conflict in conflicts)
+        raise SASEConflictError(f"message=\"{len(conflicts)} conflicts found\"|{details}")
+
+
+def _subnet_overlaps(intervals: List[Tuple[int, int, int, str, str]]) -> Iterable[Dict[str, Any]]:
+    """Sweep sorted intervals keeping a min heap of open intervals by end address"""
+    intervals.sort(key=lambda interval: (interval[0], interval[1], -interval[2]))
+    active: List[Tuple[int, int, str, str]] = []
+    current_version = 0
+    for version, start, end, name, subnet in intervals:
+        if version != current_version:
+            active, current_version = [], version
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        for _, _, other_name, other_subnet in active:
+            if other_name != name:
+                yield {'type': 'subnet_overlap',
+                       'sites': [other_name, name],
+                       'values': [other_subnet, subnet]}
+        heapq.heappush(active, (end, len(active), name, subnet))
+
+
+def _site_entries(remote_sites: List[Dict[str, Any]]) -> Iterable[Tuple[str, str, str]]:
+    for site in remote_sites:
+        name = str(site.get('remote_network_name') or site.get('name', ''))
+        if set_bool(site.get('static_enabled', ''), default=False) or (
+                'static_enabled' not in site and site.get('static_routing')):
+            routing = site.get('static_routing') or []
+            if isinstance(routing, str):
+                routing = [subnet for subnet in routing.split(',') if subnet.strip()]
+            for subnet in routing:
+                yield (name, 'subnet', str(subnet))
+        if set_bool(site.get('bgp_enabled', ''), default=False):
+            for kind in ['bgp_peer_ip', 'bgp_local_ip']:
+                if site.get(kind):
+                    yield (name, kind, str(site[kind]))
+
+
+def _existing_entries(existing: List[Dict[str, Any]]) -> Iterable[Tuple[str, str, str]]:
+    for network in existing:
+        name = str(network.get('name', ''))
+        for subnet in network.get('subnets') or []:
+            yield (name, 'subnet', str(subnet))
+        bgp = (network.get('protocol') or {}).get('bgp') or {}
+        if bgp.get('enable', True):
+            if bgp.get('peer_ip_address'):
+                yield (name, 'bgp_peer_ip', str(bgp['peer_ip_address']))
+            if bgp.get('local_ip_address'):
+                yield (name, 'bgp_local_ip', str(bgp['local_ip_address']))
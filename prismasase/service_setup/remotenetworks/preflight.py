@@ -0,0 +1,229 @@
+# pylint: disable=no-member
+"""Offline Preflight Validation of a Remote Network Inventory"""
+
+import csv
+import ipaddress
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import orjson
+
+from prismasase import return_auth
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam, SASEPreflightError
+from prismasase.restapi import prisma_request_iter
+from prismasase.statics import IKE_PEER_ID_TYPES, IKE_PROTOCOL_VERSIONS, REMOTE_FOLDER
+from prismasase.utilities import check_name_length, set_bool
+
+from .conflicts import remote_network_conflicts
+
+REQUIRED_FIELDS = ['remote_network_name', 'region', 'spn_name', 'ike_crypto_profile',
+                   'ipsec_crypto_profile', 'pre_shared_key', 'peer_id_value', 'local_id_value']
+NAME_LIMITS = {'remote_network_name': 31, 'ike_gateway_name': 63, 'ipsec_tunnel_name': 63}
+
+
+def remote_network_tenant_snapshot(folder: dict = REMOTE_FOLDER, **kwargs) -> Dict[str, Any]:
+    """Everything preflight needs from the tenant in one read: bandwidth allocations,
+     crypto profile names and the name, subnets and BGP addresses of existing networks
+
+    Args:
+        folder (dict, optional): Defaults to REMOTE_FOLDER
+        cache_file (str, Optional): reuse a snapshot saved here if newer than max_age
+         and save a fresh one to it otherwise
+        max_age (int, Optional): seconds a cached snapshot is valid. Defaults to 3600
+        refresh (bool, Optional): ignore the cache_file contents
+        stream (bool, Optional): parse list pages incrementally. Defaults to config.STREAM_LISTS
+        auth (Auth, Optional): tenant authorization
+
+    Returns:
+        Dict[str, Any]: snapshot
+    """
+    cache_file: str = kwargs.get('cache_file', '')
+    max_age = int(kwargs.get('max_age', 3600))
+    if cache_file and not kwargs.get('refresh') and os.path.exists(cache_file):
+        with open(cache_file, 'rb') as snapshot_file:
+            snapshot = orjson.loads(snapshot_file.read())
+        if time.time() - float(snapshot.get('created', 0)) <= max_age:
+            return snapshot
+    auth: Auth = return_auth(**kwargs)
+
+    def _list(url_type: str) -> Iterator[dict]:
+        return prisma_request_iter(auth, url_type=url_type, params=dict(folder),
+                                   stream=kwargs.get('stream'), verify=auth.verify)
+
+    snapshot = {
+        'tsg_id': auth.tsg_id,
+        'created': time.time(),
+        'folder': folder,
+        'bandwidth_allocations': [
+            {'name': entry['name'], 'spn_name_list': entry.get('spn_name_list') or []}
+            for entry in _list('bandwidth-allocations')],
+        'ike_crypto_profiles': [entry['name'] for entry in _list('ike-crypto-profiles')],
+        'ipsec_crypto_profiles': [entry['name'] for entry in _list('ipsec-crypto-profiles')],
+        'remote_networks': [
+            {key: network[key] for key in ['name', 'subnets', 'protocol'] if key in network}
+            for network in _list('remote-networks')]
+    }
+    if cache_file:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        with open(cache_file, 'wb') as snapshot_file:
+            snapshot_file.write(orjson.dumps(snapshot))
+    return snapshot
+
+
+def remote_network_load_inventory(path: str) -> List[Dict[str, Any]]:
+    """Reads a CSV (same columns as remote_networks.csv) or JSONL inventory
+
+    Args:
+        path (str): .csv, .jsonl or .json file
+
+    Raises:
+        SASEBadParam: unsupported file type
+
+    Returns:
+        List[Dict[str, Any]]: rows
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as inventory:
+            rows = [{key: value for key, value in row.items() if value not in (None, '')}
+                    for row in csv.DictReader(inventory)]
+        for row in rows:
+            # csv column names from the README import format
+            if 'local_fqdn' in row and 'local_id_value' not in row:
+                row['local_id_value'] = row.pop('local_fqdn')
+            if 'peer_fqdn' in row and 'peer_id_value' not in row:
+                row['peer_id_value'] = row.pop('peer_fqdn')
+        return rows
+    if path.lower().endswith(('.jsonl', '.json')):
+        with open(path, 'rb') as inventory:
+            return [orjson.loads(line) for line in inventory if line.strip()]
+    raise SASEBadParam(f"message=\"inventory must be csv or jsonl\"|{path=}")
+
+
+def remote_network_preflight(remote_sites: List[Dict[str, Any]],
+                             snapshot: Optional[Dict[str, Any]] = None,
+                             **kwargs) -> Dict[str, Any]:
+    """Validates every row of an inventory locally in one pass against a tenant
+     snapshot and reports every problem instead of stopping at the first one
+
+    Args:
+        remote_sites (List[Dict[str, Any]]): rows using the create_remote_network arguments
+        snapshot (Dict[str, Any], optional): from remote_network_tenant_snapshot; taken
+         from the tenant when not supplied (kwargs are passed through)
+
+    Returns:
+        Dict[str, Any]: {'status': 'success'|'error', 'rows': int,
+         'errors': [{'row', 'name', 'field', 'message'}], 'warnings': [...]}
+    """
+    if snapshot is None:
+        snapshot = remote_network_tenant_snapshot(**kwargs)
+    spn_regions: Dict[str, List[str]] = {}
+    for entry in snapshot['bandwidth_allocations']:
+        for spn_name in entry['spn_name_list']:
+            spn_regions.setdefault(spn_name, []).append(entry['name'].lower())
+    ike_profiles = set(snapshot['ike_crypto_profiles'])
+    ipsec_profiles = set(snapshot['ipsec_crypto_profiles'])
+    existing = {network['name'] for network in snapshot['remote_networks']}
+    errors: List[Dict[str, Any]] = []
+    warnings: List[Dict[str, Any]] = []
+    rows_by_name: Dict[str, int] = {}
+    for row_num, site in enumerate(remote_sites, start=1):
+        name = str(site.get('remote_network_name', ''))
+
+        def _error(field: str, message: str, row_num=row_num, name=name) -> None:
+            errors.append({'row': row_num, 'name': name, 'field': field, 'message': message})
+
+        for field in REQUIRED_FIELDS:
+            if not site.get(field):
+                _error(field, 'missing required parameter')
+        if name:
+            if name in rows_by_name:
+                _error('remote_network_name', f"duplicate of row {rows_by_name[name]}")
+            else:
+                rows_by_name[name] = row_num
+            if name in existing:
+                warnings.append({'row': row_num, 'name': name, 'field': 'remote_network_name',
+                                 'message': 'already exists and will be updated'})
+            derived = {
+                'remote_network_name': name,
+                'ike_gateway_name': site.get('ike_gateway_name') or f"ike-gwy-{name}",
+                'ipsec_tunnel_name': site.get('ipsec_tunnel_name') or f"ipsec-tunnel-{name}"}
+            for field, value in derived.items():
+                if not check_name_length(name=value, length=NAME_LIMITS[field]):
+                    _error(field, f"greater than allowed {NAME_LIMITS[field]}: {value}")
+        region = str(site.get('region', ''))
+        spn_name = str(site.get('spn_name', ''))
+        if region and spn_name and not any(
+                allocated in region.lower() for allocated in spn_regions.get(spn_name, [])):
+            _error('spn_name', f"no bandwidth allocation for {region=} {spn_name=}")
+        if site.get('ike_crypto_profile') and site['ike_crypto_profile'] not in ike_profiles:
+            _error('ike_crypto_profile', f"profile not found: {site['ike_crypto_profile']}")
+        if site.get('ipsec_crypto_profile') and site['ipsec_crypto_profile'] not in ipsec_profiles:
+            _error('ipsec_crypto_profile', f"profile not found: {site['ipsec_crypto_profile']}")
+        for field in ['peer_id_type', 'local_id_type']:
+            if site.get(field) and site[field] not in IKE_PEER_ID_TYPES:
+                _error(field, f"must be one of {'|'.join(IKE_PEER_ID_TYPES)}")
+        if site.get('ike_protocol_version') and (
+                site['ike_protocol_version'] not in IKE_PROTOCOL_VERSIONS):
+            _error('ike_protocol_version', f"must be one of {'|'.join(IKE_PROTOCOL_VERSIONS)}")
+        if str(site.get('peer_address_type', 'dynamic')).lower() != 'dynamic' and (
+                not site.get('peer_address') or site.get('peer_address') == 'dynamic'):
+            _error('peer_address', 'required when peer_address_type is not dynamic')
+        if set_bool(site.get('tunnel_monitor', ''), default=False):
+            _check_ip(site, 'monitor_ip', _error)
+        if set_bool(site.get('static_enabled', ''), default=False):
+            routing = site.get('static_routing') or ''
+            subnets = routing.split(',') if isinstance(routing, str) else list(routing)
+            if not [subnet for subnet in subnets if str(subnet).strip()]:
+                _error('static_routing', 'required subnet if static routing enabled')
+        if set_bool(site.get('bgp_enabled', ''), default=False):
+            _check_ip(site, 'bgp_peer_ip', _error)
+            _check_ip(site, 'bgp_local_ip', _error)
+            try:
+                if not 1 <= int(site.get('bgp_peer_as', '')) <= 4294967295:
+                    raise ValueError
+            except ValueError:
+                _error('bgp_peer_as', f"invalid AS number: {site.get('bgp_peer_as', '')}")
+    for conflict in remote_network_conflicts(remote_sites=remote_sites,
+                                             existing=snapshot['remote_networks']):
+        for site_name in conflict['sites']:
+            if site_name in rows_by_name:
+                errors.append({'row': rows_by_name[site_name], 'name': site_name,
+                               'field': conflict['type'],
+                               'message': f"{','.join(conflict['sites'])}: " +
+                               ','.join(conflict['values'])})
+                break
+    errors.sort(key=lambda error: error['row'])
+    return {'status': 'error' if errors else 'success',
+            'rows': len(remote_sites),
+            'errors': errors,
+            'warnings': warnings}
+
+
+def remote_network_check_preflight(remote_sites: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """Runs remote_network_preflight and raises if any row fails
+
+    Args:
+        remote_sites (List[Dict[str, Any]]): rows
+
+    Raises:
+        SASEPreflightError: one or more rows failed; nothing has been written
+
+    Returns:
+        Dict[str, Any]: the preflight report
+    """
+    report = remote_network_preflight(remote_sites=remote_sites, **kwargs)
+    if report['errors']:
+        details = '; '.join(f"row {error['row']} {error['name']} {error['field']}: " +
+                            error['message'] for error in report['errors'][:20])
+        raise SASEPreflightError(
+            f"message=\"{len(report['errors'])} preflight errors\"|{details}")
+    return report
+
+
+def _check_ip(site: Dict[str, Any], field: str, error) -> None:
+    try:
+        ipaddress.ip_address(str(site.get(field, '')).strip())
+    except ValueError:
+        error(field, f"invalid ip address: {site.get(field, '')}")
@@ -1,7 +1,7 @@
 # pylint: disable=raise-missing-from
 """Remote Networks"""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import ipaddress
 import json
 import orjson
@@ -9,27 +9,91 @@ import orjson
 from prismasase import return_auth
 
 from prismasase.configs import Auth
+from prismasase.journal import Journal, journal_open
+from prismasase.middleware import priority_lane
 from prismasase.exceptions import (
     SASEBadParam, SASEBadRequest, SASEMissingIkeOrIpsecProfile, SASEMissingParam,
     SASENoBandwidthAllocation)
-from prismasase.restapi import prisma_request
-from prismasase.statics import FOLDER, REMOTE_FOLDER
-from prismasase.utilities import set_bool
+from prismasase.restapi import prisma_request, prisma_request_lookup
+from prismasase.statics import FOLDER, ID_FIELDS, REMOTE_FOLDER
+from prismasase.utilities import object_already_exists, set_bool
 from ..ipsec.ipsec_tun import ipsec_tunnel
 from ..ipsec.ipsec_crypto import ipsec_crypto_profiles_get
 from ..ike.ike_crypto import ike_crypto_profiles_get
 from ..ike.ike_gtwy import ike_gateway
+from .conflicts import remote_network_check_conflicts
+from .preflight import remote_network_check_preflight
 
 
-def bulk_import_remote_networks(remote_sites: list):
-    """_summary_
+def bulk_import_remote_networks(remote_sites: list, **kwargs) -> Dict[str, Any]:
+    """Onboards a list of remote sites. Every row is validated offline against one
+     tenant snapshot (required fields, names, bandwidth allocations, crypto profiles,
+     addressing, subnet overlaps and duplicate BGP addresses) before any write;
+     after that each site is created in order and failures are noted per site.
 
     Args:
-        remote_sites (list): _description_
+        remote_sites (list): list of dicts using the create_remote_network arguments
+        auth (Auth, Optional): Authorization if none supplied it defaults to the Yaml Config
+        folder (dict, Optional): Defaults to REMOTE_FOLDER
+        preflight (bool, Optional): run remote_network_preflight first. Defaults to True
+        snapshot (dict, Optional): tenant snapshot for preflight (remote_network_tenant_snapshot)
+        check_conflicts (bool, Optional): only check conflicts when preflight is off.
+         Defaults to True
+        journal (Journal|str, Optional): write-ahead journal (or its path). Every completed
+         step is recorded; rerunning with the same journal skips finished sites without
+         any API call and resumes a partly built site at the step where it stopped
+        optimistic (bool, Optional): create each object with one POST and only look up
+         and update objects the API reports as existing. Defaults to False
+        priority (str, Optional): priority class of the import's requests. Defaults to 'bulk'
+
+    Raises:
+        SASEPreflightError: preflight found errors; nothing has been written
+        SASEConflictError: conflicts found; nothing has been written
+
+    Returns:
+        Dict[str, Any]: {'status': 'success'|'partial'|'error', 'results': [...]}
     """
-    # TODO: build in a way to bulk import if list
-    # or dictionary is fead into this process
-    pass
+    auth: Auth = return_auth(**kwargs)
+    folder: dict = kwargs.get('folder') or REMOTE_FOLDER
+    journal: Optional[Journal] = journal_open(kwargs.get('journal'))
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    for site in remote_sites:
+        name = site.get('remote_network_name', '')
+        if journal and 'remote_network' in journal.completed(name, Journal.digest(site)):
+            results.append({'name': name, 'status': 'success', 'message': 'journaled'})
+        else:
+            pending.append(site)
+    if journal and results:
+        print(f"INFO: {len(results)} remote networks already complete in {journal.path}")
+    remote_sites = pending
+    # the import yields the tenant's rate limit to interactive calls made meanwhile
+    with priority_lane(kwargs.get('priority') or 'bulk'):
+        if remote_sites and kwargs.get('preflight', True):
+            remote_network_check_preflight(remote_sites=remote_sites,
+                                           snapshot=kwargs.get('snapshot'),
+                                           folder=folder,
+                                           auth=auth)
+        elif remote_sites and kwargs.get('check_conflicts', True):
+            remote_network_check_conflicts(remote_sites=remote_sites, folder=folder, auth=auth)
+        for site in remote_sites:
+            site = {**site, **{'auth': auth, 'journal': journal}}
+            if kwargs.get('optimistic'):
+                site['optimistic'] = True
+            name = site.get('remote_network_name', '')
+            try:
+                response = create_remote_network(**site)
+                results.append({'name': name, 'status': response['status'],
+                                'message': response['message']})
+            except Exception as err:  # pylint: disable=broad-except
+                print(f"ERROR: remote network {name} failed {type(err).__name__}: {err}")
+                results.append({'name': name, 'status': 'error',
+                                'message': f"{type(err).__name__}: {err}"})
+    if journal and journal is not kwargs.get('journal'):
+        journal.close()
+    errors = sum(1 for result in results if result['status'] != 'success')
+    status = 'success' if not errors else ('error' if errors == len(results) else 'partial')
+    return {'status': status, 'results': results}
 
 
 def create_remote_network(**kwargs) -> Dict[str, Any]:  # pylint: disable=too-many-locals
@@ -60,7 +124,9 @@ def create_remote_network(**kwargs) -> Dict[str, Any]:  # pylint: disable=too-ma
         bgp_peer_as (str): Required if bgp_enabled is 'true'
         static_enabled (str|bool): Sets Static routing enabled or disabled use string 'true' or 'false' Defaults 'false'
         tunnel_monitor (str|bool): Sets Tunnel Monitoring to enabled or disabled use string 'true' or 'false' Defaults 'false'
-
+        journal (Journal, Optional): records each completed step and skips steps already
+         journaled for this remote_network_name with the same arguments
+        optimistic (bool, Optional): POST each object first; see ike_gateway
 
     Raises:
         SASEMissingParam: _description_
@@ -70,6 +136,8 @@ def create_remote_network(**kwargs) -> Dict[str, Any]:  # pylint: disable=too-ma
         "status": "error",
         "message": {},
     }
+    journal: Optional[Journal] = kwargs.pop('journal', None)
+    digest = Journal.digest(kwargs) if journal else ''
     try:
         auth: Auth = return_auth(**kwargs)
         remote_network_name: str = kwargs.pop('remote_network_name')
@@ -95,49 +163,67 @@ def create_remote_network(**kwargs) -> Dict[str, Any]:  # pylint: disable=too-ma
             folder: dict = kwargs['folder'] if kwargs.get('folder') else REMOTE_FOLDER
     except KeyError as err:
         raise SASEMissingParam(f"message=\"missing required parameter\"|param={str(err)}")
-    # Check Bandwdith allocations
-    # print(f"{region=},{spn_name=}")
-    bandwidth_check = verify_bandwidth_allocations(
-        name=region, spn_name=spn_name, folder=folder, auth=auth)
-    if not bandwidth_check:
-        raise SASENoBandwidthAllocation(
-            "No Bandwidth Association or allocations exists for " + f"{region=} {spn_name=}")
-    # Verify IKE and IPSec Profiles exist
-    if not verify_ike_ipsec_profiles_exist(ike_crypto_profile=ike_crypto_profile,
-                                           ipsec_crypto_profile=ipsec_crypto_profile,
-                                           folder=folder, auth=auth):
-        raise SASEMissingIkeOrIpsecProfile(
-            'message=\"Missing a profile in configurations\"|' +
-            f'{ike_crypto_profile=}|{ipsec_crypto_profile=}')
-    print(f"INFO: Verified {region=} and {spn_name=} exist")
+    completed = journal.completed(remote_network_name, digest) if journal else {}
+    # checks already passed before the first journaled step was written
+    if not completed:
+        # Check Bandwdith allocations
+        # print(f"{region=},{spn_name=}")
+        bandwidth_check = verify_bandwidth_allocations(
+            name=region, spn_name=spn_name, folder=folder, auth=auth)
+        if not bandwidth_check:
+            raise SASENoBandwidthAllocation(
+                "No Bandwidth Association or allocations exists for " + f"{region=} {spn_name=}")
+        # Verify IKE and IPSec Profiles exist
+        if not verify_ike_ipsec_profiles_exist(ike_crypto_profile=ike_crypto_profile,
+                                               ipsec_crypto_profile=ipsec_crypto_profile,
+                                               folder=folder, auth=auth):
+            raise SASEMissingIkeOrIpsecProfile(
+                'message=\"Missing a profile in configurations\"|' +
+                f'{ike_crypto_profile=}|{ipsec_crypto_profile=}')
+        print(f"INFO: Verified {region=} and {spn_name=} exist")
+    else:
+        print(f"INFO: Resuming {remote_network_name} after {', '.join(completed)}")
     # Create IKE Gateway
     print(f"INFO: IKE Gateway Name = {ike_gateway_name}")
     # Create IKE Gateway
-    response_ike_gateway = ike_gateway(pre_shared_key=pre_shared_key,
-                                       ike_crypto_profile=ike_crypto_profile,
-                                       ike_gateway_name=ike_gateway_name,
-                                       folder=folder,
-                                       **kwargs)
+    if 'ike_gateway' in completed:
+        response_ike_gateway = completed['ike_gateway']
+    else:
+        response_ike_gateway = ike_gateway(pre_shared_key=pre_shared_key,
+                                           ike_crypto_profile=ike_crypto_profile,
+                                           ike_gateway_name=ike_gateway_name,
+                                           folder=folder,
+                                           **kwargs)
+        _journal_step(journal, remote_network_name, 'ike_gateway', response_ike_gateway, digest)
     # print(f"DEBUG: IKE Gateway {response_ike_gateway=}")
     response['message'].update({'ike_gateway': response_ike_gateway})
     # Create IPSec Tunnel
-    response_ipsec_tunnel = ipsec_tunnel(ipsec_tunnel_name=ipsec_tunnel_name,
-                                         ipsec_crypto_profile=ipsec_crypto_profile,
-                                         ike_gateway_name=ike_gateway_name,
-                                         tunnel_monitor=tunnel_monitor,
-                                         folder=folder,
-                                         **kwargs)
+    if 'ipsec_tunnel' in completed:
+        response_ipsec_tunnel = completed['ipsec_tunnel']
+    else:
+        response_ipsec_tunnel = ipsec_tunnel(ipsec_tunnel_name=ipsec_tunnel_name,
+                                             ipsec_crypto_profile=ipsec_crypto_profile,
+                                             ike_gateway_name=ike_gateway_name,
+                                             tunnel_monitor=tunnel_monitor,
+                                             folder=folder,
+                                             **kwargs)
+        _journal_step(journal, remote_network_name, 'ipsec_tunnel', response_ipsec_tunnel, digest)
     response['message'].update({'ipsec_tunnel': response_ipsec_tunnel})
     # print(f"DEBUG: IPSec Tunnel {response_ipsec_tunnel=}")
     # Create Remote Network
-    response_remote_network = remote_network(remote_network_name=remote_network_name,
-                                             ipsec_tunnel_name=ipsec_tunnel_name,
-                                             region=region,
-                                             spn_name=spn_name,
-                                             static_enabled=static_enabled,
-                                             bgp_enabled=bgp_enabled,
-                                             folder=folder,
-                                             **kwargs)
+    if 'remote_network' in completed:
+        response_remote_network = completed['remote_network']
+    else:
+        response_remote_network = remote_network(remote_network_name=remote_network_name,
+                                                 ipsec_tunnel_name=ipsec_tunnel_name,
+                                                 region=region,
+                                                 spn_name=spn_name,
+                                                 static_enabled=static_enabled,
+                                                 bgp_enabled=bgp_enabled,
+                                                 folder=folder,
+                                                 **kwargs)
+        _journal_step(journal, remote_network_name, 'remote_network', response_remote_network,
+                      digest)
     response['message'].update({'remote_network': response_remote_network})
     response['status'] = 'success'
     # print(f"DEBUG: Remote Network {response_remote_network=}")
@@ -145,6 +231,13 @@ def create_remote_network(**kwargs) -> Dict[str, Any]:  # pylint: disable=too-ma
     return response
 
 
+def _journal_step(journal: Optional[Journal], name: str, step: str, result: dict,
+                  digest: str) -> None:
+    """Journals a step only once the API returned the created or updated object"""
+    if journal and isinstance(result, dict) and result.get('id') and '_errors' not in result:
+        journal.record(key=name, step=step, result=result, digest=digest)
+
+
 def verify_bandwidth_allocations(name: str, spn_name: str, folder: dict, **kwargs) -> bool:
     """Verifies that the region has allocated bandwidth and that the spn exists
 
@@ -222,6 +315,8 @@ def remote_network(remote_network_name: str,
         spn_name (str): _description_
         static_enabled (bool): _description_
         bgp_enabled (bool): _description_
+        optimistic (bool, Optional): POST first and only look up the id to update when
+         the API reports the remote network already exists. Defaults to False
 
     Raises:
         SASEMissingParam: _description_
@@ -253,17 +348,22 @@ def remote_network(remote_network_name: str,
                 f'message=\"required when static_enabled is True\"|param={str(err)}')
     if bgp_enabled:
         data = create_remote_network_bgp_payload(data=data, **kwargs)
+    if kwargs.get('optimistic'):
+        try:
+            return remote_network_create(data=data, folder=folder, auth=auth)
+        except SASEBadRequest as err:
+            if not object_already_exists(err):
+                raise
     # Check if remote network already exists
-    remote_networks = prisma_request(token=auth,
-                                     url_type='remote-networks',
-                                     method='GET',
-                                     params=params,
-                                     verify=auth.verify)
-    # Check if remote network already exists
-    for network in remote_networks['data']:
-        if network['name'] == remote_network_name:
-            remote_network_exists = True
-            remote_network_id = network['id']
+    network = prisma_request_lookup(auth,
+                                    url_type='remote-networks',
+                                    name=remote_network_name,
+                                    params=params,
+                                    fields=ID_FIELDS,
+                                    verify=auth.verify)
+    if network:
+        remote_network_exists = True
+        remote_network_id = network['id']
     # Run create or update functions
     if not remote_network_exists:
         response = remote_network_create(data=data,
@@ -292,7 +392,7 @@ def remote_network_create(data: dict, folder: dict, **kwargs) -> dict:
     response = prisma_request(token=auth,
                               method='POST',
                               url_type='remote-networks',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               verify=auth.verify)
     # print(f"DEBUG: response={response}")
@@ -316,7 +416,7 @@ def remote_network_update(data: dict, remote_network_id: str, folder: dict, **kw
     # print(f"DEBUG: remote_network_create={json.dumps(data)}")
     response = prisma_request(token=auth,
                               method='PUT',
-                              data=json.dumps(data),
+                              data=data,
                               params=params,
                               url_type='remote-networks',
                               verify=auth.verify,
@@ -445,15 +545,17 @@ def remote_network_identifier(name: str, folder: dict, **kwargs) -> dict:
 
     Args:
         name (str): _description_
+        fields (Iterable[str], Optional): keep only these fields such as ID_FIELDS;
+         the whole object by default
 
     Returns:
         dict: _description_
     """
     auth: Auth = return_auth(**kwargs)
-    response: dict = {}
-    remote_net_list = remote_network_list(folder=folder, auth=auth)
-    for remote_net in remote_net_list['data']:
-        if name in remote_net_list['name']:
-            response = remote_net
-            break
+    response: dict = prisma_request_lookup(auth,
+                                           url_type='remote-networks',
+                                           name=name,
+                                           params=dict(folder),
+                                           fields=kwargs.get('fields'),
+                                           verify=auth.verify)
     return response
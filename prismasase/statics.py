@@ -12,6 +12,12 @@ FOLDER: dict = {
     'Service Connections': SERVICE_FOLDER,
     'Shared': SHARED_FOLDER
 }
+# fields kept by existence and id lookups
+ID_FIELDS: tuple = ('id', 'name')
+# codes, messages and errorTypes in the _errors of a response for a missing object
+API_ERRORS_NOT_FOUND: tuple = ('E005', 'Object Not Present', 'Object Not Found')
+# ... and for a create of an object whose name is taken
+API_ERRORS_EXISTS: tuple = ('E006', 'Name Not Unique', 'Object Already Exists')
 
 # TAG Statics
 TAG_COLORS = [
@@ -22,6 +28,9 @@ TAG_COLORS = [
     'Blue', 'Violet', 'Medium', 'Violet', 'Medium', 'Rose', 'Lavender', 'Orchid', 'Thistle', 'Peach',
     'Salmon', 'Magenta', 'Red', 'Violet', 'Mahogany', 'Burnt', 'Sienna', 'Chestnut']
 
+# fields kept by tag indexes
+TAG_FIELDS: tuple = ('id', 'name', 'folder', 'color', 'comments')
+
 # AUTO TAG STATICS
 AUTOTAG_ACTIONS = ["add-tag", "remove-tag"]
 AUTOTAG_TARGET = ["source-address", "destination-address", "user", "xff-address"]
@@ -29,3 +38,7 @@ AUTOTAG_LOG_TYPE = ["traffic", "wildfire", "threat", "url", "data", "tunnel", "a
 
 # IKE Static
 DYNAMIC = {'dynamic': {}}
+
+# Remote Network Statics
+IKE_PEER_ID_TYPES = ['ipaddr', 'fqdn', 'keyid', 'ufqdn']
+IKE_PROTOCOL_VERSIONS = ['ikev2-preferred', 'ikev2', 'ikev1']
@@ -0,0 +1,167 @@
+# pylint: disable=no-member
+"""Incremental Parsing of List Responses"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List
+
+import orjson
+
+# characters that change the parser state; everything else is skipped in bulk
+_STRUCTURAL = re.compile(rb'[{}\[\],:"]')
+_STRING_END = re.compile(rb'["\\]')
+
+
+class ListResponseParser:  # pylint: disable=too-many-instance-attributes
+    """Parses a list response such as {"data": [...], "total": 3, "limit": 200}
+     chunk by chunk. Items of the array under `key` are returned as soon as they are
+     complete and dropped from the buffer, so memory stays at about one item plus one
+     chunk however large the page is. Every other top level field ends up in meta.
+    """
+
+    def __init__(self, key: str = "data"):
+        """_summary_
+
+        Args:
+            key (str, optional): top level field holding the array. Defaults to "data"
+        """
+        self.key = key.encode('utf-8')
+        self.meta: Dict[str, Any] = {}
+        self.done = False
+        self._buf = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._expect_key = False
+        self._key_start = -1
+        self._current_key = b''
+        self._value_start = -1
+        self._in_array = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Add the next chunk of the body
+
+        Args:
+            chunk (bytes): _description_
+
+        Returns:
+            List[Any]: array items completed by this chunk
+        """
+        self._buf += chunk
+        items: List[Any] = []
+        buf = self._buf
+        pos = self._pos
+        batched = False
+        while not self.done:
+            if (not batched and self._in_array and self._depth == 2 and not self._in_string
+                    and pos == self._value_start):
+                # hand every complete item up to the last '},' to orjson in one call;
+                # a cut inside a string or nested value does not parse and falls through
+                batched = True
+                cut = buf.rfind(b'},', pos)
+                if cut > pos:
+                    try:
+                        items.extend(orjson.loads(b'[' + bytes(buf[pos:cut + 1]) + b']'))
+                        pos = self._value_start = cut + 2
+                        continue
+                    except orjson.JSONDecodeError:
+                        pass
+            if self._in_string:
+                match = _STRING_END.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if buf[match.start()] == 0x5c:
+                    if match.start() + 1 >= len(buf):
+                        pos = match.start()
+                        break
+                    pos = match.start() + 2
+                    continue
+                self._in_string = False
+                pos = match.end()
+                if self._key_start >= 0:
+                    self._current_key = bytes(buf[self._key_start:match.start()])
+                    self._key_start = -1
+                continue
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            char = buf[match.start()]
+            pos = match.end()
+            self._structural(char, match.start(), pos, items)
+        self._pos = pos
+        self._compact()
+        return items
+
+    def _structural(self, char: int, start: int, end: int, items: List[Any]) -> None:
+        # pylint: disable=too-many-branches
+        buf = self._buf
+        if char == 0x22:  # "
+            self._in_string = True
+            if self._depth == 1 and self._expect_key:
+                self._key_start = end
+        elif char == 0x3a:  # :
+            if self._depth == 1:
+                self._expect_key = False
+                self._value_start = end
+        elif char == 0x2c:  # ,
+            if self._in_array and self._depth == 2:
+                items.append(orjson.loads(bytes(buf[self._value_start:start])))
+                self._value_start = end
+            elif self._depth == 1:
+                self._end_value(start)
+                self._expect_key = True
+        elif char in (0x7b, 0x5b):  # { [
+            if self._depth == 0:
+                self._expect_key = True
+            elif (self._depth == 1 and char == 0x5b and self._current_key == self.key and
+                  not buf[self._value_start:start].strip()):
+                self._in_array = True
+                self._value_start = end
+            self._depth += 1
+        else:  # } ]
+            if self._in_array and self._depth == 2:
+                if buf[self._value_start:start].strip():
+                    items.append(orjson.loads(bytes(buf[self._value_start:start])))
+                self._in_array = False
+                self._value_start = -1
+            elif self._depth == 1:
+                self._end_value(start)
+                self.done = True
+            self._depth -= 1
+
+    def _end_value(self, end: int) -> None:
+        if self._value_start >= 0:
+            self.meta[self._current_key.decode('utf-8')] = orjson.loads(
+                bytes(self._buf[self._value_start:end]))
+        self._value_start = -1
+
+    def _compact(self) -> None:
+        keep = min(start for start in (self._pos, self._value_start, self._key_start)
+                   if start >= 0)
+        if keep:
+            del self._buf[:keep]
+            self._pos -= keep
+            if self._value_start >= 0:
+                self._value_start -= keep
+            if self._key_start >= 0:
+                self._key_start -= keep
+
+
+def iter_list_response(chunks: Iterable[bytes], key: str = "data") -> Iterator[Any]:
+    """Yields the items of a list response read from chunks
+
+    Args:
+        chunks (Iterable[bytes]): response body
+        key (str, optional): top level field holding the array. Defaults to "data"
+
+    Yields:
+        Iterator[Any]: each item
+
+    Returns:
+        Dict[str, Any]: the other top level fields, as the generator's return value
+    """
+    parser = ListResponseParser(key=key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    return parser.meta
@@ -0,0 +1,450 @@
+# pylint: disable=no-member
+"""HTTP Transports used by prisma_request and Auth"""
+
+import abc
+import itertools
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import orjson
+import requests
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+try:
+    import h2  # pylint: disable=unused-import
+except ImportError:  # pragma: no cover
+    h2 = None  # type: ignore
+try:
+    import brotli  # pylint: disable=unused-import
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli  # pylint: disable=unused-import
+    except ImportError:
+        brotli = None  # type: ignore
+
+STREAM_CHUNK_SIZE = 65536
+# urllib3 and httpx decode br only when a brotli package is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+_DEFAULT_TRANSPORT: Optional["Transport"] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+class TransportResponse:
+    """Response returned by every transport; the body is decoded once"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[dict] = None,
+                 elapsed: float = 0.0, wire_bytes: Optional[int] = None):
+        """_summary_
+
+        Args:
+            status_code (int): HTTP status
+            content (bytes): decoded body
+            headers (dict, optional): response headers
+            elapsed (float, optional): seconds from sending to receiving the body
+            wire_bytes (int, optional): body size as received before decompression.
+             Defaults to the size of content
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers: Dict[str, str] = dict(headers or {})
+        self.elapsed = elapsed
+        self.wire_bytes = len(content) if wire_bytes is None else wire_bytes
+        self._json: Any = None
+        self._decoded = False
+
+    def json(self) -> Any:
+        """Decoded JSON body; empty bodies decode to an empty dict
+
+        Returns:
+            Any: _description_
+        """
+        if not self._decoded:
+            self._json = orjson.loads(self.content) if self.content else {}
+            self._decoded = True
+        return self._json
+
+    def raise_for_status(self) -> None:
+        """Raises requests.HTTPError for 4xx and 5xx so callers see the same error type
+
+        Raises:
+            requests.HTTPError: _description_
+        """
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error: {self.content[:200]!r}",
+                                     response=self)  # type: ignore
+
+
+class StreamedResponse:
+    """Response whose body is read in chunks; close() releases the connection"""
+
+    def __init__(self, status_code: int, chunks: Iterator[bytes],
+                 headers: Optional[dict] = None, close: Optional[Callable[[], None]] = None):
+        """_summary_
+
+        Args:
+            status_code (int): HTTP status
+            chunks (Iterator[bytes]): decoded body chunks
+            headers (dict, optional): response headers
+            close (Callable[[], None], optional): releases the connection
+        """
+        self.status_code = status_code
+        self.chunks = chunks
+        self.headers: Dict[str, str] = dict(headers or {})
+        self._close = close
+
+    def read(self) -> bytes:
+        """Rest of the body
+
+        Returns:
+            bytes: _description_
+        """
+        return b''.join(self.chunks)
+
+    def close(self) -> None:
+        """Release the connection"""
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class Transport(abc.ABC):
+    """Sends one HTTP request. Subclasses implement request(); everything above it
+     (service_setup, policy_objects, config_mgmt) is unaware of which one is used.
+     A transport is chosen per Auth with Auth(..., transport=...) or globally with
+     set_default_transport().
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        """Send a request
+
+        Args:
+            method (str): HTTP method
+            url (str): full url
+            headers (dict, Optional): _description_
+            params (dict, Optional): query parameters
+            data (str|bytes, Optional): body
+            verify (str|bool, Optional): TLS verification
+            timeout (int, Optional): seconds
+            auth (tuple, Optional): basic auth used for the token request
+
+        Returns:
+            TransportResponse: _description_
+        """
+
+    def stream(self, method: str, url: str, **kwargs) -> StreamedResponse:
+        """Send a request and read the body in chunks; takes the same arguments as
+         request(). Transports without streaming hand back the whole body as one chunk.
+
+        Returns:
+            StreamedResponse: _description_
+        """
+        response = self.request(method, url, **kwargs)
+        return StreamedResponse(status_code=response.status_code,
+                                chunks=iter((response.content,)),
+                                headers=response.headers)
+
+    def close(self) -> None:
+        """Release connections"""
+
+
+class RequestsTransport(Transport):
+    """Default transport: requests with a pooled Session per thread. Compressed bodies
+     are decoded by urllib3 chunk by chunk while they are read.
+    """
+    name = "requests"
+
+    def __init__(self):
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        response = self._session().request(method=method,
+                                           url=url,
+                                           headers=kwargs.get('headers'),
+                                           params=kwargs.get('params'),
+                                           data=kwargs.get('data'),
+                                           auth=kwargs.get('auth'),
+                                           verify=kwargs.get('verify', True),
+                                           timeout=kwargs.get('timeout', 90))
+        content = response.content
+        try:
+            # bytes read from the socket, before decompression
+            wire_bytes = int(response.raw.tell()) or len(content)
+        except (AttributeError, TypeError, ValueError):
+            wire_bytes = int(response.headers.get('content-length') or len(content))
+        return TransportResponse(status_code=response.status_code,
+                                 content=content,
+                                 headers=response.headers,
+                                 elapsed=response.elapsed.total_seconds(),
+                                 wire_bytes=wire_bytes)
+
+    def stream(self, method: str, url: str, **kwargs) -> StreamedResponse:
+        response = self._session().request(method=method,
+                                           url=url,
+                                           headers=kwargs.get('headers'),
+                                           params=kwargs.get('params'),
+                                           data=kwargs.get('data'),
+                                           auth=kwargs.get('auth'),
+                                           verify=kwargs.get('verify', True),
+                                           timeout=kwargs.get('timeout', 90),
+                                           stream=True)
+        return StreamedResponse(status_code=response.status_code,
+                                chunks=response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                                headers=response.headers,
+                                close=response.close)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+
+class HTTP2Transport(Transport):
+    """Multiplexes concurrent requests over a few HTTP/2 connections with httpx
+     (pip install prisma-access-sase[http2]). Hosts that do not negotiate HTTP/2 are
+     spoken to over HTTP/1.1 by the same client. Use http2_transport() to fall back to
+     RequestsTransport when httpx is not installed.
+    """
+    name = "http2"
+
+    def __init__(self, max_streams: int = 100, max_connections: int = 4):
+        """_summary_
+
+        Args:
+            max_streams (int, optional): requests in flight at once across all
+             connections. Defaults to 100
+            max_connections (int, optional): connections per host. Defaults to 4
+
+        Raises:
+            ImportError: httpx is not installed
+        """
+        if httpx is None:
+            raise ImportError("HTTP2Transport requires httpx; pip install prisma-access-sase[http2]")
+        self.http2 = h2 is not None
+        if not self.http2:
+            print("WARNING: h2 is not installed; HTTP2Transport will use HTTP/1.1")
+        self.max_streams = max_streams
+        self.max_connections = max_connections
+        self.http_versions: Dict[str, int] = {}
+        self._streams = threading.BoundedSemaphore(max_streams)
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        client = self._client(kwargs.get('verify', True))
+        with self._streams:
+            try:
+                response = client.request(method=method,
+                                          url=url,
+                                          headers=kwargs.get('headers'),
+                                          params=kwargs.get('params'),
+                                          content=kwargs.get('data'),
+                                          auth=kwargs.get('auth'),
+                                          timeout=kwargs.get('timeout', 90))
+            except httpx.TimeoutException as err:
+                # same exception types as RequestsTransport so retry stages work unchanged
+                raise requests.Timeout(str(err)) from err
+            except httpx.TransportError as err:
+                raise requests.ConnectionError(str(err)) from err
+        with self._lock:
+            self.http_versions[response.http_version] = (
+                self.http_versions.get(response.http_version, 0) + 1)
+        return TransportResponse(status_code=response.status_code,
+                                 content=response.content,
+                                 headers=response.headers,
+                                 elapsed=response.elapsed.total_seconds(),
+                                 wire_bytes=response.num_bytes_downloaded)
+
+    def stream(self, method: str, url: str, **kwargs) -> StreamedResponse:
+        client = self._client(kwargs.get('verify', True))
+        self._streams.acquire()  # pylint: disable=consider-using-with
+        try:
+            response = client.send(client.build_request(method=method,
+                                                        url=url,
+                                                        headers=kwargs.get('headers'),
+                                                        params=kwargs.get('params'),
+                                                        content=kwargs.get('data'),
+                                                        timeout=kwargs.get('timeout', 90)),
+                                   auth=kwargs.get('auth'),
+                                   stream=True)
+        except httpx.TimeoutException as err:
+            self._streams.release()
+            raise requests.Timeout(str(err)) from err
+        except httpx.TransportError as err:
+            self._streams.release()
+            raise requests.ConnectionError(str(err)) from err
+
+        def close() -> None:
+            response.close()
+            self._streams.release()
+        return StreamedResponse(status_code=response.status_code,
+                                chunks=response.iter_bytes(chunk_size=STREAM_CHUNK_SIZE),
+                                headers=response.headers,
+                                close=close)
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+
+    def _client(self, verify: Any) -> Any:
+        # httpx fixes TLS verification per client
+        with self._lock:
+            if str(verify) not in self._clients:
+                self._clients[str(verify)] = httpx.Client(
+                    http2=self.http2,
+                    verify=verify,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections))
+            return self._clients[str(verify)]
+
+
+def http2_transport(**kwargs) -> Transport:
+    """HTTP2Transport when httpx is installed otherwise RequestsTransport
+
+    Args:
+        max_streams (int, optional): see HTTP2Transport
+        max_connections (int, optional): see HTTP2Transport
+
+    Returns:
+        Transport: _description_
+    """
+    if httpx is None:
+        print("WARNING: httpx is not installed; using HTTP/1.1 RequestsTransport")
+        return RequestsTransport()
+    return HTTP2Transport(**kwargs)
+
+
+class FakeTransport(Transport):
+    """In-process transport for tests and offline runs. Keeps objects in memory per
+     url path and folder and answers list (name, limit, offset), get, create, update
+     and delete like the SASE config API. Token requests always succeed. Extra
+     behaviour can be added with route(method, path_prefix, handler).
+    """
+    name = "fake"
+
+    def __init__(self):
+        self.store: Dict[Tuple[str, str], List[dict]] = {}
+        self.calls: List[Tuple[str, str, dict]] = []
+        self._routes: List[Tuple[str, str, Callable]] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def route(self, method: str, path_prefix: str,
+              handler: Callable[..., Tuple[int, Any]]) -> None:
+        """Answer matching requests with handler(method, path, params, body) -> (status, body)
+
+        Args:
+            method (str): HTTP method
+            path_prefix (str): e.g. 'config-versions/candidate:push'
+            handler (Callable[..., Tuple[int, Any]]): _description_
+        """
+        self._routes.append((method.upper(), path_prefix, handler))
+
+    def add(self, path: str, folder: str, *objects: dict) -> None:
+        """Seed objects
+
+        Args:
+            path (str): url path after /sse/config/v1/ such as 'tags'
+            folder (str): folder name
+        """
+        with self._lock:
+            for obj in objects:
+                self.store.setdefault((path, folder), []).append(
+                    {'id': str(next(self._ids)), 'folder': folder, **obj})
+
+    def request(self, method: str, url: str, **kwargs) -> TransportResponse:
+        method = method.upper()
+        if 'oauth2' in url:
+            return _response(200, {'access_token': 'fake', 'expires_in': 900})
+        params = dict(kwargs.get('params') or {})
+        path = urlsplit(url).path.split('/sse/config/v1/')[-1]
+        data = kwargs.get('data')
+        body = orjson.loads(data) if data else {}
+        self.calls.append((method, path, params))
+        for route_method, prefix, handler in self._routes:
+            if route_method == method and path.startswith(prefix):
+                return _response(*handler(method, path, params, body))
+        url_type, _, object_id = path.partition('/')
+        with self._lock:
+            objects = self.store.setdefault((url_type, params.get('folder', '')), [])
+            return _response(*self._crud(method, objects, object_id, params, body))
+
+    def _crud(self, method: str, objects: List[dict], object_id: str, params: dict,
+              body: dict) -> Tuple[int, Any]:
+        found = [obj for obj in objects if obj['id'] == object_id]
+        if method == 'GET' and not object_id:
+            items = [obj for obj in objects
+                     if 'name' not in params or obj['name'] == params['name']]
+            limit, offset = int(params.get('limit', 200)), int(params.get('offset', 0))
+            return 200, {'data': items[offset:offset + limit], 'limit': limit,
+                         'offset': offset, 'total': len(items)}
+        if method == 'POST':
+            if any(obj['name'] == body.get('name') for obj in objects):
+                return 400, {'_errors': [{'code': 'E016', 'message': 'Invalid Object',
+                                          'details': {'errorType': 'Object Already Exists'}}]}
+            obj = {'id': str(next(self._ids)), 'folder': params.get('folder', ''), **body}
+            objects.append(obj)
+            return 201, obj
+        if not found:
+            return 404, {'_errors': [{'code': 'E005', 'message': 'Object Not Present'}]}
+        if method == 'GET':
+            return 200, found[0]
+        if method == 'PUT':
+            found[0].clear()
+            found[0].update({**body, 'id': object_id, 'folder': params.get('folder', '')})
+            return 200, found[0]
+        objects.remove(found[0])
+        return 200, found[0]
+
+
+def _response(status_code: int, body: Any) -> TransportResponse:
+    return TransportResponse(status_code=status_code, content=orjson.dumps(body),
+                             headers={'content-type': 'application/json'})
+
+
+def default_transport() -> Transport:
+    """Transport used when an Auth does not name one
+
+    Returns:
+        Transport: from the TRANSPORT env variable ('requests' or 'http2') unless
+         set_default_transport was called
+    """
+    global _DEFAULT_TRANSPORT  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        if _DEFAULT_TRANSPORT is None:
+            _DEFAULT_TRANSPORT = (http2_transport() if os.environ.get('TRANSPORT') == 'http2'
+                                  else RequestsTransport())
+        return _DEFAULT_TRANSPORT
+
+
+def set_default_transport(transport: Transport) -> None:
+    """Replace the process wide default transport
+
+    Args:
+        transport (Transport): _description_
+    """
+    global _DEFAULT_TRANSPORT  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        _DEFAULT_TRANSPORT = transport
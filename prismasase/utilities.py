@@ -1,5 +1,10 @@
 """Utilities"""
 import secrets
+from typing import Iterable, List
+
+import orjson
+
+from prismasase.statics import API_ERRORS_EXISTS
 
 def gen_pre_shared_key(length: int = 24) -> str:
     """Generates a random password
@@ -77,3 +82,65 @@ def set_bool(value: str, default: bool = False) -> bool:
     else:
         value_bool: bool = False
     return value_bool
+
+
+def object_already_exists(error: Exception) -> bool:
+    """True if an API error reports that the object being created already exists,
+     either as a Name Not Unique error or an Object Already Exists errorType
+
+    Args:
+        error (Exception): error raised by prisma_request
+
+    Returns:
+        bool: _description_
+    """
+    return api_error_is(error, API_ERRORS_EXISTS)
+
+
+def api_errors(error: Exception) -> List[dict]:
+    """The _errors entries of an API error raised by prisma_request
+
+    Args:
+        error (Exception): error raised by prisma_request
+
+    Returns:
+        List[dict]: [{'code': 'E005', 'message': 'Object Not Present', 'details': {...}}]
+    """
+    try:
+        body = orjson.loads(str(error))  # pylint: disable=no-member
+    except orjson.JSONDecodeError:  # pylint: disable=no-member
+        return []
+    errors = body.get('_errors') if isinstance(body, dict) else None
+    return [entry for entry in errors if isinstance(entry, dict)] if isinstance(errors, list) else []
+
+
+def api_error_is(error: Exception, names: Iterable[str]) -> bool:
+    """True if any _errors entry has one of the codes, messages or errorTypes
+
+    Args:
+        error (Exception): error raised by prisma_request
+        names (Iterable[str]): such as ('E005', 'Object Not Present')
+
+    Returns:
+        bool: _description_
+    """
+    wanted = {name.lower() for name in names}
+    for entry in api_errors(error):
+        details = entry.get('details') if isinstance(entry.get('details'), dict) else {}
+        if wanted & {str(value).lower() for value in (entry.get('code'), entry.get('message'),
+                                                      details.get('errorType')) if value}:
+            return True
+    return False
+
+
+def project_fields(obj: dict, fields: Iterable[str]) -> dict:
+    """Copy of an object keeping only the named top level fields
+
+    Args:
+        obj (dict): _description_
+        fields (Iterable[str]): such as ('id', 'name')
+
+    Returns:
+        dict: _description_
+    """
+    return {field: obj[field] for field in fields if field in obj}
@@ -21,9 +21,10 @@ setup(
     author="atav928",
     author_email="adam@tavnets.com",
     maintainer_email="adam@tavnets.com",
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*']),
     include_package_data=True,
     install_requires=requirements,
+    extras_require={'http2': ['httpx[http2]>=0.23']},
     test_suite="tests",
     url='https://github.com/atav928/prisma-access-sase',
     keywords=['sase', 'prisma access', 'prisma', 'paloalto'],
@@ -32,6 +33,8 @@ setup(
     entry_points={
         'console_scripts': [
             'prisma_yaml_script = prismasase.__main__:gen_yaml',
+            'prisma_preflight = prismasase.__main__:preflight',
+            'prisma_benchmark = prismasase.__main__:benchmark',
         ],
     },
 )  # pragma: no cover
@@ -0,0 +1,8 @@
+"""Tests; anything the SDK writes to disk goes to a temporary cache directory and the
+ default rate limit is raised so the suite is not throttled against FakeTransport
+"""
+import os
+import tempfile
+
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="prismasase-tests-"))
+os.environ.setdefault("RATE_LIMIT", "10000")
@@ -0,0 +1,108 @@
+"""AddressIndex radix trie"""
+import ipaddress
+import random
+import unittest
+
+from prismasase.exceptions import SASEBadParam
+from prismasase.policy_objects.address_index import AddressIndex
+
+
+def names(results):
+    return sorted(result['name'] for result in results)
+
+
+class TestAddressIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AddressIndex()
+        self.index.add_address({'name': 'net8', 'folder': 'Shared', 'ip_netmask': '10.0.0.0/8'})
+        self.index.add_address({'name': 'net16', 'folder': 'Shared', 'ip_netmask': '10.1.0.0/16'})
+        self.index.add_address({'name': 'host', 'folder': 'Shared', 'ip_netmask': '10.1.2.3'})
+        self.index.add_address({'name': 'range', 'folder': 'Shared',
+                                'ip_range': '10.2.0.1-10.2.0.14'})
+        self.index.add_address({'name': 'fqdn', 'folder': 'Shared', 'fqdn': 'example.com'})
+        self.index.add_remote_network({'name': 'site', 'subnets': ['192.168.0.0/24',
+                                                                   '10.1.2.0/24']})
+
+    def test_covering(self):
+        self.assertEqual(names(self.index.covering('10.1.2.3')),
+                         ['host', 'net16', 'net8', 'site'])
+        self.assertEqual(names(self.index.covering('10.1.0.0/16')), ['net16', 'net8'])
+        self.assertEqual(self.index.covering('172.16.0.1'), [])
+
+    def test_longest_prefix(self):
+        self.assertEqual(names(self.index.longest_prefix('10.1.2.3')), ['host'])
+        self.assertEqual(names(self.index.longest_prefix('10.1.2.4')), ['site'])
+        self.assertEqual(names(self.index.longest_prefix('10.9.9.9')), ['net8'])
+
+    def test_overlapping(self):
+        self.assertEqual(names(self.index.overlapping('10.1.0.0/16')),
+                         ['host', 'net16', 'net8', 'site'])
+        self.assertEqual(names(self.index.overlapping('192.168.0.128/25')), ['site'])
+
+    def test_range_reported_once_as_range(self):
+        results = self.index.overlapping('10.2.0.0/24')
+        self.assertEqual(names(results), ['net8', 'range'])
+        self.assertEqual([result['network'] for result in results if result['name'] == 'range'],
+                         ['10.2.0.1-10.2.0.14'])
+        self.assertEqual(names(self.index.covering('10.2.0.8')), ['net8', 'range'])
+        self.assertEqual(self.index.covering('10.2.0.15'), self.index.longest_prefix('10.2.0.15'))
+
+    def test_wildcard(self):
+        self.index.add_address({'name': 'wild', 'folder': 'Shared',
+                                'ip_wildcard': '10.0.0.1/0.255.0.254'})
+        self.assertIn('wild', names(self.index.covering('10.7.0.9')))
+        self.assertNotIn('wild', names(self.index.covering('10.7.0.8')))
+        self.assertIn('wild', names(self.index.overlapping('10.7.0.0/24')))
+        # no prefix length, so never the longest prefix
+        self.assertEqual(names(self.index.longest_prefix('10.7.0.9')), ['net8'])
+        # a contiguous wildcard is a prefix
+        self.index.add_address({'name': 'prefix', 'folder': 'Shared',
+                                'ip_wildcard': '10.3.0.0/0.0.255.255'})
+        self.assertEqual(names(self.index.longest_prefix('10.3.4.5')), ['prefix'])
+
+    def test_replace_and_remove(self):
+        self.index.add_address({'name': 'host', 'folder': 'Shared', 'ip_netmask': '10.5.5.5'})
+        self.assertNotIn('host', names(self.index.covering('10.1.2.3')))
+        self.assertIn('host', names(self.index.covering('10.5.5.5')))
+        self.assertTrue(self.index.remove(('address', 'Shared', 'host')))
+        self.assertFalse(self.index.remove(('address', 'Shared', 'host')))
+        self.assertEqual(names(self.index.covering('10.5.5.5')), ['net8'])
+        self.assertNotIn(('address', 'Shared', 'fqdn'), self.index)
+
+    def test_ipv6(self):
+        self.index.add_address({'name': 'v6', 'folder': 'Shared', 'ip_netmask': '2001:db8::/32'})
+        self.assertEqual(names(self.index.covering('2001:db8::1')), ['v6'])
+        self.assertEqual(self.index.covering('::ffff:10.1.2.3'), [])
+
+    def test_invalid(self):
+        with self.assertRaises(SASEBadParam):
+            self.index.add_address({'name': 'bad', 'ip_netmask': '10.0.0.300'})
+        with self.assertRaises(SASEBadParam):
+            self.index.covering('not an ip')
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        index = AddressIndex()
+        networks = {}
+        for number in range(300):
+            network = ipaddress.ip_network(
+                f"10.{rng.randrange(4)}.{rng.randrange(256)}.0/{rng.randrange(8, 31)}",
+                strict=False)
+            networks[f"n{number}"] = network
+            index.add_address({'name': f"n{number}", 'folder': 'Shared',
+                               'ip_netmask': str(network)})
+        for _ in range(200):
+            query = ipaddress.ip_network(
+                f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(256)}/"
+                f"{rng.randrange(12, 33)}", strict=False)
+            self.assertEqual(names(index.covering(str(query))),
+                             sorted(name for name, net in networks.items()
+                                    if query.subnet_of(net)))
+            self.assertEqual(names(index.overlapping(str(query))),
+                             sorted(name for name, net in networks.items()
+                                    if query.overlaps(net)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Bulk address creation against FakeTransport"""
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.policy_objects import tags
+from prismasase.policy_objects.addresses import addresses_bulk_create
+from prismasase.transport import FakeTransport
+
+
+class TestAddressesBulkCreate(unittest.TestCase):
+
+    def setUp(self):
+        tags._TAG_INDEXES.clear()  # pylint: disable=protected-access
+        self.transport = FakeTransport()
+        self.transport.add('tags', 'Shared', {'name': 'web'})
+        self.transport.add('addresses', 'Shared', {'name': 'old', 'ip_netmask': '10.0.0.1/32'})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def names(self, url_type):
+        return sorted(obj['name'] for obj in self.transport.store.get((url_type, 'Shared'), []))
+
+    def test_report_and_single_prefetch(self):
+        response = addresses_bulk_create([
+            {'name': 'a', 'ip_netmask': '10.0.1.0/24', 'tag': ['web']},
+            {'name': 'b', 'fqdn': 'b.example.com'},
+            {'name': 'old', 'ip_netmask': '10.0.0.2/32'},
+            {'name': 'a', 'ip_netmask': '10.0.2.0/24'},
+            {'name': 'c'},
+            {'name': 'd', 'fqdn': 'd.example.com', 'tag': ['unknown']},
+        ], folder='Shared', auth=self.auth)
+        self.assertEqual([result['status'] for result in response['results']],
+                         ['created', 'created', 'exists', 'error', 'error', 'error'])
+        self.assertEqual((response['status'], response['created'], response['error']),
+                         ('partial', 2, 3))
+        self.assertEqual(self.names('addresses'), ['a', 'b', 'old'])
+        self.assertEqual(sum(1 for method, path, _ in self.transport.calls
+                             if method == 'GET' and path == 'addresses'), 1)
+
+    def test_update_existing(self):
+        response = addresses_bulk_create([{'name': 'old', 'ip_netmask': '10.0.0.2/32'}],
+                                         folder='Shared', update_existing=True, auth=self.auth)
+        self.assertEqual(response['updated'], 1)
+        self.assertEqual(self.transport.store[('addresses', 'Shared')][0]['ip_netmask'],
+                         '10.0.0.2/32')
+
+    def test_create_missing_after_validation(self):
+        response = addresses_bulk_create([
+            {'name': 'a', 'ip_netmask': '10.0.1.0/24', 'tag': ['new', 'web']},
+            {'name': 'b', 'tag': ['invalid-row']},
+            {'name': 'old', 'ip_netmask': '10.0.0.2/32', 'tag': ['existing-row']},
+        ], folder='Shared', create_missing=True, auth=self.auth)
+        self.assertEqual([result['status'] for result in response['results']],
+                         ['created', 'error', 'exists'])
+        # tags of rows that are not written are never created
+        self.assertEqual(self.names('tags'), ['new', 'web'])
+
+    def test_invalid_batch_writes_nothing(self):
+        response = addresses_bulk_create([{'name': 'x' * 64, 'fqdn': 'x.example.com',
+                                           'tag': ['new']}],
+                                         folder='Shared', create_missing=True, auth=self.auth)
+        self.assertEqual(response['status'], 'error')
+        self.assertFalse([call for call in self.transport.calls if call[0] != 'GET'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Bulk auto tag provisioning against FakeTransport"""
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEAutoTagError
+from prismasase.policy_objects import tags
+from prismasase.policy_objects.autotags import auto_tag_bulk_create, auto_tag_confirm_actions
+from prismasase.policy_objects.tags import TagIndex
+from prismasase.transport import FakeTransport
+
+
+def action(name, *tag_names, target='source-address'):
+    return {'name': name, 'type': {'tagging': {'action': 'add-tag', 'target': target,
+                                               'tags': list(tag_names)}}}
+
+
+def auto_tag(name, *actions, log_type='traffic'):
+    return {'name': name, 'tag_filter': "'web' and 'prod'", 'log_type': log_type,
+            'actions': list(actions)}
+
+
+class TestAutoTagBulkCreate(unittest.TestCase):
+
+    def setUp(self):
+        tags._TAG_INDEXES.clear()  # pylint: disable=protected-access
+        self.transport = FakeTransport()
+        self.transport.add('tags', 'Shared', {'name': 'web'}, {'name': 'prod'})
+        self.transport.add('auto-tag-actions', 'Shared', auto_tag('old', action('a', 'web')))
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def names(self, url_type):
+        return sorted(obj['name'] for obj in self.transport.store.get((url_type, 'Shared'), []))
+
+    def test_validated_locally_against_one_snapshot(self):
+        response = auto_tag_bulk_create([
+            auto_tag('one', action('a', 'web', 'prod')),
+            auto_tag('two', action('a', 'web', target='nowhere')),
+            auto_tag('three', action('a', 'missing')),
+            auto_tag('four', action('a', 'web'), log_type='nope'),
+            auto_tag('one', action('a', 'web')),
+            auto_tag('old', action('a', 'prod')),
+        ], update_existing=False, auth=self.auth)
+        self.assertEqual([result['status'] for result in response['results']],
+                         ['created', 'error', 'error', 'error', 'error', 'exists'])
+        self.assertEqual(self.names('auto-tag-actions'), ['old', 'one'])
+        self.assertEqual([path for method, path, _ in self.transport.calls if method == 'GET'],
+                         ['auto-tag-actions', 'tags'])
+
+    def test_update_existing(self):
+        self.transport.route('PUT', 'auto-tag-actions', lambda method, path, params, body: (
+            200, body))
+        response = auto_tag_bulk_create([auto_tag('old', action('a', 'prod'))], auth=self.auth)
+        self.assertEqual(response['updated'], 1)
+        self.assertEqual([call[0] for call in self.transport.calls if call[0] != 'GET'], ['PUT'])
+
+    def test_create_missing_after_validation(self):
+        response = auto_tag_bulk_create([
+            auto_tag('one', action('a', 'web', 'new')),
+            auto_tag('two', action('a', 'invalid-row', target='nowhere')),
+            auto_tag('x' * 64, action('a', 'long-name-row')),
+        ], create_missing=True, auth=self.auth)
+        self.assertEqual([result['status'] for result in response['results']],
+                         ['created', 'error', 'error'])
+        # tags of auto tags that failed validation are never created
+        self.assertEqual(self.names('tags'), ['new', 'prod', 'web'])
+
+    def test_confirm_actions_uses_the_index(self):
+        index = TagIndex(folder='Shared', tags=[{'name': 'web'}])
+        auto_tag_confirm_actions([action('a', 'web')], tag_index=index)
+        with self.assertRaises(SASEAutoTagError):
+            auto_tag_confirm_actions([action('a', 'prod')], tag_index=index)
+        with self.assertRaises(SASEAutoTagError):
+            auto_tag_confirm_actions([{'name': 'a'}], tag_index=index)
+        self.assertEqual(self.transport.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Recording API traffic and replaying it offline"""
+import gzip
+import os
+import tempfile
+import unittest
+
+from prismasase.cassette import SCRUBBED, RecordingTransport, ReplayTransport
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadRequest, SASEReplayError
+from prismasase.restapi import prisma_request
+from prismasase.transport import FakeTransport
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tenant.jsonl.gz')
+        fake = FakeTransport()
+        fake.add('ike-gateways', 'Remote Networks',
+                 {'name': 'gw', 'authentication': {'pre_shared_key': {'key': 'hunter2'}}})
+        with RecordingTransport(self.path, transport=fake) as recorder:
+            auth = Auth('1', 'id', 'client-secret', transport=recorder)
+            self.recorded = prisma_request(auth, method='GET', url_type='ike-gateways',
+                                           params={'folder': 'Remote Networks'})
+            for _ in range(2):
+                try:
+                    prisma_request(auth, method='POST', url_type='tags',
+                                   params={'folder': 'Shared'}, data={'name': 'a'})
+                except SASEBadRequest:
+                    pass
+        self.assertEqual(recorder.recorded, 4)
+
+    def test_secrets_never_recorded(self):
+        with gzip.open(self.path, 'rb') as cassette:
+            content = cassette.read()
+        for secret in (b'hunter2', b'client-secret', b'"fake"'):
+            self.assertNotIn(secret, content)
+        self.assertIn(SCRUBBED.encode(), content)
+
+    def test_replay_in_recorded_order(self):
+        replay = ReplayTransport(self.path)
+        auth = Auth('1', 'id', 'client-secret', transport=replay)
+        replayed = prisma_request(auth, method='GET', url_type='ike-gateways',
+                                  params={'folder': 'Remote Networks'})
+        self.assertEqual(replayed['data'][0]['name'], self.recorded['data'][0]['name'])
+        self.assertEqual(replayed['data'][0]['authentication'],
+                         {'pre_shared_key': SCRUBBED})
+        # the same POST was answered with created, then already exists
+        statuses = [replay.request('POST', 'https://api.sase.paloaltonetworks.com/sse/config/'
+                                   'v1/tags', params={'folder': 'Shared'}).status_code
+                    for _ in range(3)]
+        self.assertEqual(statuses, [201, 400, 400])
+        with self.assertRaises(SASEReplayError):
+            prisma_request(auth, method='GET', url_type='tags', params={'folder': 'Other'})
+
+    def test_match_body_and_latency(self):
+        replay = ReplayTransport(self.path, match_body=True)
+        auth = Auth('1', 'id', 'client-secret', transport=replay)
+        with self.assertRaises(SASEReplayError):
+            prisma_request(auth, method='POST', url_type='tags', params={'folder': 'Shared'},
+                           data={'name': 'b'})
+        with self.assertRaises(SASEReplayError):
+            ReplayTransport(self.path, latency='fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
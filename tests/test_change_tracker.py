@@ -0,0 +1,105 @@
+"""Per folder change tracking and skipped no-op commits against FakeTransport"""
+import tempfile
+import unittest
+from unittest import mock
+
+from prismasase import config
+from prismasase.change_tracker import ChangeTracker
+from prismasase.config_mgmt.configuration import config_commit
+from prismasase.configs import Auth
+from prismasase.policy_objects.addresses import addresses_create
+from prismasase.transport import FakeTransport
+
+from .test_commit_scheduler import fake_push_api
+
+
+class TestChangeTracker(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.tracker = ChangeTracker(directory.name)
+        self.addCleanup(self.tracker.save)
+
+    def test_unchanged_puts_are_not_changes(self):
+        self.assertIsNone(self.tracker.pending('1'))
+        obj = {'id': '5', 'name': 'a', 'folder': 'Shared'}
+        self.assertTrue(self.tracker.record('1', 'POST', 'addresses', response=obj))
+        self.tracker.pushed('1', self.tracker.mark('1'))
+        self.assertFalse(self.tracker.pending('1'))
+        self.assertFalse(self.tracker.record('1', 'PUT', 'addresses', '/5', response=obj))
+        self.assertFalse(self.tracker.record('1', 'GET', 'addresses', response=obj))
+        self.assertTrue(self.tracker.record('1', 'PUT', 'addresses', '/5',
+                                            response={**obj, 'name': 'b'}))
+        self.assertTrue(self.tracker.pending('1'))
+
+    def test_only_pushed_folders_are_trimmed(self):
+        self.tracker.record('1', 'POST', 'remote-networks', response={'id': '1'},
+                            folder='Remote Networks')
+        self.tracker.record('1', 'POST', 'tags', response={'id': '2'}, folder='Shared')
+        self.tracker.pushed('1', self.tracker.mark('1'), ['Remote Networks'])
+        self.assertFalse(self.tracker.pending('1', ['Remote Networks']))
+        # the Shared tag is not in the Mobile Users candidate that was pushed yet
+        self.assertTrue(self.tracker.pending('1', ['Mobile Users']))
+        self.tracker.record('1', 'POST', 'addresses', response={'id': '3'},
+                            folder='Mobile Users')
+        self.tracker.pushed('1', self.tracker.mark('1'), ['Mobile Users'])
+        self.assertTrue(self.tracker.pending('1', ['Service Connections']))
+        self.tracker.pushed('1', self.tracker.mark('1'), ['Service Connections'])
+        self.assertFalse(self.tracker.pending('1'))
+
+    def test_changes_after_mark_stay_pending(self):
+        mark = self.tracker.mark('1')
+        self.tracker.record('1', 'DELETE', 'addresses', '/7', folder='Remote Networks')
+        self.tracker.pushed('1', mark, ['Remote Networks'])
+        self.assertTrue(self.tracker.pending('1', ['Remote Networks']))
+
+
+class TestSkipUnchanged(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('prismasase.config_mgmt.configuration.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.tracker = ChangeTracker(directory.name)
+        self.addCleanup(self.tracker.save)
+        for module in ['prismasase.restapi', 'prismasase.config_mgmt.configuration']:
+            patcher = mock.patch(f"{module}.change_tracker", return_value=self.tracker)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.transport = FakeTransport()
+        self.pushes = fake_push_api(self.transport)
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def test_push_of_one_folder_keeps_the_others_pending(self):
+        with mock.patch.object(config, 'TRACK_CHANGES', True):
+            config_commit(['Remote Networks'], auth=self.auth)
+            addresses_create(name='a', ip_netmask='10.0.0.1/32',
+                             folder='Remote Networks', auth=self.auth)
+            addresses_create(name='b', ip_netmask='10.0.0.2/32',
+                             folder='Mobile Users', auth=self.auth)
+            config_commit(['Remote Networks'], skip_unchanged=True, auth=self.auth)
+            response = config_commit(['Remote Networks'], skip_unchanged=True, auth=self.auth)
+            self.assertEqual(response['message'], 'No pending changes; push skipped')
+            config_commit(['Mobile Users'], skip_unchanged=True, auth=self.auth)
+        self.assertEqual(self.pushes, [['Remote Networks'], ['Remote Networks'],
+                                       ['Mobile Users']])
+
+    def test_tracker_untouched_unless_enabled(self):
+        with mock.patch('prismasase.config_mgmt.configuration.change_tracker',
+                        side_effect=AssertionError('tracker used')):
+            config_commit(['Remote Networks'], auth=self.auth)
+            config_commit(['Remote Networks'], skip_unchanged=True, auth=self.auth)
+        self.assertEqual(len(self.pushes), 2)
+
+    def test_tracker_errors_do_not_fail_the_push(self):
+        with mock.patch.object(config, 'TRACK_CHANGES', True), \
+                mock.patch.object(self.tracker, 'pushed', side_effect=PermissionError(13, 'denied')):
+            self.assertEqual(config_commit(['Remote Networks'], auth=self.auth)['status'],
+                             'success')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""Coalescing commit requests into one push against FakeTransport"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import orjson
+
+from prismasase.config_mgmt import commit_scheduler
+from prismasase.config_mgmt.commit_scheduler import CommitScheduler
+from prismasase.configs import Auth
+from prismasase.exceptions import SASECommitError
+from prismasase.transport import FakeTransport
+
+DEVICES = ['Mobile Users', 'Remote Networks', 'Service Connections']
+
+
+def fake_push_api(transport, fail=False):
+    """Answers the calls config_commit makes; returns the folders of every push"""
+    pushes = []
+
+    def push(method, path, params, body):  # pylint: disable=unused-argument
+        pushes.append(body['folders'])
+        return 200, {'success': not fail, 'job_id': str(100 + len(pushes)),
+                     'message': 'CommitAndPush job enqueued'}
+
+    def job(method, path, params, body):  # pylint: disable=unused-argument
+        return 200, {'data': [{'id': path.rsplit('/', 1)[-1], 'status_str': 'FIN',
+                               'result_str': 'OK', 'details': ''}]}
+
+    transport.route('GET', 'config-versions/running', lambda *args: (200, {'data': [
+        {'device': device, 'version': str(len(pushes))} for device in DEVICES]}))
+    transport.route('POST', 'config-versions/candidate:push', push)
+    transport.route('GET', 'jobs/', job)
+    transport.route('GET', 'jobs', lambda *args: (200, {'data': [{'id': '1'}]}))
+    return pushes
+
+
+class TestCommitScheduler(unittest.TestCase):
+
+    def setUp(self):
+        # config_commit waits for sub jobs to be created
+        patcher = mock.patch('prismasase.config_mgmt.configuration.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transport = FakeTransport()
+        self.pushes = fake_push_api(self.transport)
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def test_concurrent_requests_share_one_push(self):
+        scheduler = CommitScheduler(debounce=0.2, auth=self.auth)
+        results = []
+        threads = [threading.Thread(target=lambda folder=folder: results.append(
+            scheduler.commit([folder], description=folder, timeout=10)))
+                   for folder in ['Remote Networks', 'Mobile Users', 'Remote Networks']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.pushes, [['Mobile Users', 'Remote Networks']])
+        self.assertEqual([result['coalesced_requests'] for result in results], [3, 3, 3])
+        self.assertEqual(scheduler.pushes, 1)
+        # a later request gets a push of its own
+        scheduler.flush()
+        scheduler.commit(['Service Connections'], timeout=10)
+        self.assertEqual(self.pushes[-1], ['Service Connections'])
+
+    def test_failed_push_raises_for_every_waiter(self):
+        transport = FakeTransport()
+        fake_push_api(transport, fail=True)
+        scheduler = CommitScheduler(debounce=0.05,
+                                    auth=Auth('2', 'id', 'secret', transport=transport))
+        futures = [scheduler.submit(['Remote Networks']) for _ in range(2)]
+        for future in futures:
+            with self.assertRaises(SASECommitError):
+                future.result(timeout=10)
+
+
+class TestSpooledCommitScheduler(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('prismasase.config_mgmt.configuration.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.spool_dir = directory.name
+        self.transport = FakeTransport()
+        self.pushes = fake_push_api(self.transport)
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def spool(self, name):
+        return os.path.join(self.spool_dir, '1', name)
+
+    def spooled(self):
+        # request files still being written are skipped by the push
+        return [name for name in os.listdir(self.spool('requests')) if not name.endswith('.tmp')]
+
+    def test_schedulers_share_a_push_through_the_spool(self):
+        # two schedulers only coordinate through the spool directory and its lock,
+        # as separate processes would
+        first = CommitScheduler(debounce=0.1, spool_dir=self.spool_dir, auth=self.auth)
+        second = CommitScheduler(debounce=0.1, spool_dir=self.spool_dir, auth=self.auth)
+        lock = commit_scheduler._SpoolLock(self.spool('commit.lock'))  # pylint: disable=protected-access
+        with lock:
+            futures = [first.submit(['Remote Networks']), second.submit(['Mobile Users'])]
+            deadline = time.monotonic() + 5
+            while len(self.spooled()) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        results = [future.result(timeout=10) for future in futures]
+        self.assertEqual(self.pushes, [['Mobile Users', 'Remote Networks']])
+        self.assertEqual(first.pushes + second.pushes, 1)
+        self.assertEqual([result['coalesced_requests'] for result in results], [2, 2])
+        self.assertEqual(os.listdir(self.spool('requests')), [])
+        self.assertEqual(os.listdir(self.spool('results')), [])
+
+    def test_requests_of_exited_processes_leave_no_results(self):
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                check=True, capture_output=True, text=True)
+        scheduler = CommitScheduler(debounce=0.05, spool_dir=self.spool_dir, auth=self.auth)
+        with open(self.spool('requests/crashed'), 'wb') as request:
+            request.write(orjson.dumps({'folders': ['Service Connections'], 'description': '',
+                                        'pid': int(exited.stdout)}))
+        with open(self.spool('results/unread'), 'wb') as result:
+            result.write(b'{}')
+        expired = time.time() - commit_scheduler.SPOOL_STALE - 60
+        os.utime(self.spool('results/unread'), (expired, expired))
+        result = scheduler.commit(['Remote Networks'], timeout=10)
+        # the crashed process' changes are pushed but nobody is left to read its result
+        self.assertEqual(self.pushes, [['Remote Networks', 'Service Connections']])
+        self.assertEqual(result['coalesced_requests'], 2)
+        self.assertEqual(os.listdir(self.spool('requests')), [])
+        self.assertEqual(os.listdir(self.spool('results')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
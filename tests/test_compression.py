@@ -0,0 +1,88 @@
+"""Compressed responses, compact request bodies and byte counts"""
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import unittest
+
+import orjson
+
+from prismasase.configs import Auth
+from prismasase.middleware import middleware_chain
+from prismasase.restapi import prisma_request
+from prismasase.transport import ACCEPT_ENCODING, FakeTransport, RequestsTransport
+
+PAGE = {'data': [{'id': str(number), 'name': f"address-{number}", 'folder': 'Shared'}
+                 for number in range(200)], 'limit': 200, 'offset': 0, 'total': 200}
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    """Answers every GET with PAGE, gzip encoded when the client accepts it"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = orjson.dumps(PAGE)
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        if 'gzip' in self.headers.get('accept-encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('content-encoding', 'gzip')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class CapturingTransport(FakeTransport):
+    """FakeTransport that keeps the raw request bodies and headers"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def request(self, method, url, **kwargs):
+        if 'oauth2' not in url:
+            self.sent.append((kwargs.get('headers'), kwargs.get('data')))
+        return super().request(method, url, **kwargs)
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_compact_bodies_and_accept_encoding(self):
+        transport = CapturingTransport()
+        auth = Auth('1', 'id', 'secret', transport=transport)
+        prisma_request(auth, method='POST', url_type='tags', params={'folder': 'Shared'},
+                       data={'name': 'a', 'comments': 'b'})
+        headers, data = transport.sent[-1]
+        self.assertEqual(data, b'{"name":"a","comments":"b"}')
+        self.assertEqual(headers['accept-encoding'], ACCEPT_ENCODING)
+
+    def test_wire_bytes_counted_before_decoding(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), GzipHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        requests_transport = RequestsTransport()
+        self.addCleanup(requests_transport.close)
+        url = f"http://127.0.0.1:{server.server_address[1]}/sse/config/v1/addresses"
+        response = requests_transport.request('GET', url,
+                                              headers={'accept-encoding': ACCEPT_ENCODING})
+        self.assertEqual(response.json(), PAGE)
+        self.assertEqual(response.wire_bytes, len(gzip.compress(orjson.dumps(PAGE))))
+        self.assertLess(response.wire_bytes, len(response.content) / 4)
+
+    def test_metrics_count_bytes(self):
+        chain = middleware_chain("metrics")
+        auth = Auth('1', 'id', 'secret', transport=FakeTransport(), middleware=chain)
+        created = prisma_request(auth, method='POST', url_type='tags',
+                                 params={'folder': 'Shared'}, data={'name': 'a'})
+        row = chain.stage('metrics').snapshot()[0]
+        self.assertEqual(row['sent_bytes'], len(b'{"name":"a"}'))
+        self.assertEqual(row['wire_bytes'], row['body_bytes'])
+        self.assertEqual(row['body_bytes'], len(orjson.dumps(created)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Config diff between snapshots"""
+import unittest
+
+from prismasase.config_mgmt.config_diff import (config_diff, config_diff_digest,
+                                                config_diff_fields, config_diff_key,
+                                                config_diff_stream)
+
+OLD = {
+    'addresses': [
+        {'id': '1', 'name': 'web', 'folder': 'Shared', 'ip_netmask': '10.0.0.1/32',
+         'tag': ['a']},
+        {'id': '2', 'name': 'db', 'folder': 'Shared', 'ip_netmask': '10.0.0.2/32'},
+        {'id': '3', 'name': 'gone', 'folder': 'Shared', 'fqdn': 'gone.example.com'},
+    ],
+    'tags': [{'id': '4', 'name': 'a', 'folder': 'Shared', 'color': 'Red'}],
+}
+NEW = {
+    'addresses': [
+        # same content, new id and key order
+        {'tag': ['a'], 'ip_netmask': '10.0.0.1/32', 'folder': 'Shared', 'name': 'web',
+         'id': '11'},
+        {'id': '2', 'name': 'db', 'folder': 'Shared', 'ip_netmask': '10.0.0.3/32',
+         'description': 'moved'},
+        {'id': '5', 'name': 'new', 'folder': 'Shared', 'fqdn': 'new.example.com'},
+    ],
+    'tags': [{'id': '4', 'name': 'a', 'folder': 'Shared', 'color': 'Blue'}],
+}
+
+
+def pairs(snapshot):
+    return [(obj_type, obj) for obj_type, objects in snapshot.items() for obj in objects]
+
+
+class TestConfigDiff(unittest.TestCase):
+
+    def test_diff(self):
+        diff = config_diff(OLD, NEW)
+        self.assertEqual([(event['type'], event['name']) for event in diff['added']],
+                         [('addresses', 'new')])
+        self.assertEqual([(event['type'], event['name']) for event in diff['removed']],
+                         [('addresses', 'gone')])
+        self.assertEqual(diff['removed'][0]['object']['fqdn'], 'gone.example.com')
+        modified = {(event['type'], event['name']): event['changes']
+                    for event in diff['modified']}
+        self.assertEqual(modified, {
+            ('addresses', 'db'): [
+                {'field': 'description', 'old': None, 'new': 'moved'},
+                {'field': 'ip_netmask', 'old': '10.0.0.2/32', 'new': '10.0.0.3/32'}],
+            ('tags', 'a'): [{'field': 'color', 'old': 'Red', 'new': 'Blue'}],
+        })
+
+    def test_identical(self):
+        self.assertEqual(config_diff(OLD, OLD), {'added': [], 'removed': [], 'modified': []})
+
+    def test_ignore_fields(self):
+        diff = config_diff(OLD, NEW, ignore_fields=())
+        self.assertIn(('addresses', 'web'), [(event['type'], event['name'])
+                                             for event in diff['modified']])
+
+    def test_sorted_merge_join_matches(self):
+        def ordered(snapshot):
+            return sorted(pairs(snapshot), key=lambda pair: config_diff_key(*pair))
+
+        merged = sorted(config_diff_stream(ordered(OLD), ordered(NEW), sorted=True),
+                        key=lambda event: (event['action'], event['type'], event['name']))
+        hashed = sorted(config_diff_stream(pairs(OLD), pairs(NEW)),
+                        key=lambda event: (event['action'], event['type'], event['name']))
+        self.assertEqual(merged, hashed)
+
+    def test_list_response_input(self):
+        diff = config_diff({'data': OLD['addresses']}, {'data': NEW['addresses']},
+                           obj_type='addresses')
+        self.assertEqual(len(diff['added']) + len(diff['removed']) + len(diff['modified']), 3)
+
+    def test_digest_and_fields(self):
+        self.assertEqual(config_diff_digest({'a': 1, 'b': {'c': 2}, 'id': 'x'}),
+                         config_diff_digest({'b': {'c': 2}, 'a': 1, 'id': 'y'}))
+        self.assertNotEqual(config_diff_digest({'a': 1}), config_diff_digest({'a': 2}))
+        self.assertEqual(config_diff_fields({'a': {'b': 1, 'c': [1]}}, {'a': {'b': 2, 'c': [1]}}),
+                         [{'field': 'a.b', 'old': 1, 'new': 2}])
+
+
+if __name__ == '__main__':
+    unittest.main()
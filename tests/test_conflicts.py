@@ -0,0 +1,75 @@
+"""Subnet overlap sweep and BGP address collisions"""
+import ipaddress
+import random
+import unittest
+
+from prismasase.exceptions import SASEConflictError
+from prismasase.service_setup.remotenetworks.conflicts import (remote_network_check_conflicts,
+                                                               remote_network_conflicts)
+
+
+def site(name, subnets=(), **kwargs):
+    return {'remote_network_name': name, 'static_enabled': bool(subnets),
+            'static_routing': list(subnets), **kwargs}
+
+
+def pairs(conflicts, kind='subnet_overlap'):
+    return sorted(tuple(sorted(conflict['sites'])) for conflict in conflicts
+                  if conflict['type'] == kind)
+
+
+class TestConflicts(unittest.TestCase):
+
+    def test_overlaps(self):
+        conflicts = remote_network_conflicts([
+            site('a', ['10.0.0.0/16']),
+            site('b', ['10.0.5.0/24']),
+            site('c', ['10.1.0.0/24', '10.0.0.0/30']),
+            site('d', ['10.2.0.0/24']),
+            site('e', ['10.2.1.0/24']),
+        ], existing=[])
+        self.assertEqual(pairs(conflicts), [('a', 'b'), ('a', 'c')])
+
+    def test_same_site_and_replaced_existing(self):
+        existing = [{'name': 'a', 'subnets': ['10.0.0.0/24']},
+                    {'name': 'old', 'subnets': ['10.9.0.0/16']}]
+        conflicts = remote_network_conflicts([
+            site('a', ['10.0.0.0/24', '10.0.0.0/25']),
+            site('b', ['10.9.8.0/24']),
+        ], existing=existing)
+        self.assertEqual(pairs(conflicts), [('b', 'old')])
+
+    def test_bgp_and_invalid(self):
+        conflicts = remote_network_conflicts([
+            site('a', bgp_enabled=True, bgp_peer_ip='169.254.0.1', bgp_local_ip='169.254.0.2'),
+            site('b', ['10.0.0.0/33']),
+        ], existing=[{'name': 'x', 'protocol': {'bgp': {'enable': True,
+                                                        'peer_ip_address': '169.254.0.2'}}}])
+        self.assertEqual(pairs(conflicts, 'bgp_ip_duplicate'), [('a', 'x')])
+        self.assertEqual(pairs(conflicts, 'invalid_subnet'), [('b',)])
+        with self.assertRaises(SASEConflictError):
+            remote_network_check_conflicts([site('a', ['10.0.0.0/8']), site('b', ['10.0.0.0/8'])],
+                                           existing=[])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        sites = []
+        for number in range(150):
+            sites.append(site(f"s{number}", [
+                f"10.{rng.randrange(8)}.{rng.randrange(256)}.0/{rng.randrange(14, 29)}"
+                for _ in range(rng.randrange(1, 3))]))
+        expected = set()
+        for first in sites:
+            for second in sites:
+                if first['remote_network_name'] >= second['remote_network_name']:
+                    continue
+                if any(ipaddress.ip_network(left, strict=False).overlaps(
+                        ipaddress.ip_network(right, strict=False))
+                       for left in first['static_routing']
+                       for right in second['static_routing']):
+                    expected.add((first['remote_network_name'], second['remote_network_name']))
+        self.assertEqual(set(pairs(remote_network_conflicts(sites, existing=[]))), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Optional HTTP/2 transport and its fallback without httpx"""
+import os
+import unittest
+from unittest import mock
+
+import orjson
+import requests
+
+from prismasase import transport
+from prismasase.transport import (HTTP2Transport, RequestsTransport, default_transport,
+                                  http2_transport)
+
+
+class TestHTTP2Fallback(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(transport, 'httpx', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falls_back_to_requests(self):
+        self.assertIsInstance(http2_transport(max_streams=10), RequestsTransport)
+        with self.assertRaises(ImportError):
+            HTTP2Transport()
+
+    def test_default_transport_from_env(self):
+        with mock.patch.object(transport, '_DEFAULT_TRANSPORT', None), \
+                mock.patch.dict(os.environ, {'TRANSPORT': 'http2'}):
+            self.assertIsInstance(default_transport(), RequestsTransport)
+
+
+@unittest.skipIf(transport.httpx is None, "httpx is not installed")
+class TestHTTP2Transport(unittest.TestCase):
+
+    def setUp(self):
+        httpx = transport.httpx
+
+        def handler(request):
+            if request.url.path.endswith('/down'):
+                raise httpx.ConnectError("refused", request=request)
+            body = orjson.dumps({'path': request.url.path,
+                                 'folder': request.url.params.get('folder')})
+            # a stream like the network's, so the body is read and closed the same way
+            return httpx.Response(200, stream=httpx.ByteStream(body))
+        self.http2 = HTTP2Transport(max_streams=2)
+        self.addCleanup(self.http2.close)
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        patcher = mock.patch.object(self.http2, '_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_request_and_stream(self):
+        response = self.http2.request('GET', 'https://example.com/tags',
+                                      params={'folder': 'Shared'})
+        self.assertEqual(response.json(), {'path': '/tags', 'folder': 'Shared'})
+        self.assertEqual(sum(self.http2.http_versions.values()), 1)
+        streamed = self.http2.stream('GET', 'https://example.com/tags')
+        try:
+            self.assertEqual(streamed.read(), b'{"path":"/tags","folder":null}')
+        finally:
+            streamed.close()
+
+    def test_errors_match_requests(self):
+        with self.assertRaises(requests.ConnectionError):
+            self.http2.request('GET', 'https://example.com/down')
+        with self.assertRaises(requests.ConnectionError):
+            self.http2.stream('GET', 'https://example.com/down')
+        # every stream slot was released
+        for _ in range(3):
+            self.http2.stream('GET', 'https://example.com/tags').close()
+
+
+if __name__ == '__main__':
+    unittest.main()
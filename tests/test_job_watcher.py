@@ -0,0 +1,72 @@
+"""Shared job poller against FakeTransport"""
+import unittest
+
+from prismasase.config_mgmt.job_watcher import JobWatcher, job_state
+from prismasase.configs import Auth
+from prismasase.transport import FakeTransport
+
+
+class TestJobWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.jobs = {}
+        self.transport = FakeTransport()
+
+        def job(method, path, params, body):  # pylint: disable=unused-argument
+            job_id = path.rsplit('/', 1)[-1]
+            return 200, {'data': [self.jobs[job_id]] if job_id in self.jobs else []}
+
+        def recent(method, path, params, body):  # pylint: disable=unused-argument
+            newest = sorted(self.jobs.values(), key=lambda job: -int(job['id']))
+            return 200, {'data': newest[:int(params['limit'])]}
+        self.transport.route('GET', 'jobs/', job)
+        self.transport.route('GET', 'jobs', recent)
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+        self.watcher = JobWatcher(interval=0.01, page_size=2, auth=self.auth)
+
+    def set_job(self, job_id, status, result='', parent_id=''):
+        self.jobs[job_id] = {'id': job_id, 'status_str': status, 'result_str': result,
+                             'parent_id': parent_id}
+
+    def lookups(self):
+        return [path for _, path, _ in self.transport.calls if path.startswith('jobs/')]
+
+    def test_transitions_and_subjobs(self):
+        self.set_job('10', 'PEND')
+        events = []
+
+        def advance(event):
+            # the tenant moves on as soon as each state was seen
+            events.append(event and (event['job_id'], event['state'], event['previous']))
+            if events[-1] == ('10', 'queued', ''):
+                self.set_job('10', 'ACT')
+            elif events[-1] == ('10', 'running', 'queued'):
+                self.set_job('10', 'FIN', 'OK')
+                self.set_job('11', 'ACT', parent_id='10')
+            elif events[-1] == ('11', 'running', ''):
+                self.set_job('11', 'FIN', 'FAIL', parent_id='10')
+        subscription = self.watcher.subscribe(['10'], advance, subjob_wait=0.05)
+        self.assertTrue(subscription.done.wait(5))
+        self.assertEqual(events, [('10', 'queued', ''), ('10', 'running', 'queued'),
+                                  ('11', 'subjob', ''), ('10', 'FIN/OK', 'running'),
+                                  ('11', 'running', ''), ('11', 'FIN/FAIL', 'running'), None])
+        self.assertEqual(subscription.final, {'10': 'FIN/OK', '11': 'FIN/FAIL'})
+
+    def test_old_jobs_looked_up_once(self):
+        self.set_job('1', 'FIN', 'OK')
+        for job_id in ['7', '8', '9']:
+            self.set_job(job_id, 'FIN', 'OK')
+        self.assertEqual(self.watcher.wait(['1', '9'], timeout=5, subjobs=False),
+                         {'1': 'FIN/OK', '9': 'FIN/OK'})
+        # 1 is not on the recent page, 9 is
+        self.assertEqual(self.lookups(), ['jobs/1'])
+
+    def test_job_state(self):
+        self.assertEqual(job_state({'status_str': 'PEND'}), 'queued')
+        self.assertEqual(job_state({'status_str': 'FIN', 'result_str': 'FAIL'}), 'FIN/FAIL')
+        self.assertEqual(job_state({'status_str': 'FIN'}), 'FIN/OK')
+        self.assertEqual(job_state({}), 'queued')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Write-ahead journal and resumable remote network imports"""
+import os
+import tempfile
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.journal import Journal
+from prismasase.service_setup.remotenetworks.remote_networks import bulk_import_remote_networks
+from prismasase.transport import FakeTransport
+
+from .test_preflight import FOLDER, site
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'import.jsonl')
+
+    def test_replay_and_changed_items(self):
+        digest = Journal.digest({'name': 'a', 'auth': object()})
+        self.assertEqual(digest, Journal.digest({'name': 'a'}))
+        with Journal(self.path) as journal:
+            journal.record('a', 'ike_gateway', {'id': '1', 'name': 'gw', 'secret': 'x'}, digest)
+            journal.record('a', 'ipsec_tunnel', {'id': '2', 'name': 'tun'}, digest)
+        with open(self.path, 'ab') as journal_file:
+            # a torn line from a crash mid write
+            journal_file.write(b'{"key": "a", "st')
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.completed('a', digest),
+                             {'ike_gateway': {'id': '1', 'name': 'gw'},
+                              'ipsec_tunnel': {'id': '2', 'name': 'tun'}})
+            changed = Journal.digest({'name': 'a', 'region': 'other'})
+            self.assertEqual(journal.completed('a', changed), {})
+            journal.record('a', 'ike_gateway', {'id': '3', 'name': 'gw'}, changed)
+            self.assertEqual(journal.completed('a', changed), {'ike_gateway': {'id': '3',
+                                                                               'name': 'gw'}})
+        with open(self.path, 'rb') as journal_file:
+            self.assertNotIn(b'secret', journal_file.read())
+
+
+class TestResumableImport(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'import.jsonl')
+        self.transport = FakeTransport()
+        self.transport.add('bandwidth-allocations', FOLDER,
+                           {'name': 'us-east', 'spn_name_list': ['us-east-spn']})
+        self.transport.add('ike-crypto-profiles', FOLDER, {'name': 'ike-default'})
+        self.transport.add('ipsec-crypto-profiles', FOLDER, {'name': 'ipsec-default'})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+        self.failing = True
+
+        def tunnels(method, path, params, body):  # pylint: disable=unused-argument
+            if body.get('name') == 'ipsec-tunnel-b' and self.failing:
+                return 400, {'_errors': [{'code': 'E003', 'message': 'Invalid Object'}]}
+            objects = self.transport.store.setdefault(('ipsec-tunnels', FOLDER), [])
+            return self.transport._crud(method, objects, '', params, body)  # pylint: disable=protected-access
+        self.transport.route('POST', 'ipsec-tunnels', tunnels)
+
+    def posts(self):
+        return [path for method, path, _ in self.transport.calls if method == 'POST']
+
+    def test_resume_at_failed_step(self):
+        sites = [site('a'), site('b')]
+        first = bulk_import_remote_networks(sites, auth=self.auth, journal=self.path)
+        self.assertEqual([result['status'] for result in first['results']], ['success', 'error'])
+        self.failing = False
+        self.transport.calls.clear()
+        second = bulk_import_remote_networks(sites, auth=self.auth, journal=self.path)
+        self.assertEqual([(result['name'], result['status']) for result in second['results']],
+                         [('a', 'success'), ('b', 'success')])
+        self.assertEqual(second['results'][0]['message'], 'journaled')
+        # b already has its IKE gateway; a is not touched at all
+        self.assertEqual(self.posts(), ['ipsec-tunnels', 'remote-networks'])
+        self.assertEqual(sorted(obj['name'] for obj in self.transport.store[
+            ('remote-networks', FOLDER)]), ['a', 'b'])
+        self.transport.calls.clear()
+        third = bulk_import_remote_networks(sites, auth=self.auth, journal=self.path)
+        self.assertEqual(third['status'], 'success')
+        self.assertEqual(self.transport.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
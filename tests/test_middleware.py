@@ -0,0 +1,110 @@
+"""Middleware chain around prisma_request against FakeTransport"""
+import unittest
+from unittest import mock
+
+import requests
+
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.middleware import Middleware, middleware_chain
+from prismasase.restapi import prisma_request
+from prismasase.transport import FakeTransport
+
+FOLDER = {'folder': 'Shared'}
+
+
+class Recorder(Middleware):
+    """Notes the order stages run in"""
+
+    def __init__(self, name, log, answer=None):
+        self.name = name
+        self.log = log
+        self.answer = answer
+
+    def before(self, request):
+        self.log.append(f"{self.name}.before")
+        return self.answer
+
+    def after(self, request, response):
+        self.log.append(f"{self.name}.after")
+        return response
+
+
+class TestMiddlewareChain(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add('tags', 'Shared', {'name': 'a'})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+        sleep = mock.patch('prismasase.middleware.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def get(self, chain, **kwargs):
+        return prisma_request(self.auth, method='GET', url_type='tags', params=dict(FOLDER),
+                              middleware=chain, **kwargs)
+
+    def test_stage_order_and_short_circuit(self):
+        log = []
+        chain = middleware_chain([Recorder('outer', log), Recorder('inner', log)])
+        self.get(chain)
+        self.assertEqual(log, ['outer.before', 'inner.before', 'inner.after', 'outer.after'])
+        log.clear()
+        chain.insert(Recorder('answer', log, answer=self.transport.request(
+            'GET', 'https://x/sse/config/v1/tags', params=dict(FOLDER))), before='inner')
+        calls = len(self.transport.calls)
+        self.get(chain)
+        self.assertEqual(log, ['outer.before', 'answer.before', 'outer.after'])
+        self.assertEqual(len(self.transport.calls), calls)
+        chain.remove('answer')
+        self.assertEqual([stage.name for stage in chain.stages], ['outer', 'inner'])
+        with self.assertRaises(SASEBadParam):
+            middleware_chain("logging,nope")
+
+    def test_retry_backs_off_and_skips_posts(self):
+        statuses = [429, 503]
+
+        def flaky(method, path, params, body):  # pylint: disable=unused-argument
+            if statuses:
+                return statuses.pop(0), {'message': 'busy'}
+            return 200, {'data': [], 'limit': 200, 'offset': 0, 'total': 0}
+        self.transport.route('GET', 'tags', flaky)
+        self.transport.route('POST', 'tags', lambda *args: (503, {'message': 'busy'}))
+        chain = middleware_chain("retry")
+        self.assertEqual(self.get(chain)['total'], 0)
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0])
+        calls = len(self.transport.calls)
+        with self.assertRaises(requests.HTTPError):
+            prisma_request(self.auth, method='POST', url_type='tags', params=dict(FOLDER),
+                           data={'name': 'b'}, middleware=chain)
+        self.assertEqual(len(self.transport.calls), calls + 1)
+
+    def test_cache_dropped_by_writes(self):
+        chain = middleware_chain("cache,metrics")
+        self.get(chain)
+        self.get(chain)
+        self.assertEqual(chain.stage('cache').hits, 1)
+        prisma_request(self.auth, method='POST', url_type='tags', params=dict(FOLDER),
+                       data={'name': 'b'}, middleware=chain)
+        self.assertEqual(len(self.get(chain)['data']), 2)
+        self.assertEqual([(row['method'], row['status'], row['count'])
+                          for row in chain.stage('metrics').snapshot()],
+                         [('GET', 200, 2), ('POST', 201, 1)])
+
+    def test_auth_refreshes_once_on_401(self):
+        rejected = [401]
+
+        def unauthorized(method, path, params, body):  # pylint: disable=unused-argument
+            if rejected:
+                return rejected.pop(), {'message': 'token expired'}
+            return 200, {'data': [], 'limit': 200, 'offset': 0, 'total': 0}
+        self.transport.route('GET', 'tags', unauthorized)
+        chain = middleware_chain("auth")
+        with mock.patch.object(self.auth, 'get_token', wraps=self.auth.get_token) as get_token:
+            self.assertEqual(self.get(chain)['total'], 0)
+        self.assertEqual(get_token.call_count, 1)
+        self.assertEqual(chain.stats()['requests'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
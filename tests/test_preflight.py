@@ -0,0 +1,94 @@
+"""Offline preflight of a remote network inventory"""
+import os
+import tempfile
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEPreflightError
+from prismasase.service_setup.remotenetworks.preflight import (remote_network_check_preflight,
+                                                               remote_network_load_inventory,
+                                                               remote_network_preflight,
+                                                               remote_network_tenant_snapshot)
+from prismasase.transport import FakeTransport
+
+FOLDER = 'Remote Networks'
+
+
+def site(name, **kwargs):
+    return {'remote_network_name': name, 'region': 'us-east-1', 'spn_name': 'us-east-spn',
+            'ike_crypto_profile': 'ike-default', 'ipsec_crypto_profile': 'ipsec-default',
+            'pre_shared_key': 'secret', 'peer_id_value': f"{name}.example.com",
+            'local_id_value': 'hub.example.com', **kwargs}
+
+
+class TestPreflight(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.transport.add('bandwidth-allocations', FOLDER,
+                           {'name': 'us-east', 'spn_name_list': ['us-east-spn']})
+        self.transport.add('ike-crypto-profiles', FOLDER, {'name': 'ike-default'})
+        self.transport.add('ipsec-crypto-profiles', FOLDER, {'name': 'ipsec-default'})
+        self.transport.add('remote-networks', FOLDER,
+                           {'name': 'existing', 'subnets': ['10.9.0.0/16'], 'region': 'x'},
+                           {'name': 'other', 'subnets': ['10.8.0.0/16']})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+        self.snapshot = remote_network_tenant_snapshot(auth=self.auth)
+
+    def test_snapshot(self):
+        self.assertEqual(self.snapshot['ike_crypto_profiles'], ['ike-default'])
+        self.assertEqual(self.snapshot['remote_networks'],
+                         [{'name': 'existing', 'subnets': ['10.9.0.0/16']},
+                          {'name': 'other', 'subnets': ['10.8.0.0/16']}])
+        self.assertEqual(len(self.transport.calls), 4)
+
+    def test_every_error_reported(self):
+        report = remote_network_preflight([
+            site('good', static_enabled='true', static_routing='10.0.0.0/24'),
+            site('bad', spn_name='eu-spn', ike_crypto_profile='nope', peer_id_type='ip',
+                 bgp_enabled='true', bgp_peer_ip='1.2.3', bgp_local_ip='10.0.0.1',
+                 bgp_peer_as='0'),
+            site('good'),
+            site('x' * 32, pre_shared_key=''),
+            site('overlap', static_enabled='true', static_routing='10.8.1.0/24'),
+            # replaces the existing network so its subnets no longer count
+            site('existing', static_enabled='true', static_routing='10.9.1.0/24'),
+        ], snapshot=self.snapshot)
+        found = {(error['row'], error['field']) for error in report['errors']}
+        self.assertEqual(found, {
+            (2, 'spn_name'), (2, 'ike_crypto_profile'), (2, 'peer_id_type'),
+            (2, 'bgp_peer_ip'), (2, 'bgp_peer_as'), (3, 'remote_network_name'),
+            (4, 'remote_network_name'), (4, 'pre_shared_key'), (5, 'subnet_overlap')})
+        self.assertEqual([warning['row'] for warning in report['warnings']], [6])
+        self.assertEqual((report['status'], report['rows']), ('error', 6))
+        with self.assertRaises(SASEPreflightError):
+            remote_network_check_preflight([site('bad', ike_crypto_profile='nope')],
+                                           snapshot=self.snapshot)
+        self.assertEqual(remote_network_check_preflight([site('good')],
+                                                        snapshot=self.snapshot)['status'],
+                         'success')
+
+    def test_snapshot_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'snapshot.json')
+            first = remote_network_tenant_snapshot(auth=self.auth, cache_file=cache_file)
+            calls = len(self.transport.calls)
+            self.assertEqual(remote_network_tenant_snapshot(auth=self.auth, cache_file=cache_file),
+                             first)
+            self.assertEqual(len(self.transport.calls), calls)
+            remote_network_tenant_snapshot(auth=self.auth, cache_file=cache_file, refresh=True)
+            self.assertEqual(len(self.transport.calls), calls + 4)
+
+    def test_load_inventory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sites.csv')
+            with open(path, 'w', encoding='utf-8') as inventory:
+                inventory.write("remote_network_name,region,peer_fqdn,local_fqdn,bgp_peer_as\n"
+                                "a,us-east-1,a.example.com,hub.example.com,\n")
+            self.assertEqual(remote_network_load_inventory(path), [{
+                'remote_network_name': 'a', 'region': 'us-east-1',
+                'peer_id_value': 'a.example.com', 'local_id_value': 'hub.example.com'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
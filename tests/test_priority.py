@@ -0,0 +1,80 @@
+"""Priority lanes sharing a tenant's rate limit"""
+import threading
+import time
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.middleware import (PriorityMiddleware, default_middleware, middleware_chain,
+                                   priority_lane)
+from prismasase.policy_objects import tags
+from prismasase.policy_objects.autotags import auto_tag_bulk_create
+from prismasase.restapi import prisma_request
+from prismasase.transport import FakeTransport
+
+from .test_autotags import action, auto_tag
+
+FOLDER = {'folder': 'Shared'}
+
+
+def sent(lanes):
+    stats = default_middleware().stage('priority').stats()
+    return {lane: stats[lane]['requests'] for lane in lanes}
+
+
+class TestPriorityLanes(unittest.TestCase):
+
+    def setUp(self):
+        tags._TAG_INDEXES.clear()  # pylint: disable=protected-access
+        self.transport = FakeTransport()
+        self.transport.add('tags', 'Shared', {'name': 'web'})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def get(self, name, auth=None, **kwargs):
+        return prisma_request(auth or self.auth, method='GET', url_type='tags',
+                              params=dict(FOLDER), name=name, **kwargs)
+
+    def test_default_chain_honours_priorities(self):
+        before = sent(['interactive', 'normal', 'bulk'])
+        self.get('a')
+        self.get('b', priority='interactive')
+        with priority_lane('bulk'):
+            self.get('c')
+            self.get('d', priority='interactive')
+        after = sent(['interactive', 'normal', 'bulk'])
+        self.assertEqual({lane: after[lane] - before[lane] for lane in after},
+                         {'interactive': 2, 'normal': 1, 'bulk': 1})
+        with self.assertRaises(SASEBadParam):
+            self.get('e', priority='urgent')
+
+    def test_bulk_helpers_send_as_bulk(self):
+        before = sent(['bulk'])['bulk']
+        response = auto_tag_bulk_create([auto_tag('one', action('a', 'web', 'new'))],
+                                        create_missing=True, auth=self.auth)
+        self.assertEqual(response['results'][0]['status'], 'created')
+        # creating the missing tag and the auto tag; the listings are reads
+        self.assertEqual(sent(['bulk'])['bulk'] - before, 2)
+
+    def test_interactive_overtakes_queued_bulk(self):
+        chain = middleware_chain([PriorityMiddleware(rate=20, burst=1)])
+        auth = Auth('2', 'id', 'secret', transport=self.transport, middleware=chain)
+        bulk = [threading.Thread(target=self.get, args=(f"bulk{number}", auth),
+                                 kwargs={'priority': 'bulk'}) for number in range(10)]
+        for thread in bulk:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while len(self.transport.calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        queued = len(self.transport.calls)
+        self.get('urgent', auth, priority='interactive')
+        for thread in bulk:
+            thread.join()
+        names = [params['name'] for _, _, params in self.transport.calls]
+        # at most the bulk request already holding the next token goes first
+        self.assertLessEqual(names.index('urgent'), queued + 1)
+        stats = chain.stage('priority').stats()
+        self.assertLess(stats['interactive']['avg_wait_ms'], stats['bulk']['avg_wait_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
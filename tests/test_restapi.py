@@ -0,0 +1,205 @@
+"""Paging and lookups against FakeTransport"""
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+from prismasase import restapi
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadRequest
+from prismasase.restapi import (_page_size_rejected, prisma_request_iter,
+                                prisma_request_lookup)
+from prismasase.transport import FakeTransport
+from prismasase.utilities import object_already_exists
+
+FOLDER = {'folder': 'Shared'}
+
+
+def reset_learned_state():
+    for learned in (restapi._PAGE_SIZES, restapi._PAGE_CEILINGS,  # pylint: disable=protected-access
+                    restapi._NAME_FILTER_UNSUPPORTED, restapi._FIELDS_UNSUPPORTED,  # pylint: disable=protected-access
+                    restapi._NAME_INDEXES):  # pylint: disable=protected-access
+        learned.clear()
+
+
+class TestPaging(unittest.TestCase):
+
+    def setUp(self):
+        reset_learned_state()
+        self.transport = FakeTransport()
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+        self.objects = [{'id': str(number), 'name': f"obj{number}"} for number in range(1000)]
+
+    def capped(self, cap, total=True):
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            offset, limit = int(params.get('offset', 0)), int(params.get('limit', 200))
+            page = {'data': self.objects[offset:offset + min(limit, cap)],
+                    'limit': limit, 'offset': offset}
+            if total:
+                page['total'] = len(self.objects)
+            return 200, page
+        self.transport.route('GET', 'addresses', handler)
+
+    def test_silent_cap_with_total(self):
+        # the endpoint caps pages at 200 but echoes the requested limit
+        self.capped(200)
+        for stream in (False, True):
+            objects = list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER),
+                                               stream=stream))
+            self.assertEqual(objects, self.objects)
+        self.assertEqual(restapi._PAGE_CEILINGS['addresses'], 200)  # pylint: disable=protected-access
+
+    def test_short_page_without_total_ends(self):
+        self.capped(200, total=False)
+        objects = list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER)))
+        self.assertEqual(objects, self.objects[:200])
+
+    def test_fixed_limit_and_offset(self):
+        self.transport.add('addresses', 'Shared', *[{'name': f"a{number}"}
+                                                    for number in range(25)])
+        objects = list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER),
+                                           limit=10, offset=5))
+        self.assertEqual([obj['name'] for obj in objects], [f"a{number}" for number in range(5, 25)])
+        self.assertEqual([call[2]['limit'] for call in self.transport.calls
+                          if call[1] == 'addresses'], [10, 10])
+
+    def test_fields_projection(self):
+        self.transport.add('addresses', 'Shared', {'name': 'a', 'fqdn': 'a.example.com'})
+        self.assertEqual(list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER),
+                                                  fields=('name',))), [{'name': 'a'}])
+        self.assertEqual(self.transport.calls[-1][2]['fields'], 'name')
+
+    def test_rejected_fields_projected_client_side(self):
+        self.transport.add('addresses', 'Shared', {'name': 'a', 'fqdn': 'a.example.com'})
+
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            if 'fields' in params:
+                return 400, {'_errors': [{'code': 'E003', 'message': 'Invalid Query Parameter',
+                                          'details': {'message': 'unknown field: fields'}}]}
+            objects = self.transport.store[('addresses', 'Shared')]
+            return self.transport._crud(method, objects, '', params, body)  # pylint: disable=protected-access
+        self.transport.route('GET', 'addresses', handler)
+        for _ in range(2):
+            self.assertEqual(list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER),
+                                                      fields=('id', 'name'))),
+                             [{'id': '1', 'name': 'a'}])
+        self.assertIn('addresses', restapi._FIELDS_UNSUPPORTED)  # pylint: disable=protected-access
+        # the parameter is only tried once
+        self.assertEqual(['fields' in call[2] for call in self.transport.calls], [True, False, False])
+
+    def test_rejected_limit(self):
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            if int(params['limit']) > 500:
+                return 400, {'_errors': [{'code': 'E003', 'message': 'Invalid Query Parameter',
+                                          'details': {'message': 'request 987654: limit '
+                                                                 'must be <= 500'}}]}
+            offset, limit = int(params['offset']), int(params['limit'])
+            return 200, {'data': self.objects[offset:offset + limit], 'limit': limit,
+                         'offset': offset, 'total': len(self.objects)}
+        self.transport.route('GET', 'addresses', handler)
+        self.assertEqual(len(list(prisma_request_iter(self.auth, 'addresses', dict(FOLDER)))),
+                         1000)
+        self.assertEqual(restapi._PAGE_CEILINGS['addresses'], 500)  # pylint: disable=protected-access
+
+    def test_page_size_rejected_parsing(self):
+        self.assertEqual(_page_size_rejected('a', 5000, 'maximum limit is 1000'), 1000)
+        self.assertEqual(_page_size_rejected('b', 5000, 'limit=5000 must be <= 2000'), 2000)
+        # numbers not tied to the limit are ignored
+        self.assertEqual(_page_size_rejected('c', 5000, 'object 4096 at offset 300 invalid'), 2500)
+
+    def test_learned_from_worker_threads(self):
+        def learn(number):
+            url_type = f"type{number % 50}"
+            restapi._page_size_observed(url_type, 1000, 100 + number, 1.0)  # pylint: disable=protected-access
+            return restapi.page_size(f"new{number}")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sizes = list(executor.map(learn, range(2000)))
+        self.assertTrue(all(size >= 100 for size in sizes))
+        self.assertEqual(len(restapi._PAGE_CEILINGS), 50)  # pylint: disable=protected-access
+
+
+class TestLookup(unittest.TestCase):
+
+    def setUp(self):
+        reset_learned_state()
+        self.transport = FakeTransport()
+        self.transport.add('addresses', 'Shared', {'name': 'web', 'fqdn': 'web.example.com'},
+                           {'name': 'db', 'fqdn': 'db.example.com'})
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def lookup(self, name, **kwargs):
+        return prisma_request_lookup(self.auth, 'addresses', name=name, params=dict(FOLDER),
+                                     **kwargs)
+
+    def test_found_and_projected(self):
+        self.assertEqual(self.lookup('web')['fqdn'], 'web.example.com')
+        self.assertEqual(self.lookup('web', fields=('id',)), {'id': '1', 'name': 'web'})
+        self.assertEqual(self.transport.calls[-1][2]['name'], 'web')
+
+    def test_not_found_keeps_name_filter(self):
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            return 404, {'_errors': [{'code': 'E005', 'message': 'Object Not Present'}]}
+        self.transport.route('GET', 'addresses', handler)
+        self.assertEqual(self.lookup('missing'), {})
+        self.assertNotIn('addresses', restapi._NAME_FILTER_UNSUPPORTED)  # pylint: disable=protected-access
+
+    def test_other_errors_raise(self):
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            return 403, {'_errors': [{'code': 'E007', 'message': 'Unauthorized'}]}
+        self.transport.route('GET', 'addresses', handler)
+        with self.assertRaises(SASEBadRequest):
+            self.lookup('web')
+        self.assertNotIn('addresses', restapi._NAME_FILTER_UNSUPPORTED)  # pylint: disable=protected-access
+
+    def test_single_object_response(self):
+        self.transport.route('GET', 'addresses', lambda *args: (200, {'id': '9', 'name': 'web'}))
+        self.assertEqual(self.lookup('web'), {'id': '9', 'name': 'web'})
+        self.assertEqual(self.lookup('db'), {})
+        self.assertNotIn('addresses', restapi._NAME_FILTER_UNSUPPORTED)  # pylint: disable=protected-access
+
+    def test_substring_matches_filtered_client_side(self):
+        matches = [{'id': str(number), 'name': f"web{number}"} for number in range(250)]
+        matches.append({'id': 'x', 'name': 'web'})
+
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            found = [entry for entry in matches if params['name'] in entry['name']]
+            offset, limit = int(params.get('offset', 0)), int(params.get('limit', 200))
+            return 200, {'data': found[offset:offset + limit], 'limit': limit,
+                         'offset': offset, 'total': len(found)}
+        self.transport.route('GET', 'addresses', handler)
+        self.assertEqual(self.lookup('web'), {'id': 'x', 'name': 'web'})
+        self.assertEqual(self.lookup('web7'), {'id': '7', 'name': 'web7'})
+        self.assertEqual(self.lookup('web7x'), {})
+        self.assertNotIn('addresses', restapi._NAME_FILTER_UNSUPPORTED)  # pylint: disable=protected-access
+
+    def test_ignored_filter_falls_back_to_name_index(self):
+        everything = [{'id': '1', 'name': 'web'}, {'id': '2', 'name': 'db'}]
+        self.transport.route('GET', 'addresses', lambda *args: (
+            200, {'data': everything, 'limit': 200, 'offset': 0, 'total': 2}))
+        self.assertEqual(self.lookup('db'), {'id': '2', 'name': 'db'})
+        self.assertIn('addresses', restapi._NAME_FILTER_UNSUPPORTED)  # pylint: disable=protected-access
+        calls = len(self.transport.calls)
+        self.assertEqual(self.lookup('web'), {'id': '1', 'name': 'web'})
+        self.assertEqual(len(self.transport.calls), calls)
+
+
+class TestAlreadyExists(unittest.TestCase):
+
+    def test_error_codes(self):
+        transport = FakeTransport()
+        auth = Auth('1', 'id', 'secret', transport=transport)
+        restapi.prisma_request(auth, method='POST', url_type='tags', params=dict(FOLDER),
+                               data={'name': 'a'})
+        with self.assertRaises(SASEBadRequest) as duplicate:
+            restapi.prisma_request(auth, method='POST', url_type='tags', params=dict(FOLDER),
+                                   data={'name': 'a'})
+        self.assertTrue(object_already_exists(duplicate.exception))
+        self.assertTrue(object_already_exists(SASEBadRequest(
+            '{"_errors":[{"code":"E006","message":"Name Not Unique","details":{}}]}')))
+        self.assertFalse(object_already_exists(SASEBadRequest(
+            '{"_errors":[{"code":"E016","message":"Invalid Object","details":'
+            '{"message":"name already exists in description"}}]}')))
+        self.assertFalse(object_already_exists(SASEBadRequest('already exists')))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Concurrent identical GETs sharing one request"""
+import threading
+import time
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadRequest
+from prismasase.middleware import middleware_chain
+from prismasase.restapi import prisma_request
+from prismasase.transport import FakeTransport
+
+FOLDER = {'folder': 'Shared'}
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.release = threading.Event()
+        self.status = 200
+        self.sent = 0
+
+        def slow(method, path, params, body):  # pylint: disable=unused-argument
+            self.sent += 1
+            self.release.wait(5)
+            if self.status != 200:
+                return self.status, {'_errors': [{'code': 'E003', 'message': 'Invalid'}]}
+            return 200, {'data': [{'name': 'a'}], 'limit': 200, 'offset': 0, 'total': 1}
+        self.transport.route('GET', 'tags', slow)
+        self.chain = middleware_chain("single_flight")
+        self.stage = self.chain.stage('single_flight')
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport, middleware=self.chain)
+
+    def get_concurrently(self, auths, shared, sent=1):
+        results = []
+
+        def get(auth):
+            try:
+                results.append(prisma_request(auth, method='GET', url_type='tags',
+                                              params=dict(FOLDER)))
+            except SASEBadRequest as err:
+                results.append(err)
+        threads = [threading.Thread(target=get, args=(auth,)) for auth in auths]
+        for thread in threads:
+            thread.start()
+        # wait until every follower joined a request in flight
+        deadline = time.monotonic() + 5
+        while ((self.stage.shared < shared or self.sent < sent) and
+               time.monotonic() < deadline):
+            time.sleep(0.005)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_gets_share_one_request(self):
+        results = self.get_concurrently([self.auth] * 5, shared=4)
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertEqual(self.stage.stats(), {'requests': 5, 'shared': 4, 'hit_rate': 0.8})
+        # every caller gets its own copy of the body
+        results[0]['data'].clear()
+        self.assertEqual([len(result['data']) for result in results[1:]], [1, 1, 1, 1])
+
+    def test_errors_reach_every_caller(self):
+        self.status = 400
+        results = self.get_concurrently([self.auth] * 3, shared=2)
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertTrue(all(isinstance(result, SASEBadRequest) for result in results))
+
+    def test_other_auths_are_not_shared(self):
+        # same tenant, other credentials
+        other = Auth('1', 'other', 'secret', transport=self.transport, middleware=self.chain)
+        self.get_concurrently([self.auth, other], shared=0, sent=2)
+        self.assertEqual(len(self.transport.calls), 2)
+        self.assertEqual(self.stage.shared, 0)
+
+    def test_writes_are_never_shared(self):
+        self.release.set()
+        for name in ['a', 'b']:
+            prisma_request(self.auth, method='POST', url_type='tags', params=dict(FOLDER),
+                           data={'name': name})
+        self.assertEqual(self.stage.stats()['requests'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Incremental list response parser"""
+import random
+import unittest
+
+import orjson
+
+from prismasase.streaming import ListResponseParser, iter_list_response
+
+ITEMS = [
+    {'id': '1', 'name': 'plain'},
+    {'id': '2', 'name': 'braces } ] { [ , : in a string', 'tag': ['a', 'b']},
+    {'id': '3', 'name': 'escaped \\" quote and \\\\ backslash', 'nested': {'data': [1, 2]}},
+    {'id': '4', 'name': 'unicode é中', 'list': [{'x': []}, {}], 'n': None},
+    {'id': '5', 'name': 'numbers', 'value': -1.5e3, 'flag': True},
+]
+
+
+def chunked(body, sizes):
+    position = 0
+    for size in sizes:
+        yield body[position:position + size]
+        position += size
+    yield body[position:]
+
+
+class TestListResponseParser(unittest.TestCase):
+
+    def setUp(self):
+        self.body = orjson.dumps({'offset': 0, 'data': ITEMS, 'total': 5, 'limit': 200})
+
+    def test_whole_body(self):
+        parser = ListResponseParser()
+        self.assertEqual(parser.feed(self.body), ITEMS)
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.meta, {'offset': 0, 'total': 5, 'limit': 200})
+
+    def test_every_split_point(self):
+        for split in range(len(self.body) + 1):
+            parser = ListResponseParser()
+            items = parser.feed(self.body[:split]) + parser.feed(self.body[split:])
+            self.assertEqual(items, ITEMS, split)
+            self.assertEqual(parser.meta['total'], 5)
+
+    def test_random_chunks(self):
+        rng = random.Random(11)
+        body = orjson.dumps({'data': ITEMS * 40, 'total': 200, 'note': 'x, "data": [1]'})
+        for _ in range(100):
+            sizes = [rng.randrange(1, 64) for _ in range(len(body) // 8)]
+            generator = iter_list_response(chunked(body, sizes))
+            items = []
+            while True:
+                try:
+                    items.append(next(generator))
+                except StopIteration as stop:
+                    meta = stop.value
+                    break
+            self.assertEqual(items, ITEMS * 40)
+            self.assertEqual(meta, {'total': 200, 'note': 'x, "data": [1]'})
+
+    def test_pretty_printed_and_empty(self):
+        body = orjson.dumps({'data': ITEMS, 'total': 5}, option=orjson.OPT_INDENT_2)
+        self.assertEqual(list(iter_list_response(chunked(body, [7] * 200))), ITEMS)
+        parser = ListResponseParser()
+        self.assertEqual(parser.feed(b'{"data": [], "total": 0}'), [])
+        self.assertEqual(parser.meta, {'total': 0})
+
+    def test_other_key_and_buffer_bounded(self):
+        parser = ListResponseParser(key='items')
+        body = orjson.dumps({'data': [1], 'items': [{'id': str(i)} for i in range(2000)]})
+        count = 0
+        largest = 0
+        for chunk in chunked(body, [256] * (len(body) // 256)):
+            count += len(parser.feed(chunk))
+            largest = max(largest, len(parser._buf))  # pylint: disable=protected-access
+        self.assertEqual(count, 2000)
+        self.assertEqual(parser.meta, {'data': [1]})
+        self.assertLess(largest, 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tag filter parser and evaluator"""
+import itertools
+import unittest
+
+from prismasase.exceptions import SASEBadParam
+from prismasase.policy_objects.tag_filter import TagFilter, compile_tag_filter
+
+MEMBERS = {
+    'a': {'web', 'prod'},
+    'b': {'web', 'dr site'},
+    'c': {'web', 'dr site', 'old'},
+    'd': {'db', 'prod'},
+    'e': set(),
+}
+
+
+def evaluate(expression):
+    index = {}
+    for member, tags in MEMBERS.items():
+        for tag in tags:
+            index.setdefault(tag, set()).add(member)
+    return set(compile_tag_filter(expression).evaluate(index, frozenset(MEMBERS)))
+
+
+class TestTagFilter(unittest.TestCase):
+
+    def test_precedence_and_grouping(self):
+        tag_filter = TagFilter("'web' and ('prod' or \"dr site\") and not 'old'")
+        self.assertEqual(tag_filter.tags, {'web', 'prod', 'dr site', 'old'})
+        self.assertTrue(tag_filter.negated)
+        self.assertTrue(tag_filter.matches(['web', 'prod']))
+        self.assertFalse(tag_filter.matches(['web', 'dr site', 'old']))
+        self.assertFalse(tag_filter.matches(['prod']))
+        # and binds tighter than or
+        self.assertEqual(evaluate("'db' or 'web' and 'old'"), {'c', 'd'})
+        self.assertEqual(evaluate("('db' or 'web') and 'prod'"), {'a', 'd'})
+
+    def test_not_uses_universe(self):
+        self.assertEqual(evaluate("not 'web'"), {'d', 'e'})
+        self.assertEqual(evaluate("not not 'web'"), {'a', 'b', 'c'})
+        self.assertFalse(TagFilter("'web'").negated)
+
+    def test_operators_case_insensitive_and_bare_words(self):
+        self.assertEqual(evaluate("web AND NOT prod"), {'b', 'c'})
+        self.assertEqual(evaluate("'unknown'"), set())
+
+    def test_evaluate_agrees_with_matches(self):
+        tags = ["'web'", "'prod'", "'dr site'", "'old'"]
+        for left, right in itertools.permutations(tags, 2):
+            for operator in ('and', 'or', 'and not', 'or not'):
+                expression = f"{left} {operator} {right}"
+                expected = {member for member, member_tags in MEMBERS.items()
+                            if compile_tag_filter(expression).matches(member_tags)}
+                self.assertEqual(evaluate(expression), expected, expression)
+
+    def test_invalid(self):
+        for expression in ["", "'a' and", "('a'", "'a')", "and", "not", "'a' or ()"]:
+            with self.assertRaises(SASEBadParam, msg=expression):
+                TagFilter(expression)
+
+    def test_compiled_once(self):
+        self.assertIs(compile_tag_filter("'web'"), compile_tag_filter("'web'"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Shared per folder tag index against FakeTransport"""
+import threading
+import time
+import unittest
+
+from prismasase.configs import Auth
+from prismasase.policy_objects import tags
+from prismasase.policy_objects.tags import (tags_create, tags_create_missing, tags_exist,
+                                            tags_get, tags_index)
+from prismasase.transport import FakeTransport
+
+
+class TestTagIndex(unittest.TestCase):
+
+    def setUp(self):
+        tags._TAG_INDEXES.clear()  # pylint: disable=protected-access
+        self.transport = FakeTransport()
+        self.transport.add('tags', 'Shared', *[{'name': f"tag{number}"} for number in range(30)])
+        self.auth = Auth('1', 'id', 'secret', transport=self.transport)
+
+    def listings(self, folder='Shared'):
+        return sum(1 for method, path, params in self.transport.calls
+                   if method == 'GET' and path == 'tags' and params.get('folder') == folder)
+
+    def test_one_listing_for_many_checks(self):
+        self.assertTrue(tags_exist([f"tag{number}" for number in range(30)], folder='Shared',
+                                   auth=self.auth))
+        self.assertFalse(tags_exist(['tag1', 'nope'], folder='Shared', auth=self.auth))
+        self.assertEqual(tags_get(folder='Shared', tag_name='tag3', auth=self.auth)['name'],
+                         'tag3')
+        self.assertEqual(tags_get(folder='Shared', tag_name='nope', auth=self.auth), {})
+        self.assertEqual(self.listings(), 1)
+        tags_index(folder='Shared', refresh=True, auth=self.auth)
+        self.assertEqual(self.listings(), 2)
+
+    def test_index_per_tenant_and_expiry(self):
+        other = Auth('2', 'id', 'secret', transport=FakeTransport())
+        self.assertEqual(len(tags_index(folder='Shared', auth=self.auth)), 30)
+        self.assertEqual(len(tags_index(folder='Shared', auth=other)), 0)
+        tags_index(folder='Shared', auth=self.auth, max_age=-1)
+        self.assertEqual(self.listings(), 2)
+
+    def test_creates_update_the_index(self):
+        tags_create(folder='Shared', tag_name='new', auth=self.auth)
+        created = tags_create_missing(['tag1', 'a', 'b', 'a'], folder='Shared', auth=self.auth)
+        self.assertEqual(sorted(tag['name'] for tag in created), ['a', 'b'])
+        self.assertTrue(tags_exist(['new', 'a', 'b'], folder='Shared', auth=self.auth))
+        self.assertTrue(tags_exist(['c'], folder='Shared', create_missing=True, auth=self.auth))
+        self.assertEqual(self.listings(), 1)
+
+    def test_loading_one_folder_does_not_block_another(self):
+        loading, release = threading.Event(), threading.Event()
+
+        def handler(method, path, params, body):  # pylint: disable=unused-argument
+            if params.get('folder') == 'Shared':
+                loading.set()
+                release.wait(5)
+            return 200, {'data': [], 'limit': 200, 'offset': 0, 'total': 0}
+        self.transport.route('GET', 'tags', handler)
+        loader = threading.Thread(target=tags_index, kwargs={'folder': 'Shared', 'auth': self.auth})
+        loader.start()
+        loading.wait(5)
+        try:
+            started = time.monotonic()
+            tags_index(folder='Mobile Users', auth=self.auth)
+            self.assertLess(time.monotonic() - started, 2)
+        finally:
+            release.set()
+            loader.join()
+        # the loaded index is reused
+        self.assertEqual(self.listings(), 1)
+        tags_index(folder='Shared', auth=self.auth)
+        self.assertEqual(self.listings(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
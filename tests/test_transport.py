@@ -0,0 +1,69 @@
+"""Transports and token refresh outside the middleware chain"""
+import time
+import unittest
+from unittest import mock
+
+from prismasase.configs import Auth
+from prismasase.middleware import middleware_chain
+from prismasase.restapi import prisma_request, prisma_request_stream
+from prismasase.transport import FakeTransport, Transport
+
+
+class TokenCountingTransport(FakeTransport):
+    """FakeTransport that counts token requests and sees the bearer token sent"""
+
+    def __init__(self):
+        super().__init__()
+        self.tokens = 0
+        self.bearers = []
+
+    def request(self, method, url, **kwargs):
+        if 'oauth2' in url:
+            self.tokens += 1
+        else:
+            self.bearers.append(kwargs['headers']['authorization'])
+        return super().request(method, url, **kwargs)
+
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = TokenCountingTransport()
+        self.transport.add('tags', 'Shared', {'name': 'a'})
+
+    def test_transport_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Transport()  # pylint: disable=abstract-class-instantiated
+
+    def test_expired_token_refreshed_without_auth_stage(self):
+        auth = Auth('1', 'id', 'secret', transport=self.transport,
+                    middleware=middleware_chain("logging,retry"))
+        prisma_request(auth, method='GET', url_type='tags', params={'folder': 'Shared'})
+        self.assertEqual(self.transport.tokens, 1)
+        auth.access_token_expiration = time.time() - 1
+        auth.token = 'expired'
+        prisma_request(auth, method='GET', url_type='tags', params={'folder': 'Shared'})
+        self.assertEqual(self.transport.tokens, 2)
+        self.assertEqual(self.transport.bearers[-1], 'Bearer fake')
+        auth.access_token_expiration = time.time() - 1
+        list(prisma_request_stream(auth, 'tags', {'folder': 'Shared'}))
+        self.assertEqual(self.transport.tokens, 3)
+
+    def test_stream_retried_by_the_chain(self):
+        failures = [503]
+
+        def flaky(method, path, params, body):  # pylint: disable=unused-argument
+            if failures:
+                return failures.pop(), {'_errors': [{'code': 'E503', 'message': 'busy'}]}
+            return 200, {'data': [{'name': 'a'}], 'limit': 200, 'offset': 0, 'total': 1}
+        self.transport.route('GET', 'tags', flaky)
+        auth = Auth('1', 'id', 'secret', transport=self.transport,
+                    middleware=middleware_chain("logging,single_flight,retry"))
+        with mock.patch('prismasase.middleware.time.sleep'):
+            objects = list(prisma_request_stream(auth, 'tags', {'folder': 'Shared'}))
+        self.assertEqual(objects, [{'name': 'a'}])
+        self.assertEqual(len(self.transport.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
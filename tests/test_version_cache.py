@@ -0,0 +1,109 @@
+"""Content addressed cache of pushed config versions"""
+import os
+import tempfile
+import unittest
+
+from prismasase.config_mgmt.configuration import config_manage_get_config
+from prismasase.config_mgmt.version_cache import ConfigVersionCache
+from prismasase.configs import Auth
+from prismasase.exceptions import SASEBadParam
+from prismasase.transport import FakeTransport
+
+SHARED = [{'name': f"obj{number}", 'ip_netmask': f"10.0.0.{number}/32"} for number in range(20)]
+
+
+def version(number, extra=()):
+    return {'version': str(number), 'data': SHARED + list(extra), 'folder': 'Shared'}
+
+
+class TestConfigVersionCache(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.cache_dir = directory.name
+        self.cache = self.open()
+
+    def open(self):
+        cache = ConfigVersionCache(cache_dir=self.cache_dir)
+        # access times are written at exit otherwise, after the directory is gone
+        self.addCleanup(cache.flush)
+        return cache
+
+    def blob_count(self):
+        return sum(len(files) for _, _, files in os.walk(os.path.join(self.cache_dir, 'blobs')))
+
+    def test_round_trip_and_shared_blobs(self):
+        self.cache.put('1', '5', version(5))
+        self.cache.put('1', '6', version(6, [{'name': 'new'}]))
+        self.assertEqual(self.cache.get('1', '5'), version(5))
+        self.assertEqual(self.cache.get('1', '6'), version(6, [{'name': 'new'}]))
+        self.assertIsNone(self.cache.get('1', '7'))
+        self.assertIsNone(self.cache.get('2', '5'))
+        self.assertEqual(self.blob_count(), len(SHARED) + 1)
+
+    def test_only_numbered_versions(self):
+        self.assertFalse(ConfigVersionCache.cacheable('running'))
+        with self.assertRaises(SASEBadParam):
+            self.cache.put('1', 'candidate', version(1))
+
+    def test_replace_keeps_shared_blobs(self):
+        self.cache.put('1', '5', version(5))
+        self.cache.put('1', '6', version(6))
+        self.cache.put('1', '5', version(5, [{'name': 'new'}]))
+        self.assertEqual(self.cache.get('1', '6'), version(6))
+        self.assertEqual(self.cache.get('1', '5'), version(5, [{'name': 'new'}]))
+        self.assertEqual(self.blob_count(), len(SHARED) + 1)
+
+    def test_hits_do_not_write_the_index(self):
+        self.cache.put('1', '5', version(5))
+        index = os.path.join(self.cache_dir, 'index.json')
+        written = os.stat(index).st_mtime_ns
+        stored = self.open()._index['versions']['1/5']['last_access']  # pylint: disable=protected-access
+        for _ in range(10):
+            self.cache.get('1', '5')
+        self.assertEqual(os.stat(index).st_mtime_ns, written)
+        self.cache.flush()
+        self.assertGreater(self.open()._index['versions']['1/5']['last_access'], stored)  # pylint: disable=protected-access
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put('1', '1', version(1, [{'name': 'one'}]))
+        self.cache.put('1', '2', version(2, [{'name': 'two'}]))
+        self.cache.max_bytes = self.cache.size()
+        # a hit makes version 1 the most recently used one
+        self.assertIsNotNone(self.cache.get('1', '1'))
+        self.cache.put('1', '3', version(3, [{'name': 'six'}]))
+        self.assertIsNotNone(self.cache.get('1', '1'))
+        self.assertIsNone(self.cache.get('1', '2'))
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+        self.assertEqual(self.blob_count(), len(SHARED) + 2)
+
+    def test_instances_share_the_index(self):
+        other = self.open()
+        self.cache.put('1', '5', version(5))
+        other.put('1', '6', version(6))
+        self.cache.put('1', '7', version(7))
+        reopened = self.open()
+        for number in (5, 6, 7):
+            self.assertEqual(reopened.get('1', str(number)), version(number))
+        other.clear()
+        self.assertIsNone(self.cache.get('1', '5'))
+        self.assertEqual(self.blob_count(), 0)
+
+    def test_get_config_served_from_cache(self):
+        transport = FakeTransport()
+        transport.route('GET', 'config-versions/', lambda method, path, params, body: (
+            200, version(path.rsplit('/', 1)[-1])))
+        auth = Auth('1', 'id', 'secret', transport=transport)
+        for _ in range(3):
+            self.assertEqual(config_manage_get_config('5', auth=auth, cache=self.cache),
+                             version(5))
+        config_manage_get_config('running', auth=auth, cache=self.cache)
+        config_manage_get_config('running', auth=auth, cache=self.cache)
+        self.assertEqual([call[1] for call in transport.calls],
+                         ['config-versions/5', 'config-versions/running',
+                          'config-versions/running'])
+
+
+if __name__ == '__main__':
+    unittest.main()